@@ -0,0 +1,541 @@
+"""基准测试 - 生成可复现的合成 Atlas 目录, 测量 SpineAtlas 接口和批处理路径的耗时
+
+用法: python AtlasEXCLI.py bench [选项]
+结果保存为 JSON, 可与上一次的结果对比并标记性能退化.
+"""
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import fnmatch
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+from statistics import median, mean
+from time import perf_counter
+from contextlib import contextmanager
+import numpy as np
+from PIL.Image import fromarray, open as imgop
+from SpineAtlas import Atlas, AtlasTex, AtlasFrame, Anchor, ReadAtlasFile, ImgPremultiplied
+from AtlasEXWriter import atlas_text
+
+BENCH_VERSION = 1
+
+# 生成目录中记录参数的文件 - 参数相同时复用已生成的目录
+TREE_NAME = "bench_tree.json"
+
+# 生成参数的默认值
+DEFAULT_TREE = {
+    'atlases': 24,
+    'pages': 2,
+    'page_size': 1024,
+    'frames': 120,
+    'rotate': 0.25,
+    'pma': 0.5,
+    'legacy': 0.0,
+    'subdirs': 4,
+    'seed': 0,
+}
+
+# 对比时的默认阈值 - 中位数变慢超过 15% 且超过 10 毫秒才算退化
+DEFAULT_THRESHOLD = 0.15
+MIN_DELTA = 0.01
+
+def tree_config(**overrides):
+    """合并生成参数, 检查取值范围"""
+    config = dict(DEFAULT_TREE)
+    config.update({k: v for k, v in overrides.items() if v is not None})
+    for key in ('atlases', 'pages', 'page_size', 'frames', 'subdirs'):
+        config[key] = int(config[key])
+        if config[key] < 1:
+            raise ValueError(f"{key} 必须大于 0")
+    for key in ('rotate', 'pma', 'legacy'):
+        config[key] = float(config[key])
+        if not 0.0 <= config[key] <= 1.0:
+            raise ValueError(f"{key} 必须在 0 到 1 之间")
+    return config
+
+def _page_frames(rng, count, page_size, rotate):
+    """在纹理页上按网格放置 count 个帧, 返回 [(x, y, w, h, 是否旋转)] (w, h 为未旋转尺寸)"""
+    columns = math.ceil(math.sqrt(count))
+    cell = page_size // columns
+    if cell < 4:
+        raise ValueError(f"纹理页 {page_size}px 放不下 {count} 个帧")
+    frames = []
+    for k in range(count):
+        x, y = (k % columns) * cell, (k // columns) * cell
+        w, h = (int(v) for v in rng.integers(max(1, cell // 4), cell - 1, 2, endpoint=True))
+        frames.append((x, y, w, h, bool(rng.random() < rotate)))
+    return frames
+
+def _paint_page(rng, size, frames, pma):
+    """绘制纹理页 - 每个帧为纯色加水平渐变的 alpha, 帧之间透明; pma 时颜色预乘 alpha"""
+    page = np.zeros((size, size, 4), dtype=np.uint8)
+    for x, y, w, h, rotated in frames:
+        if rotated:
+            w, h = h, w
+        alpha = np.linspace(255, 32, w, dtype=np.float32)[None, :].repeat(h, axis=0)
+        color = rng.integers(0, 256, 3).astype(np.float32)
+        region = page[y:y + h, x:x + w]
+        rgb = color[None, None, :] * (alpha[..., None] / 255.0 if pma else 1.0)
+        region[..., :3] = rgb.astype(np.uint8)
+        region[..., 3] = alpha.astype(np.uint8)
+    return fromarray(page, 'RGBA')
+
+def generate_tree(root, config=None):
+    """生成合成 Atlas 目录, 返回目录信息 {root, config, atlases, pages, frames, bytes}
+
+    同样的参数 (含随机种子) 总是生成相同的 Atlas 和纹理页; root 中已有相同参数生成的目录时直接复用.
+    """
+    config = tree_config(**(config or {}))
+    root = Path(root).resolve()
+    info_path = root.joinpath(TREE_NAME)
+    if info_path.is_file():
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+        if info.get('config') == config and all(root.joinpath(a).is_file() for a in info['atlases']):
+            return dict(info, root=str(root))
+    for name in ("atlases", TREE_NAME):
+        target = root.joinpath(name)
+        if target.is_dir():
+            shutil.rmtree(target)
+    rng = np.random.default_rng(config['seed'])
+    atlases, pages, frames, total_bytes = [], [], 0, 0
+    per_page = max(1, math.ceil(config['frames'] / config['pages']))
+    for i in range(config['atlases']):
+        directory = root.joinpath("atlases", f"group_{i % config['subdirs']:02d}")
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"atlas_{i:04d}"
+        textures = []
+        remaining = config['frames']
+        for p in range(config['pages']):
+            count = min(per_page, remaining)
+            if count <= 0:
+                break
+            remaining -= count
+            png = f"{stem}.png" if p == 0 else f"{stem}_{p + 1}.png"
+            pma = bool(rng.random() < config['pma'])
+            placed = _page_frames(rng, count, config['page_size'], config['rotate'])
+            page = _paint_page(rng, config['page_size'], placed, pma)
+            page_path = directory.joinpath(png)
+            page.save(page_path, format='PNG', compress_level=1)
+            total_bytes += page_path.stat().st_size
+            pages.append(page_path.relative_to(root).as_posix())
+            tex_frames = []
+            for k, (x, y, w, h, rotated) in enumerate(placed):
+                # 原始尺寸比裁剪尺寸大, 模拟导出时裁掉的透明边
+                pad_w, pad_h = (int(v) for v in rng.integers(0, 9, 2))
+                off_x, off_y = (int(rng.integers(0, pad_w + 1)), int(rng.integers(0, pad_h + 1)))
+                tex_frames.append(AtlasFrame(f"{stem}/part_{p}_{k:04d}", x, y, w, h, off_x, off_y,
+                                             w + pad_w, h + pad_h, 90 if rotated else 0))
+            frames += len(tex_frames)
+            textures.append(AtlasTex(png, config['page_size'], config['page_size'], pma, 1.0, tex_frames))
+        atlas = Atlas(textures, version=not rng.random() < config['legacy'])
+        atlas_path = directory.joinpath(f"{stem}.atlas")
+        atlas_path.write_text(atlas_text(atlas), encoding='utf-8')
+        total_bytes += atlas_path.stat().st_size
+        atlases.append(atlas_path.relative_to(root).as_posix())
+    info = {'config': config, 'atlases': atlases, 'pages': pages, 'frames': frames, 'bytes': total_bytes}
+    with open(info_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return dict(info, root=str(root))
+
+class Bench:
+    """一项基准测试 - setup(上下文) 准备数据 (不计时), run(状态) 为计时部分, 返回处理的项目数"""
+
+    def __init__(self, name, group, run, setup=None):
+        self.name = name
+        self.group = group
+        self.run = run
+        self.setup = setup
+
+def _files(ctx, sample=False):
+    files = ctx['files']
+    return files[:ctx['sample']] if sample else files
+
+def _fresh_output(ctx, name):
+    """每次运行前清空输出目录"""
+    target = Path(ctx['output']).joinpath(name)
+    shutil.rmtree(target, ignore_errors=True)
+    target.mkdir(parents=True)
+    return str(target)
+
+def _parse_all(ctx, sample=False):
+    return [ReadAtlasFile(f) for f in _files(ctx, sample)]
+
+# SpineAtlas 接口 (当前进程中执行)
+def _read_atlas(state):
+    for f in state:
+        ReadAtlasFile(f)
+    return len(state)
+
+def _save_atlas(state):
+    atlases, out = state
+    for i, atlas in enumerate(atlases):
+        atlas.SaveAtlas(os.path.join(out, f"{i}.atlas"))
+    return len(atlases)
+
+def _save_frames(state):
+    atlases, out = state
+    for i, atlas in enumerate(atlases):
+        atlas.SaveFrames(path=os.path.join(out, str(i)))
+    return sum(len(tex.frames) for atlas in atlases for tex in atlas.atlas)
+
+def _rescale(state):
+    for atlas in state:
+        atlas.ReScale(scale=0.5)
+    return len(state)
+
+def _setup_reoffset(ctx):
+    atlases = _parse_all(ctx)
+    for atlas in atlases:
+        atlas.cutp = Anchor.CENTER
+        atlas.offp = Anchor.CENTER
+    return atlases
+
+def _reoffset(state):
+    for atlas in state:
+        atlas.ReOffset()
+    return len(state)
+
+def _load_pages(ctx):
+    pages = []
+    for page in ctx['pages'][:ctx['sample']]:
+        with imgop(page) as image:
+            image.load()
+            pages.append(image.copy())
+    return pages
+
+def _premultiplied(state):
+    for image in state:
+        ImgPremultiplied(image)
+    return len(state)
+
+def _img_premultiplied(state):
+    from AtlasEXImage import img_premultiplied
+    for image in state:
+        img_premultiplied(image)
+    return len(state)
+
+# 批处理路径 (与命令行相同, 每次运行临时创建进程池)
+def _drain_batch(func, items, args, jobs):
+    from AtlasEXCore import iter_batch
+    count = 0
+    for result in iter_batch(func, items, args, jobs):
+        if not result.get('ok'):
+            raise RuntimeError(f"{result['file']}: {result.get('error')}")
+        count += 1
+    return count
+
+def _batch_modify(operation, params):
+    def setup(ctx):
+        return ctx, _fresh_output(ctx, f"batch_{operation}")
+
+    def run(state):
+        from AtlasEXCore import process_batch_file
+        ctx, out = state
+        return _drain_batch(process_batch_file, ctx['files'],
+                            (operation, params, False, "_bench", None, out, ctx['atlas_root']), ctx['jobs'])
+    return setup, run
+
+def _batch_check(ctx):
+    from AtlasEXCore import check_file
+    return _drain_batch(check_file, ctx['files'], (), ctx['jobs'])
+
+def _batch_export(state):
+    from AtlasEXCore import export_file
+    ctx, out = state
+    return _drain_batch(export_file, _files(ctx, True), (out, "Normal"), ctx['jobs'])
+
+def _batch_export_pipeline(state):
+    from AtlasEXExport import export_frames_pipeline
+    ctx, out = state
+    count = 0
+    for result in export_frames_pipeline(_files(ctx, True), out, "Normal", max_workers=ctx['jobs']):
+        if not result.get('ok'):
+            raise RuntimeError(f"{result['file']}: {result.get('error')}")
+        count += 1
+    return count
+
+def _batch_premul(state):
+    from AtlasEXImage import process_image_into
+    ctx, out = state
+    return _drain_batch(process_image_into, ctx['pages'][:ctx['sample']], (out, "Premul", ctx['root']), ctx['jobs'])
+
+# 界面的批处理路径 (无界面运行, 共用一个窗口和常驻进程池)
+@contextmanager
+def _chosen_directory(path):
+    """让界面中的目录选择对话框直接返回 path"""
+    from PySide6.QtWidgets import QFileDialog
+    original = QFileDialog.getExistingDirectory
+    QFileDialog.getExistingDirectory = staticmethod(lambda *args, **kwargs: path)
+    try:
+        yield
+    finally:
+        QFileDialog.getExistingDirectory = original
+
+def _gui_window(ctx):
+    """创建 (或复用) 无界面运行的主窗口"""
+    if 'window' not in ctx:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PySide6.QtWidgets import QApplication
+        from AtlasEXGUI import SpineAtlasGUI
+        ctx['app'] = QApplication.instance() or QApplication([])
+        window = SpineAtlasGUI()
+        window.selected_root = ctx['atlas_root']
+        ctx['window'] = window
+    return ctx['window']
+
+def _gui_wait(ctx, timeout=3600):
+    """处理事件直到批处理结束 (进度条隐藏)"""
+    window = ctx['window']
+    deadline = perf_counter() + timeout
+    while not window.progress_bar.isHidden() or window.jobs.is_running():
+        ctx['app'].processEvents()
+        time.sleep(0.001)
+        if perf_counter() > deadline:
+            raise TimeoutError("界面批处理超时")
+
+def _gui_setup(name, files=None):
+    def setup(ctx):
+        window = _gui_window(ctx)
+        window.selected_files = list(_files(ctx, files == 'sample'))
+        window.suffix_input.setText("_bench")
+        window.output_root_input.setText(_fresh_output(ctx, name))
+        window.log_view.clear()
+        return ctx, window
+    return setup
+
+def _gui_run(action, dialog=False):
+    def run(state):
+        ctx, window = state
+        if dialog:
+            with _chosen_directory(window.output_root_input.text()):
+                action(window)
+        else:
+            action(window)
+        _gui_wait(ctx)
+        errors = [line for line in window.log_view.text().splitlines() if line.startswith("[ERROR]")]
+        if errors:
+            raise RuntimeError(errors[0])
+        return len(window.selected_files)
+    return run
+
+def _gui_export(window):
+    window.pipeline_checkbox.setChecked(True)
+    window.export_frames()
+
+def _gui_premul(window):
+    window.process_combo.setCurrentIndex(0)
+    window.process_atlas_pages()
+
+def benchmarks():
+    """全部基准测试, 按执行顺序"""
+    convert = _batch_modify('convert', {'version': False})
+    pipeline = _batch_modify('pipeline', {'steps': [['rescale', {}], ['cut_anchor', {'anchor': Anchor.CENTER.value}],
+                                                    ['offset_anchor', {'anchor': Anchor.CENTER.value}]]})
+    return [
+        Bench("api.ReadAtlasFile", 'api', _read_atlas, lambda ctx: ctx['files']),
+        Bench("api.SaveAtlas", 'api', _save_atlas, lambda ctx: (_parse_all(ctx), _fresh_output(ctx, "save_atlas"))),
+        Bench("api.ReScale", 'api', _rescale, _parse_all),
+        Bench("api.ReOffset", 'api', _reoffset, _setup_reoffset),
+        Bench("api.SaveFrames", 'api', _save_frames,
+              lambda ctx: (_parse_all(ctx, True), _fresh_output(ctx, "save_frames"))),
+        Bench("api.ImgPremultiplied", 'api', _premultiplied, _load_pages),
+        Bench("api.img_premultiplied", 'api', _img_premultiplied, _load_pages),
+        Bench("batch.convert", 'batch', convert[1], convert[0]),
+        Bench("batch.pipeline", 'batch', pipeline[1], pipeline[0]),
+        Bench("batch.check", 'batch', _batch_check, lambda ctx: ctx),
+        Bench("batch.export", 'batch', _batch_export, lambda ctx: (ctx, _fresh_output(ctx, "batch_export"))),
+        Bench("batch.export_pipeline", 'batch', _batch_export_pipeline,
+              lambda ctx: (ctx, _fresh_output(ctx, "batch_export_pipeline"))),
+        Bench("batch.premul", 'batch', _batch_premul, lambda ctx: (ctx, _fresh_output(ctx, "batch_premul"))),
+        Bench("gui.convert", 'gui', _gui_run(lambda w: w.convert_format()), _gui_setup("gui_convert")),
+        Bench("gui.rescale", 'gui', _gui_run(lambda w: w.apply_scaling()), _gui_setup("gui_rescale")),
+        Bench("gui.cut_anchor", 'gui', _gui_run(lambda w: w.recalculate_cut_anchor()), _gui_setup("gui_cut_anchor")),
+        Bench("gui.check", 'gui', _gui_run(lambda w: w.check_textures()), _gui_setup("gui_check")),
+        Bench("gui.export", 'gui', _gui_run(_gui_export, dialog=True), _gui_setup("gui_export", 'sample')),
+        Bench("gui.premul", 'gui', _gui_run(_gui_premul, dialog=True), _gui_setup("gui_premul", 'sample')),
+    ]
+
+def _versions():
+    from importlib.metadata import version, PackageNotFoundError
+    versions = {}
+    for package in ("SpineAtlas", "numpy", "Pillow", "PySide6"):
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment():
+    """运行环境 - 对比不同机器或依赖版本的结果时参考"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'packages': _versions(),
+        'commit': _git_commit(),
+    }
+
+def _stats(runs, items):
+    value = median(runs)
+    return {
+        'runs': [round(r, 6) for r in runs],
+        'first': round(runs[0], 6),
+        'min': round(min(runs), 6),
+        'median': round(value, 6),
+        'mean': round(mean(runs), 6),
+        'items': items,
+        'per_item': round(value / items, 9) if items else None,
+    }
+
+def run_benchmarks(tree, repeat=3, only=None, gui=False, jobs=None, sample=8, output=None, progress=None):
+    """运行基准测试, 返回结果 (可直接保存为 JSON)
+
+    only 为名称通配符列表; gui 为 False 时跳过界面路径. sample 限制图像密集的测试
+    (SaveFrames, 导出, 预乘) 使用的 Atlas/纹理页数量. 单项失败时记录错误并继续.
+    """
+    root = Path(tree['root'])
+    files = [str(root.joinpath(a)) for a in tree['atlases']]
+    temporary = output is None
+    output = output or tempfile.mkdtemp(prefix="atlasex_bench_")
+    ctx = {
+        'root': str(root),
+        'atlas_root': str(root.joinpath("atlases")),
+        'files': files,
+        'pages': [str(root.joinpath(p)) for p in tree['pages']],
+        'sample': max(1, sample),
+        'jobs': jobs,
+        'output': output,
+    }
+    selected = [b for b in benchmarks() if (gui or b.group != 'gui')
+                and (not only or any(fnmatch.fnmatch(b.name, pattern) for pattern in only))]
+    results = {}
+    try:
+        for index, bench in enumerate(selected):
+            if progress is not None:
+                progress(index, len(selected), bench.name)
+            runs = []
+            items = 0
+            try:
+                for _ in range(repeat):
+                    state = bench.setup(ctx) if bench.setup else ctx
+                    start = perf_counter()
+                    items = bench.run(state)
+                    runs.append(perf_counter() - start)
+                    state = None
+                results[bench.name] = _stats(runs, items)
+            except Exception as e:
+                results[bench.name] = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        window = ctx.get('window')
+        if window is not None:
+            # closeEvent 会关闭常驻进程池
+            window.close()
+        if temporary:
+            shutil.rmtree(output, ignore_errors=True)
+    return {
+        'version': BENCH_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'config': dict(tree['config'], repeat=repeat, sample=ctx['sample'], jobs=jobs),
+        'tree': {'atlases': len(files), 'pages': len(tree['pages']), 'frames': tree['frames'],
+                 'bytes': tree['bytes']},
+        'benchmarks': results,
+    }
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != BENCH_VERSION:
+        raise ValueError(f"不支持的基准结果版本: {data.get('version')}")
+    return data
+
+def save_results(path, results):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+def compare_results(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA):
+    """按中位数对比两次结果, 返回 {rows, regressions, warnings}
+
+    中位数变慢超过 threshold (比例) 且超过 min_delta (秒) 时为退化 (regression),
+    变快同样幅度为改进 (improvement); 生成参数或运行环境不同时在 warnings 中说明.
+    """
+    warnings = []
+    # 重复次数不影响单次耗时
+    if {**current.get('config', {}), 'repeat': None} != {**baseline.get('config', {}), 'repeat': None}:
+        warnings.append("生成参数不同, 结果不可直接比较")
+    now_env, old_env = current.get('environment', {}), baseline.get('environment', {})
+    for key in ('machine', 'cpu_count', 'python'):
+        if now_env.get(key) != old_env.get(key):
+            warnings.append(f"运行环境不同: {key} {old_env.get(key)} -> {now_env.get(key)}")
+    for package, value in now_env.get('packages', {}).items():
+        old = old_env.get('packages', {}).get(package)
+        if old != value:
+            warnings.append(f"依赖版本不同: {package} {old} -> {value}")
+    skipped = [name for name in baseline['benchmarks'] if name not in current['benchmarks']]
+    if skipped:
+        warnings.append(f"本次未运行 {len(skipped)} 项基准中的测试")
+    rows = []
+    for name, now in current['benchmarks'].items():
+        old = baseline['benchmarks'].get(name)
+        row = {'name': name, 'baseline': None, 'current': None, 'change': None}
+        if 'error' in now:
+            row['status'] = 'error'
+        elif old is None or 'error' in old:
+            row.update(current=now['median'], status='new')
+        else:
+            row.update(baseline=old['median'], current=now['median'])
+            delta = now['median'] - old['median']
+            row['change'] = round(delta / old['median'], 4) if old['median'] else None
+            if row['change'] is not None and abs(delta) > min_delta and abs(row['change']) > threshold:
+                row['status'] = 'regression' if delta > 0 else 'improvement'
+            else:
+                row['status'] = 'ok'
+        rows.append(row)
+    return {'rows': rows, 'regressions': [r['name'] for r in rows if r['status'] in ('regression', 'error')],
+            'warnings': warnings}
+
+def format_results(results):
+    """结果表格 (毫秒)"""
+    lines = [f"{'测试':<26}{'项目':>8}{'首次':>10}{'中位数':>10}{'最短':>10}{'每项':>10}"]
+    for name, s in results['benchmarks'].items():
+        if 'error' in s:
+            lines.append(f"{name:<26}失败: {s['error']}")
+            continue
+        per_item = f"{s['per_item'] * 1000:.3f}" if s['per_item'] is not None else "-"
+        lines.append(f"{name:<26}{s['items']:>8}{s['first'] * 1000:>10.1f}{s['median'] * 1000:>10.1f}"
+                     f"{s['min'] * 1000:>10.1f}{per_item:>10}")
+    return lines
+
+def format_comparison(report):
+    """对比表格 (毫秒)"""
+    labels = {'ok': "", 'regression': "退化", 'improvement': "改进", 'new': "新增", 'error': "失败"}
+    lines = [f"警告: {w}" for w in report['warnings']]
+    lines.append(f"{'测试':<26}{'基准':>10}{'当前':>10}{'变化':>9}  状态")
+    for row in report['rows']:
+        old = f"{row['baseline'] * 1000:.1f}" if row['baseline'] is not None else "-"
+        now = f"{row['current'] * 1000:.1f}" if row['current'] is not None else "-"
+        change = f"{row['change'] * 100:+.1f}%" if row['change'] is not None else "-"
+        lines.append(f"{row['name']:<26}{old:>10}{now:>10}{change:>9}  {labels[row['status']]}")
+    return lines
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+    freeze_support()
+    from AtlasEXCLI import main
+    sys.exit(main(["bench"] + sys.argv[1:]))
@@ -0,0 +1,566 @@
+import math
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QListWidget, QListWidgetItem, QListView, QComboBox,
+    QLineEdit, QLabel, QGraphicsView, QGraphicsScene, QGraphicsObject, QStyleOptionGraphicsItem,
+    QAbstractItemView
+)
+from PySide6.QtGui import QImage, QPixmap, QPainter, QPen, QColor, QBrush
+from PySide6.QtCore import (
+    Qt, QObject, QRunnable, QThreadPool, Signal, QRectF, QSize, QAbstractListModel, QModelIndex,
+    QSortFilterProxyModel
+)
+from AtlasEXThumbs import describe_atlas, build_page_cache, thumbs_root, tile_grid, tile_index, PackReader
+from AtlasEXThumbs import TILE_SIZE, THUMB_SIZE, RECT_DTYPE
+
+# 内存中保留的解码瓦片 (每个最多 1 MB) 和缩略图数量
+TILE_CACHE = 256
+THUMB_CACHE = 4000
+
+# 同时解码瓦片/缩略图的线程数, 生成缓存的进程数
+LOADER_THREADS = 4
+BUILD_WORKERS = 2
+
+_OUTLINE = QColor(0, 170, 255)
+_SELECTED = QColor(255, 60, 60)
+
+class _PixmapCache:
+    """LRU 缓存 - 只在主线程中访问 (QPixmap 不能跨线程使用)"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.items = OrderedDict()
+
+    def get(self, key):
+        pixmap = self.items.get(key)
+        if pixmap is not None:
+            self.items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        self.items[key] = pixmap
+        self.items.move_to_end(key)
+        while len(self.items) > self.limit:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+class _Signals(QObject):
+    """后台结果 - 进程池回调和解码线程通过信号回到主线程"""
+    described = Signal(int, dict)
+    built = Signal(int, dict)
+    loaded = Signal(object, QImage)
+
+class _Decode(QRunnable):
+    """从打包文件读取并解码一个瓦片或缩略图"""
+
+    def __init__(self, reader, index, key, signals):
+        super().__init__()
+        self.reader = reader
+        self.index = index
+        self.key = key
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = QImage.fromData(self.reader.get(self.index))
+        except (ValueError, IndexError, TypeError):
+            # 读取器已关闭 (切换了纹理页)
+            return
+        self.signals.loaded.emit(self.key, image)
+
+class PageItem(QGraphicsObject):
+    """纹理页 - 按当前缩放选择金字塔层, 只绘制可见的瓦片; 帧轮廓按可见范围筛选后批量绘制"""
+
+    def __init__(self, browser):
+        super().__init__()
+        self.browser = browser
+        self.size = (0, 0)
+        self.rects = np.zeros((0, 4), dtype=np.int64)
+        self.outlines = []
+        self.levels = 0
+        self.selected = -1
+        self.setFlag(QGraphicsObject.ItemUsesExtendedStyleOption)
+
+    def set_page(self, size, rects):
+        self.prepareGeometryChange()
+        self.size = (max(1, int(size[0])), max(1, int(size[1])))
+        self.rects = np.stack([rects['x'], rects['y'], rects['w'], rects['h']], axis=1).astype(np.int64)
+        # 每次绘制只按可见范围挑选, 不再逐个创建
+        self.outlines = [QRectF(*rect) for rect in self.rects.tolist()]
+        self.levels = 0
+        self.selected = -1
+        self.update()
+
+    def set_levels(self, size, levels):
+        """瓦片已生成 - 使用实际纹理尺寸 (可能与 Atlas 中记录的不同)"""
+        if tuple(size) != self.size:
+            self.prepareGeometryChange()
+            self.size = tuple(size)
+        self.levels = levels
+        self.update()
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.size[0], self.size[1])
+
+    def _level(self, painter):
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if lod >= 1 or lod <= 0:
+            return 0
+        return min(self.levels - 1, int(math.floor(math.log2(1 / lod))))
+
+    def _tiles(self, level, rect):
+        """与 rect 相交的瓦片 [(列, 行, 目标矩形)]"""
+        columns, rows, _, _ = tile_grid(self.size[0], self.size[1], level)
+        span = TILE_SIZE * (1 << level)
+        first_c, first_r = max(0, int(rect.left() // span)), max(0, int(rect.top() // span))
+        last_c, last_r = min(columns - 1, int(rect.right() // span)), min(rows - 1, int(rect.bottom() // span))
+        return [(c, r, QRectF(c * span, r * span, span, span))
+                for r in range(first_r, last_r + 1) for c in range(first_c, last_c + 1)]
+
+    def _draw_tile(self, painter, level, column, row, target):
+        pixmap = self.browser.tile(level, column, row)
+        if pixmap is None:
+            return False
+        scale = 1 << level
+        painter.drawPixmap(QRectF(target.x(), target.y(), pixmap.width() * scale, pixmap.height() * scale),
+                           pixmap, QRectF(pixmap.rect()))
+        return True
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        painter.fillRect(exposed, QColor(60, 60, 60))
+        if self.levels:
+            level = self._level(painter)
+            tiles = self._tiles(level, exposed)
+            missing = [target for c, r, target in tiles if not self.browser.cached_tile(level, c, r)]
+            if missing:
+                # 未解码的瓦片先用已缓存的较粗层代替 (由粗到细绘制); 最粗一层总是请求, 保证有可用的替代
+                area = QRectF()
+                for target in missing:
+                    area = area.united(target)
+                area = area.intersected(exposed)
+                painter.save()
+                painter.setClipRect(area)
+                for coarse in range(self.levels - 1, level, -1):
+                    for c, r, target in self._tiles(coarse, area):
+                        if self.browser.cached_tile(coarse, c, r):
+                            self._draw_tile(painter, coarse, c, r, target)
+                painter.restore()
+                self.browser.tile(self.levels - 1, 0, 0)
+            for c, r, target in tiles:
+                self._draw_tile(painter, level, c, r, target)
+        self._draw_outlines(painter, exposed)
+
+    def _draw_outlines(self, painter, exposed):
+        rects = self.rects
+        if not len(rects):
+            return
+        x, y, w, h = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+        visible = np.flatnonzero((x < exposed.right()) & (x + w > exposed.left())
+                                 & (y < exposed.bottom()) & (y + h > exposed.top()))
+        pen = QPen(_OUTLINE)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+        outlines = self.outlines
+        painter.drawRects(outlines if len(visible) == len(outlines) else [outlines[i] for i in visible.tolist()])
+        if 0 <= self.selected < len(rects):
+            pen = QPen(_SELECTED, 2)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.drawRect(QRectF(*rects[self.selected]))
+
+    def frame_at(self, point):
+        """坐标处的帧 (重叠时取面积最小的), 没有时返回 -1"""
+        rects = self.rects
+        if not len(rects):
+            return -1
+        x, y, w, h = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+        hits = np.flatnonzero((x <= point.x()) & (point.x() < x + w) & (y <= point.y()) & (point.y() < y + h))
+        if not len(hits):
+            return -1
+        return int(hits[np.argmin(w[hits] * h[hits])])
+
+    def select(self, index):
+        self.selected = index
+        self.update()
+
+class PageView(QGraphicsView):
+    """纹理页视图 - 滚轮缩放, 拖动平移, 单击选中帧"""
+
+    frame_clicked = Signal(int)
+
+    def __init__(self, item, parent=None):
+        super().__init__(parent)
+        self.item = item
+        self.setScene(QGraphicsScene(self))
+        self.scene().addItem(item)
+        self.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.setViewportUpdateMode(QGraphicsView.SmartViewportUpdate)
+        self.setBackgroundBrush(QBrush(QColor(40, 40, 40)))
+        self.setRenderHint(QPainter.SmoothPixmapTransform)
+        self.press = None
+
+    def fit(self):
+        self.scene().setSceneRect(self.item.boundingRect())
+        self.fitInView(self.item, Qt.KeepAspectRatio)
+
+    def wheelEvent(self, event):
+        factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+        scale = self.transform().m11() * factor
+        if 1 / 256 <= scale <= 32:
+            self.scale(factor, factor)
+
+    def mousePressEvent(self, event):
+        self.press = event.position()
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        # 拖动平移时不算单击
+        if self.press is not None and (event.position() - self.press).manhattanLength() < 4:
+            self.frame_clicked.emit(self.item.frame_at(self.mapToScene(event.position().toPoint())))
+        self.press = None
+
+    def show_rect(self, rect):
+        """居中显示帧, 必要时放大"""
+        margin = max(rect.width(), rect.height(), 32)
+        target = rect.adjusted(-margin, -margin, margin, margin)
+        if self.transform().m11() * max(target.width(), target.height()) < 64:
+            self.fitInView(target, Qt.KeepAspectRatio)
+        self.centerOn(rect.center())
+
+class FrameModel(QAbstractListModel):
+    """帧列表 - 只保存名称, 缩略图在可见时才向浏览器请求"""
+
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.browser = browser
+        self.names = []
+
+    def set_names(self, names):
+        self.beginResetModel()
+        self.names = names
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.names[index.row()]
+        if role == Qt.DecorationRole:
+            return self.browser.thumbnail(index.row())
+        if role == Qt.ToolTipRole:
+            x, y, w, h = self.browser.page_item.rects[index.row()]
+            return f"{self.names[index.row()]}\n{x}, {y}  {w} x {h}"
+        return None
+
+    def refresh(self, rows=None):
+        """缩略图就绪后刷新"""
+        if not self.names:
+            return
+        first, last = (0, len(self.names) - 1) if rows is None else (rows, rows)
+        self.dataChanged.emit(self.index(first), self.index(last), [Qt.DecorationRole])
+
+class AtlasBrowser(QWidget):
+    """Atlas 浏览器 - 列出所选 Atlas, 分块显示纹理页和帧轮廓, 帧缩略图按需从磁盘缓存读取
+
+    Atlas 在进程池中解析, 纹理页在进程池中一次性切分为瓦片金字塔和缩略图 (按内容哈希缓存在
+    输入目录的 .atlasex_thumbs/), 界面只解码可见的瓦片和缩略图, 内存中只保留有限数量.
+    """
+
+    status = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files = []
+        self.root = None
+        self.pages = []
+        self.page_info = ""
+        self.executor = None
+        # 每次切换 Atlas/纹理页时递增, 丢弃过期的后台结果
+        self.generation = 0
+        self.tiles = None
+        self.thumbs = None
+        self.tile_cache = _PixmapCache(TILE_CACHE)
+        self.thumb_cache = _PixmapCache(THUMB_CACHE)
+        self.pending = set()
+        self.signals = _Signals()
+        self.signals.described.connect(self.on_described)
+        self.signals.built.connect(self.on_built)
+        self.signals.loaded.connect(self.on_loaded)
+        self.loader = QThreadPool(self)
+        self.loader.setMaxThreadCount(LOADER_THREADS)
+
+        placeholder = QPixmap(THUMB_SIZE, THUMB_SIZE)
+        placeholder.fill(QColor(80, 80, 80))
+        self.placeholder = placeholder
+
+        self.atlas_list = QListWidget()
+        self.atlas_list.setUniformItemSizes(True)
+        self.atlas_list.currentRowChanged.connect(self.open_atlas)
+        self.page_combo = QComboBox()
+        self.page_combo.currentIndexChanged.connect(self.open_page)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索帧")
+        self.info_label = QLabel()
+        self.info_label.setWordWrap(True)
+
+        self.page_item = PageItem(self)
+        self.page_view = PageView(self.page_item)
+        self.page_view.frame_clicked.connect(self.select_frame)
+
+        self.frame_model = FrameModel(self)
+        self.frame_proxy = QSortFilterProxyModel(self)
+        self.frame_proxy.setSourceModel(self.frame_model)
+        self.frame_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.search_input.textChanged.connect(self.frame_proxy.setFilterFixedString)
+        self.frame_view = QListView()
+        self.frame_view.setModel(self.frame_proxy)
+        self.frame_view.setViewMode(QListView.IconMode)
+        self.frame_view.setResizeMode(QListView.Adjust)
+        self.frame_view.setMovement(QListView.Static)
+        self.frame_view.setUniformItemSizes(True)
+        self.frame_view.setLayoutMode(QListView.Batched)
+        self.frame_view.setBatchSize(500)
+        self.frame_view.setIconSize(QSize(THUMB_SIZE, THUMB_SIZE))
+        self.frame_view.setGridSize(QSize(THUMB_SIZE + 24, THUMB_SIZE + 28))
+        self.frame_view.setTextElideMode(Qt.ElideMiddle)
+        self.frame_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.frame_view.selectionModel().currentChanged.connect(self.on_frame_current)
+
+        left = QWidget()
+        left_layout = QVBoxLayout()
+        left_layout.setContentsMargins(0, 0, 0, 0)
+        left_layout.addWidget(QLabel("Atlas:"))
+        left_layout.addWidget(self.atlas_list)
+        left_layout.addWidget(QLabel("纹理页:"))
+        left_layout.addWidget(self.page_combo)
+        left_layout.addWidget(self.info_label)
+        left.setLayout(left_layout)
+
+        right = QWidget()
+        right_layout = QVBoxLayout()
+        right_layout.setContentsMargins(0, 0, 0, 0)
+        right_layout.addWidget(self.search_input)
+        right_layout.addWidget(self.frame_view)
+        right.setLayout(right_layout)
+
+        splitter = QSplitter()
+        splitter.addWidget(left)
+        splitter.addWidget(self.page_view)
+        splitter.addWidget(right)
+        splitter.setStretchFactor(1, 3)
+        splitter.setStretchFactor(2, 1)
+        splitter.setSizes([200, 700, 300])
+        layout = QHBoxLayout()
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def set_files(self, files):
+        """更新 Atlas 列表 - 文件没有变化时保持当前显示"""
+        files = list(files)
+        if files == self.files:
+            return
+        self.files = files
+        self.root = thumbs_root(files)
+        self.atlas_list.blockSignals(True)
+        self.atlas_list.clear()
+        for file_path in files:
+            item = QListWidgetItem(Path(file_path).name)
+            item.setToolTip(str(file_path))
+            self.atlas_list.addItem(item)
+        self.atlas_list.blockSignals(False)
+        self.clear_page()
+        self.page_combo.blockSignals(True)
+        self.page_combo.clear()
+        self.page_combo.blockSignals(False)
+        if files:
+            self.atlas_list.setCurrentRow(0)
+
+    def _submit(self, func, *args):
+        """提交到生成缓存的进程池; 结果通过信号带着提交时的 generation 回到主线程"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=BUILD_WORKERS)
+        return self.executor.submit(func, *args)
+
+    def _emit(self, signal, generation, future, fallback):
+        try:
+            result = future.result()
+        except Exception as e:
+            result = dict(fallback, ok=False, error=str(e))
+        signal.emit(generation, result)
+
+    def open_atlas(self, row):
+        self.generation += 1
+        self.pages = []
+        self.clear_page()
+        self.page_combo.blockSignals(True)
+        self.page_combo.clear()
+        self.page_combo.blockSignals(False)
+        if not 0 <= row < len(self.files):
+            return
+        file_path = self.files[row]
+        self.info_label.setText("正在读取 Atlas...")
+        generation = self.generation
+        future = self._submit(describe_atlas, file_path)
+        future.add_done_callback(lambda f: self._emit(self.signals.described, generation, f,
+                                                      {'file': file_path, 'pages': []}))
+
+    def on_described(self, generation, result):
+        if generation != self.generation:
+            return
+        if not result['ok']:
+            self.info_label.setText(f"读取失败: {result['error']}")
+            self.status.emit(f"读取 {Path(result['file']).name} 失败: {result['error']}")
+            return
+        self.pages = result['pages']
+        self.page_combo.blockSignals(True)
+        for page in self.pages:
+            self.page_combo.addItem(f"{page['png']} ({len(page['names'])} 帧)")
+        self.page_combo.blockSignals(False)
+        if self.pages:
+            self.open_page(0)
+        else:
+            self.info_label.setText("Atlas 中没有纹理页")
+
+    def clear_page(self):
+        """关闭当前纹理页的缓存读取器, 释放解码的瓦片和缩略图"""
+        self.pending.clear()
+        self.loader.clear()
+        self.loader.waitForDone()
+        for reader in (self.tiles, self.thumbs):
+            if reader is not None:
+                reader.close()
+        self.tiles = self.thumbs = None
+        self.tile_cache.clear()
+        self.thumb_cache.clear()
+        self.frame_model.set_names([])
+        self.page_item.set_page((1, 1), np.zeros(0, dtype=RECT_DTYPE))
+
+    def open_page(self, index):
+        if not 0 <= index < len(self.pages):
+            return
+        self.generation += 1
+        self.clear_page()
+        page = self.pages[index]
+        # 帧轮廓和名称立即显示, 纹理在后台生成瓦片
+        self.page_item.set_page(page['size'], page['rects'])
+        self.frame_model.set_names(page['names'])
+        self.page_view.fit()
+        self.page_info = (f"{page['png']}\n{page['size'][0]} x {page['size'][1]}"
+                          f"{'  PMA' if page['pma'] else ''}\n{len(page['names'])} 帧")
+        self.info_label.setText(f"{self.page_info}\n正在生成瓦片...")
+        generation = self.generation
+        future = self._submit(build_page_cache, page['path'], self.root, page['rects'])
+        future.add_done_callback(lambda f: self._emit(self.signals.built, generation, f, {'page': page['path']}))
+
+    def on_built(self, generation, result):
+        if generation != self.generation:
+            return
+        page = self.pages[self.page_combo.currentIndex()] if self.page_combo.currentIndex() >= 0 else None
+        if not result['ok']:
+            text = f"无法显示纹理: {result['error']}"
+            self.info_label.setText(f"{self.page_info}\n{text}")
+            self.status.emit(text)
+            return
+        try:
+            self.tiles = PackReader(result['tiles'])
+            self.thumbs = PackReader(result['thumbs'])
+        except (OSError, ValueError) as e:
+            self.status.emit(f"读取缩略图缓存失败: {str(e)}")
+            return
+        size = result['size']
+        if page is not None and tuple(size) != tuple(page['size']):
+            self.info_label.setText(f"{self.page_info}\n纹理实际尺寸 {size[0]} x {size[1]}")
+        else:
+            self.info_label.setText(self.page_info)
+        self.page_item.set_levels(size, result['levels'])
+        self.page_view.fit()
+        self.frame_model.refresh()
+
+    def _request(self, reader, index, key):
+        if key in self.pending:
+            return
+        self.pending.add(key)
+        self.loader.start(_Decode(reader, index, key, self.signals))
+
+    def cached_tile(self, level, column, row):
+        return self.tile_cache.get((self.generation, 'tile', level, column, row)) is not None
+
+    def tile(self, level, column, row):
+        """已解码的瓦片; 未解码时在后台解码并返回 None"""
+        key = (self.generation, 'tile', level, column, row)
+        pixmap = self.tile_cache.get(key)
+        if pixmap is None and self.tiles is not None:
+            width, height = self.page_item.size
+            self._request(self.tiles, tile_index(width, height, level, column, row), key)
+        return pixmap
+
+    def thumbnail(self, row):
+        """帧缩略图; 未解码时在后台解码并先返回占位图"""
+        key = (self.generation, 'thumb', row)
+        pixmap = self.thumb_cache.get(key)
+        if pixmap is None:
+            if self.thumbs is not None and row < len(self.thumbs):
+                self._request(self.thumbs, row, key)
+            return self.placeholder
+        return pixmap
+
+    def on_loaded(self, key, image):
+        self.pending.discard(key)
+        if key[0] != self.generation or image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        if key[1] == 'tile':
+            self.tile_cache.put(key, pixmap)
+            _, _, level, column, row = key
+            span = TILE_SIZE * (1 << level)
+            self.page_item.update(QRectF(column * span, row * span, span, span))
+        else:
+            self.thumb_cache.put(key, pixmap)
+            self.frame_model.refresh(key[2])
+
+    def select_frame(self, row):
+        """在页面上单击帧 - 在列表中选中 (被搜索过滤时清除搜索)"""
+        self.page_item.select(row)
+        if row < 0:
+            return
+        index = self.frame_proxy.mapFromSource(self.frame_model.index(row))
+        if not index.isValid():
+            self.search_input.clear()
+            index = self.frame_proxy.mapFromSource(self.frame_model.index(row))
+        self.frame_view.selectionModel().blockSignals(True)
+        self.frame_view.setCurrentIndex(index)
+        self.frame_view.selectionModel().blockSignals(False)
+        self.frame_view.scrollTo(index)
+
+    def on_frame_current(self, current, previous):
+        row = self.frame_proxy.mapToSource(current).row()
+        if row < 0:
+            return
+        self.page_item.select(row)
+        x, y, w, h = self.page_item.rects[row]
+        self.page_view.show_rect(QRectF(float(x), float(y), float(w), float(h)))
+
+    def shutdown(self):
+        """关闭进程池和解码线程"""
+        self.generation += 1
+        self.loader.clear()
+        self.loader.waitForDone()
+        for reader in (self.tiles, self.thumbs):
+            if reader is not None:
+                reader.close()
+        self.tiles = self.thumbs = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,937 @@
+"""SpineAtlas Tool 命令行入口 - 不依赖 Qt, 用于 CI 流水线
+
+用法: python AtlasEXCLI.py <命令> [选项] 输入...
+输入可以是文件, 目录, 通配符或 .zip 压缩包; 重量级模块按命令延迟导入.
+"""
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+def _anchor(value):
+    """解析锚点 - 名称 (TOP_LEFT / top-left) 或数值 1-9"""
+    from SpineAtlas import Anchor
+    try:
+        return Anchor(int(value)).value
+    except ValueError:
+        pass
+    try:
+        return Anchor[value.upper().replace("-", "_").replace(" ", "_")].value
+    except KeyError:
+        raise argparse.ArgumentTypeError(f"未知锚点: {value}")
+
+def _step(value):
+    """解析流水线步骤 - convert:4.0 / rescale / cut:TOP_LEFT / offset:5"""
+    name, _, arg = value.partition(":")
+    name = name.strip().lower()
+    if name == "convert":
+        if arg not in ("", "4.0", "3.0"):
+            raise argparse.ArgumentTypeError(f"未知格式: {arg}")
+        return ['convert', {'version': arg != "3.0"}]
+    if name == "rescale" and not arg:
+        return ['rescale', {}]
+    if name in ("cut", "offset") and arg:
+        return [f"{name}_anchor", {'anchor': _anchor(arg)}]
+    raise argparse.ArgumentTypeError(f"无效步骤: {value}")
+
+def _print_result(args, result, text):
+    """非 JSON 模式下逐行输出"""
+    if not args.json:
+        print(text, file=sys.stdout if result.get('ok') else sys.stderr)
+
+def _write_members(args, results):
+    """把输出到压缩包成员的结果 (结果中的 'data') 写入新压缩包"""
+    from AtlasEXZip import write_archives
+    members = {}
+    for r in results:
+        if 'data' in r:
+            members[r['output']] = r.pop('data')
+    if not members:
+        return
+    try:
+        for archive in write_archives(members):
+            if not args.json:
+                print(f"已写入压缩包: {archive}")
+    except Exception as e:
+        print(f"写入压缩包失败: {e}", file=sys.stderr)
+        for r in results:
+            if r.get('output') in members:
+                r.update(ok=False, error=str(e))
+
+def _run_report(args, command, results, summary):
+    """写入 JSONL 运行报告 (每个文件的操作, 状态, 耗时和错误)"""
+    from AtlasEXLog import run_report_path, write_run_report
+    if args.no_run_report:
+        return
+    path = args.run_report or run_report_path([r['file'] for r in results], command)
+    if path is None:
+        return
+    try:
+        write_run_report(path, command, results, summary, args.started)
+    except OSError as e:
+        print(f"写入运行报告失败: {e}", file=sys.stderr)
+
+def _timings(args, results, summary):
+    """汇总阶段耗时的百分位数, 按选项输出表格, Chrome Trace 和 cProfile 结果"""
+    from AtlasEXProfile import Profiler, format_percentiles, merge_profiles
+    profiler = Profiler(args.clock)
+    for r in results:
+        profiler.add(r)
+    stats = profiler.percentiles()
+    if stats:
+        summary['timings'] = stats
+    if args.timings and not args.json:
+        files_rate, mb_rate = profiler.throughput()
+        for line in format_percentiles(stats):
+            print(line)
+        print(f"吞吐量: {files_rate:.1f} 文件/秒, {mb_rate:.2f} MB/秒")
+    if args.trace:
+        profiler.write_trace(args.trace)
+        if not args.json:
+            print(f"Trace 已保存到: {args.trace} (可用 chrome://tracing 或 Perfetto 打开)")
+    if args.profile:
+        merged = merge_profiles(args.profile)
+        if merged and not args.json:
+            print(f"cProfile 结果已保存到: {merged}")
+
+def _finish(args, command, results, summary):
+    """输出汇总并返回退出码"""
+    _write_members(args, results)
+    failed = sum(1 for r in results if not r.get('ok'))
+    summary = dict(summary, total=len(results), failed=failed)
+    _timings(args, results, summary)
+    _run_report(args, command, results, summary)
+    if args.json:
+        for r in results:
+            r.pop('cache', None)
+            r.pop('phases', None)
+        print(json.dumps({'command': command, 'summary': summary, 'results': results},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(f"完成! 成功: {len(results) - failed}/{len(results)}")
+    return 1 if failed else 0
+
+def _filters(args, pattern):
+    """包含/排除规则 - Atlas 默认排除批处理生成的 *_modified.atlas"""
+    from AtlasEXDiscover import parse_patterns, DEFAULT_EXCLUDE
+    include = parse_patterns(args.include) or (pattern,)
+    if args.exclude is None:
+        exclude = DEFAULT_EXCLUDE if pattern == "*.atlas" else ()
+    else:
+        exclude = parse_patterns(args.exclude)
+    return include, exclude
+
+def _inputs(args, pattern="*.atlas"):
+    from AtlasEXCore import expand_inputs
+    include, exclude = _filters(args, pattern)
+    files = expand_inputs(args.inputs, args.recursive, pattern, exclude, include)
+    if not files:
+        print("没有找到任何输入文件", file=sys.stderr)
+    if getattr(args, 'queue', None):
+        # 队列中的路径由其他机器读取, 统一为绝对路径
+        files = [os.path.abspath(f) for f in files]
+    return files
+
+def _batch(args, func, files, task_args):
+    """在本机进程池中运行, 指定 --queue 时改为通过共享目录中的队列运行 (可由多台机器的 worker 分担)"""
+    if getattr(args, 'queue', None):
+        from AtlasEXQueue import queue_batch, task_name
+        return queue_batch(files, os.path.abspath(args.queue), task_name(func), task_args, args.shard_size,
+                           args.lease, args.jobs)
+    from AtlasEXCore import iter_batch
+    return iter_batch(func, files, task_args, args.jobs)
+
+def _modify(args, command, operation, params):
+    """运行修改 Atlas 的操作 - 每个文件读取和写入一次"""
+    from AtlasEXWriter import source_root
+    if args.watch and args.queue:
+        print("--watch 不能与 --queue 一起使用", file=sys.stderr)
+        return 2
+    files = _inputs(args)
+    if not files:
+        return 2
+    root = source_root(files)
+    code, outputs = _modify_files(args, command, operation, params, files, root)
+    if args.watch:
+        return _watch(args, command, operation, params, root, outputs)
+    return code
+
+def _modify_files(args, command, operation, params, files, root):
+    """对 files 运行一次修改操作, 返回 (退出码, 输出文件)"""
+    from AtlasEXCore import process_batch_file
+    from AtlasEXCache import manifest_path, save_manifest
+    from AtlasEXWriter import exclude_outputs, find_conflicts, sync_files
+    output_root = None if args.overwrite else args.output_root
+    if output_root and args.queue:
+        output_root = os.path.abspath(output_root)
+    files, excluded = exclude_outputs(files, args.overwrite, args.suffix, output_root, root)
+    for f in excluded:
+        if not args.json:
+            print(f"跳过上次的输出: {f}")
+    conflicts = find_conflicts(files, args.overwrite, args.suffix, output_root, root)
+    if conflicts:
+        for target, sources in conflicts.items():
+            print(f"输出冲突: {target} <- {', '.join(sources)}", file=sys.stderr)
+        return 2, []
+    manifest = manifest_path(files) if args.incremental else None
+    results = []
+    outputs = []
+    updates = {}
+    for result in _batch(args, process_batch_file, files,
+                         (operation, params, args.overwrite, args.suffix, manifest,
+                          output_root, root, args.dry_run)):
+        name = Path(result['file']).name
+        if result.get('cache'):
+            key, record = result['cache']
+            updates[key] = record
+        if result.get('skipped'):
+            _print_result(args, result, f"跳过未变化: {name}")
+        elif 'diff' in result:
+            _print_result(args, result, result['diff'] or f"无变化: {name}")
+        elif result['ok']:
+            outputs.append(result['output'])
+            _print_result(args, result, f"保存为: {result['output']}")
+        else:
+            _print_result(args, result, f"处理失败 {name}: {result['error']}")
+        results.append(result)
+    if manifest and updates:
+        save_manifest(manifest, updates)
+    if outputs and not args.no_fsync:
+        for path, error in sync_files(outputs):
+            print(f"同步到磁盘失败 {path}: {error}", file=sys.stderr)
+    skipped = sum(1 for r in results if r.get('skipped'))
+    changed = sum(1 for r in results if r.get('diff'))
+    summary = {'skipped': skipped, 'changed': changed} if args.dry_run else {'skipped': skipped}
+    return _finish(args, command, results, summary), outputs
+
+def _watch(args, command, operation, params, root, outputs):
+    """监视输入目录, 对变化的 Atlas 重新运行操作, Ctrl+C 退出"""
+    import time
+    from AtlasEXDiscover import PollWatcher
+    roots = [i for i in args.inputs if Path(i).is_dir()]
+    if not roots:
+        print("--watch 需要目录作为输入", file=sys.stderr)
+        return 2
+    watcher = PollWatcher(roots, args.recursive, *_filters(args, "*.atlas"))
+    watcher.poll()
+    watcher.refresh(outputs)
+    print(f"开始监视: {', '.join(roots)} (Ctrl+C 退出)", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(args.watch)
+            changed = watcher.poll()
+            if changed:
+                print(f"检测到 {len(changed)} 个 Atlas 发生变化", file=sys.stderr)
+                _, outputs = _modify_files(args, command, operation, params, changed, root)
+                watcher.refresh(outputs)
+    except KeyboardInterrupt:
+        return 0
+
+def cmd_convert(args):
+    return _modify(args, 'convert', 'convert', {'version': args.to == '4.0'})
+
+def cmd_rescale(args):
+    return _modify(args, 'rescale', 'rescale', {})
+
+def cmd_anchor(args):
+    steps = []
+    if args.cut is not None:
+        steps.append(('cut_anchor', {'anchor': args.cut}))
+    if args.offset is not None:
+        steps.append(('offset_anchor', {'anchor': args.offset}))
+    if not steps:
+        print("需要指定 --cut 或 --offset", file=sys.stderr)
+        return 2
+    if len(steps) == 1:
+        return _modify(args, 'anchor', *steps[0])
+    # 同时指定时合并为一个流水线, 每个文件只读取和写入一次
+    return _modify(args, 'anchor', 'pipeline', {'steps': steps})
+
+def cmd_pipeline(args):
+    from AtlasEXCore import load_preset, save_preset
+    steps = []
+    if args.preset:
+        try:
+            _, steps = load_preset(args.preset)
+        except Exception as e:
+            print(f"载入预设失败: {e}", file=sys.stderr)
+            return 2
+    steps += args.step or []
+    if not steps:
+        print("需要指定 --preset 或 --step", file=sys.stderr)
+        return 2
+    if args.save_preset:
+        save_preset(args.save_preset, steps, Path(args.save_preset).stem)
+    return _modify(args, 'pipeline', 'pipeline', {'steps': steps})
+
+def cmd_check(args):
+    from AtlasEXCore import check_file
+    files = _inputs(args)
+    if not files:
+        return 2
+    results = []
+    for result in _batch(args, check_file, files, ()):
+        name = Path(result['file']).name
+        if not result['ok']:
+            _print_result(args, result, f"检查 {name} 失败: {result['error']}")
+        elif result['missing']:
+            _print_result(args, result, f"{name} 缺失 {len(result['missing'])} 个纹理:")
+            for texture in result['missing']:
+                _print_result(args, result, f" - {texture}")
+        results.append(result)
+    missing = sum(len(r['missing']) for r in results)
+    code = _finish(args, 'check', results, {'missing': missing})
+    return code or (1 if missing else 0)
+
+def cmd_verify(args):
+    from AtlasEXVerify import verify_textures
+    files = _inputs(args)
+    if not files:
+        return 2
+    roots = args.roots or [i for i in args.inputs if Path(i).is_dir()] or None
+    report = verify_textures(files, roots, args.threads)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.json:
+        print(json.dumps({'command': 'verify', 'report': report}, ensure_ascii=False, indent=2))
+    else:
+        for item in report['missing']:
+            print(f"缺失纹理: {item['texture']}", file=sys.stderr)
+            for atlas in item['atlases']:
+                print(f" - {atlas}", file=sys.stderr)
+        for item in report['mismatched']:
+            print(f"尺寸不一致: {item['texture']} 声明 {item['declared'][0]}x{item['declared'][1]}, "
+                  f"实际 {item['actual'][0]}x{item['actual'][1]} ({item['atlas']})", file=sys.stderr)
+        for orphan in report['orphans']:
+            print(f"孤立 PNG: {orphan}")
+        for item in report['errors']:
+            print(f"读取失败 {item['file']}: {item['error']}", file=sys.stderr)
+        print(f"完成! {report['atlases']} 个 Atlas, {report['textures']} 个纹理页, "
+              f"缺失: {len(report['missing'])}, 尺寸不一致: {len(report['mismatched'])}, "
+              f"孤立 PNG: {len(report['orphans'])}")
+    problems = report['missing'] or report['mismatched'] or report['errors']
+    return 1 if problems or (args.strict and report['orphans']) else 0
+
+def _encoder(args):
+    """检查 --encoder, 无效时返回 False"""
+    from AtlasEXEncode import parse_encoder
+    try:
+        for spec in (args.encoder if isinstance(args.encoder, list) else [args.encoder]):
+            if spec is not None:
+                parse_encoder(spec)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return False
+    return True
+
+def cmd_export(args):
+    if not _encoder(args):
+        return 2
+    if (args.no_pipeline or args.queue) and args.encoder:
+        print("--encoder 需要流水线导出, 不能与 --no-pipeline 或 --queue 一起使用", file=sys.stderr)
+        return 2
+    files = _inputs(args)
+    if not files:
+        return 2
+    if args.no_pipeline or args.queue:
+        # 队列按文件分片, 每个文件单独调用 SaveFrames
+        from AtlasEXCore import export_file
+        output = os.path.abspath(args.output) if args.queue else args.output
+        stream = _batch(args, export_file, files, (output, args.mode))
+    else:
+        from AtlasEXExport import export_frames_pipeline
+        stream = export_frames_pipeline(files, args.output, args.mode, args.encoder, args.jobs,
+                                        args.memory_limit * 1024 * 1024)
+    results = []
+    for result in stream:
+        name = Path(result['file']).name
+        if result['ok']:
+            _print_result(args, result, f"成功导出 {name} 的帧")
+        else:
+            _print_result(args, result, f"导出 {name} 失败: {result['error']}")
+        results.append(result)
+    return _finish(args, 'export', results, {})
+
+def cmd_resample(args):
+    from AtlasEXResample import resample_atlases
+    files = _inputs(args)
+    if not files:
+        return 2
+    results = []
+    for result in resample_atlases(files, args.output, args.scale, args.filter, args.jobs):
+        name = Path(result['file']).name
+        if result['ok']:
+            _print_result(args, result, f"已重采样 {name} 的 {result['pages']} 个纹理页, 保存为: {result['output']}")
+        else:
+            _print_result(args, result, f"重采样 {name} 失败: {result['error']}")
+        results.append(result)
+    return _finish(args, 'resample', results, {})
+
+def cmd_trim(args):
+    from AtlasEXTrim import trim_atlases
+    files = _inputs(args)
+    if not files:
+        return 2
+    results = []
+    for result in trim_atlases(files, args.output, not args.no_trim, args.bleed, args.threshold, args.jobs):
+        name = Path(result['file']).name
+        if result['ok']:
+            _print_result(args, result, f"已处理 {name}: 收紧 {result['trimmed']}/{result['frames']} 帧, "
+                                        f"节省 {result['area_saved']} 像素, 扩展 {result['bled']} 像素, "
+                                        f"保存为: {result['output']}")
+        else:
+            _print_result(args, result, f"处理 {name} 失败: {result['error']}")
+        results.append(result)
+    area_before = sum(r.get('area_before', 0) for r in results if r['ok'])
+    area_saved = sum(r.get('area_saved', 0) for r in results if r['ok'])
+    if not args.json:
+        print(f"帧面积 {area_before} -> {area_before - area_saved} 像素, 节省 {area_saved} "
+              f"({area_saved / max(1, area_before):.1%})")
+    return _finish(args, 'trim', results, {'area_before': area_before, 'area_saved': area_saved})
+
+def _repack_text(report):
+    before, after = report['before'], report['after']
+    return (f"{report['frames']} 帧, 纹理页 {before['pages']} -> {after['pages']}, "
+            f"占用率 {before['occupancy']:.1%} -> {after['occupancy']:.1%}, 装箱 {report['pack_seconds']:.3f}s")
+
+def cmd_repack(args):
+    files = _inputs(args)
+    if not files:
+        return 2
+    options = (args.max_size, args.padding, not args.no_trim, not args.no_rotate, args.heuristic, args.pot)
+    results = []
+    if args.merge:
+        from AtlasEXPack import repack
+        result = {'file': args.output, 'ok': False, 'output': args.output, 'error': None, 'report': None}
+        try:
+            result['report'] = repack(files, args.output, *options)
+            result['ok'] = True
+            _print_result(args, result, f"已合并 {len(files)} 个 Atlas 到 {args.output}: {_repack_text(result['report'])}")
+        except Exception as e:
+            result['error'] = str(e)
+            _print_result(args, result, f"合并失败: {e}")
+        results.append(result)
+    else:
+        from AtlasEXCore import iter_batch
+        from AtlasEXPack import repack_file
+        from AtlasEXWriter import source_root
+        for result in iter_batch(repack_file, files, (args.output, source_root(files)) + options, args.jobs):
+            name = Path(result['file']).name
+            if result['ok']:
+                _print_result(args, result, f"已重新打包 {name}: {_repack_text(result['report'])}")
+            else:
+                _print_result(args, result, f"重新打包 {name} 失败: {result['error']}")
+            results.append(result)
+    return _finish(args, 'repack', results, {})
+
+def cmd_dedup(args):
+    from AtlasEXDedup import find_duplicates, apply_dedup
+    files = _inputs(args)
+    if not files:
+        return 2
+    report = find_duplicates(files, args.jobs)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    applied = None
+    if args.apply and report['groups']:
+        output_root = None if args.overwrite else args.output_root
+        try:
+            applied = apply_dedup(report, args.shared, args.overwrite, args.suffix, output_root,
+                                  max_size=args.max_size, padding=args.padding)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    if args.json:
+        print(json.dumps({'command': 'dedup', 'report': report, 'applied': applied}, ensure_ascii=False, indent=2))
+    else:
+        for item in report['errors']:
+            print(f"读取失败 {item['file']}: {item['error']}", file=sys.stderr)
+        for group in report['groups']:
+            w, h = group['size']
+            print(f"{w}x{h} 重复 {group['count']} 次, 浪费 {group['wasted_bytes']} 字节:")
+            for item in group['frames']:
+                print(f" - {item['atlas']} [{item['page']}] {item['frame']}")
+        print(f"完成! {report['frames']} 帧 (解码 {report['hashed']}), 重复组: {len(report['groups'])}, "
+              f"多余副本: {report['duplicates']}, 浪费: {report['wasted_bytes']} 字节")
+        if applied is not None:
+            for shared in applied['shared']:
+                print(f"共享纹理页: {shared}")
+            for output in applied['outputs']:
+                print(f"已改写: {output}")
+    return 1 if report['errors'] else 0
+
+def cmd_prune(args):
+    from AtlasEXPrune import prune_atlases
+    files = _inputs(args)
+    if not files:
+        return 2
+    compact = args.compact
+    apply = args.apply or compact
+    output_root = None if args.overwrite else args.output_root
+    results = []
+    for result in prune_atlases(files, args.skeleton, apply, compact, args.overwrite, args.suffix, output_root,
+                                args.max_size, args.padding, args.jobs):
+        name = Path(result['file']).name
+        if not result['ok']:
+            _print_result(args, result, f"清理 {name} 失败: {result['error']}")
+        else:
+            text = (f"{name}: 未引用 {len(result['unused'])}/{result['frames']} 帧, {result['unused_area']} 像素, "
+                    f"可删除纹理页 {result['pages_removed']}/{result['pages']}")
+            if result['compacted']:
+                text += f", 重新打包: {_repack_text(result['compacted'])}"
+            if result['pages_deleted']:
+                text += f", 删除旧纹理页 {len(result['pages_deleted'])}"
+            if result['output']:
+                text += f", 保存为: {result['output']}"
+            _print_result(args, result, text)
+            if not args.json:
+                for frame in result['unused']:
+                    print(f" - {frame}")
+        results.append(result)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    ok = [r for r in results if r['ok']]
+    summary = {'frames': sum(r['frames'] for r in ok), 'unused': sum(len(r['unused']) for r in ok),
+               'unused_area': sum(r['unused_area'] for r in ok)}
+    if not args.json:
+        print(f"未引用的帧: {summary['unused']}/{summary['frames']}, 面积 {summary['unused_area']} 像素")
+    return _finish(args, 'prune', results, summary)
+
+def cmd_json2atlas(args):
+    from AtlasEXCore import iter_batch, convert_json_file
+    files = _inputs(args, "*.json")
+    if not files:
+        return 2
+    if args.output and len(files) > 1:
+        print("多个输入时不能指定 --output", file=sys.stderr)
+        return 2
+    results = []
+    for result in iter_batch(convert_json_file, files, (args.output,), args.jobs):
+        name = Path(result['file']).name
+        if result.get('skipped'):
+            _print_result(args, result, f"跳过非纹理 JSON: {name}")
+        elif result['ok']:
+            _print_result(args, result, f"成功转换 {name} ({result['pages']} 个纹理页) 并保存到: {result['output']}")
+        else:
+            _print_result(args, result, f"转换 {name} 失败: {result['error']}")
+        results.append(result)
+    skipped = sum(1 for r in results if r.get('skipped'))
+    return _finish(args, 'json2atlas', results, {'skipped': skipped})
+
+def cmd_skel2json(args):
+    from AtlasEXCore import iter_batch
+    from AtlasEXSkel import skel_to_json_file, SKEL_PATTERNS
+    from AtlasEXWriter import source_root
+    if not args.include:
+        args.include = ";".join(SKEL_PATTERNS)
+    files = _inputs(args, "*.skel")
+    if not files:
+        return 2
+    root = source_root(files) if args.output else None
+    results = []
+    for result in iter_batch(skel_to_json_file, files, (args.output, root, args.indent), args.jobs):
+        name = Path(result['file']).name
+        if result['ok']:
+            _print_result(args, result, f"成功转换 {name} (Spine {result['version']}) 并保存到: {result['output']}")
+        else:
+            _print_result(args, result, f"转换 {name} 失败: {result['error']}")
+        results.append(result)
+    return _finish(args, 'skel2json', results, {})
+
+def cmd_premul(args):
+    from AtlasEXCore import iter_batch
+    from AtlasEXImage import collect_atlas_pages, process_image_into
+    from AtlasEXWriter import source_root
+    if not _encoder(args):
+        return 2
+    if args.pages:
+        images = collect_atlas_pages(_inputs(args))
+    else:
+        images = _inputs(args, "*.png")
+    if not images:
+        return 2
+    results = []
+    for result in iter_batch(process_image_into, images, (args.output, args.mode, source_root(images), args.encoder),
+                             args.jobs):
+        if result['ok']:
+            _print_result(args, result, f"成功处理图像并保存到: {result['output']}")
+        else:
+            _print_result(args, result, f"图像处理失败 {Path(result['file']).name}: {result['error']}")
+        results.append(result)
+    return _finish(args, 'premul', results, {})
+
+def cmd_encode(args):
+    from AtlasEXEncode import transcode_atlases, compare_encoders, summarize_encoders, format_encoders, encode_report
+    from AtlasEXImage import collect_atlas_pages
+    encoders = args.encoder or ["png"]
+    if not _encoder(args):
+        return 2
+    if not args.compare and (len(encoders) > 1 or not args.output):
+        print("写入输出需要 -o 和唯一的 --encoder; 比较多个编码器请使用 --compare", file=sys.stderr)
+        return 2
+    files = _inputs(args)
+    if not files:
+        return 2
+    if args.compare:
+        # 只在内存中编码, 不写入任何文件
+        results = []
+        for result in compare_encoders(collect_atlas_pages(files), encoders, args.jobs):
+            if not result['ok']:
+                _print_result(args, result, f"编码 {Path(result['file']).name} 失败: {result['error']}")
+            results.append(result)
+        rows = summarize_encoders(results)
+        report = {'encoders': rows, 'files': results}
+        if not args.json:
+            for line in format_encoders(rows):
+                print(line)
+    else:
+        results = []
+        for result in transcode_atlases(files, args.output, encoders[0], args.jobs):
+            name = Path(result['file']).name
+            if result['ok']:
+                _print_result(args, result, f"已编码 {name} 的 {len(result['pages'])} 个纹理页: "
+                                            f"{result['bytes']} -> {result['encoded_bytes']} 字节, "
+                                            f"编码 {result['encode_seconds']:.2f}s, 保存为: {result['output']}")
+            else:
+                _print_result(args, result, f"编码 {name} 失败: {result['error']}")
+            results.append(result)
+        report = dict(encode_report(results), encoder=encoders[0])
+        if not args.json:
+            print(f"纹理页 {report['bytes']} -> {report['encoded_bytes']} 字节, 节省 {report['saved']} "
+                  f"({report['saved'] / max(1, report['bytes']):.1%}), 编码 {report['encode_seconds']:.2f}s")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    summary = {key: report[key] for key in ('bytes', 'encoded_bytes', 'saved', 'encode_seconds') if key in report}
+    return _finish(args, 'encode', results, summary)
+
+def _queue_status_text(status):
+    return (f"{status['dir']}: {status['task']}, {status['done']}/{status['shards']} 个分片完成, "
+            f"进行中 {status['running']}, 租约过期 {status['expired']}, 待领取 {status['pending']}, "
+            f"失败文件 {status['failed']}, 其他工作者 {status['workers']}")
+
+def cmd_worker(args):
+    from AtlasEXQueue import serve, list_queues, queue_status
+    if not args.status:
+        results = []
+        for result in serve(args.queue, args.jobs, wait=not args.no_wait):
+            name = Path(result['file']).name
+            if result['ok']:
+                _print_result(args, result, f"完成: {name}")
+            else:
+                _print_result(args, result, f"处理失败 {name}: {result['error']}")
+            results.append(result)
+    statuses = [queue_status(run_dir) for run_dir in list_queues(args.queue)]
+    if args.json:
+        output = {'command': 'worker', 'queues': statuses}
+        if not args.status:
+            output['results'] = results
+        print(json.dumps(output, ensure_ascii=False, indent=2))
+    else:
+        for status in statuses:
+            print(_queue_status_text(status))
+        if not args.status:
+            print(f"本工作者处理了 {len(results)} 个文件, 失败: {sum(1 for r in results if not r['ok'])}")
+    if args.status:
+        return 0
+    return 1 if any(not r['ok'] for r in results) else 0
+
+def _index_file(args):
+    """索引位置 - 默认为唯一的输入目录, 否则为输入文件的公共目录"""
+    from AtlasEXIndex import INDEX_NAME
+    if args.index:
+        return args.index
+    if len(args.inputs) == 1 and Path(args.inputs[0]).is_dir():
+        return str(Path(args.inputs[0]).joinpath(INDEX_NAME))
+    return None
+
+def cmd_index(args):
+    from AtlasEXIndex import update_index, open_index, index_path
+    path = _index_file(args)
+    if not args.no_update:
+        files = _inputs(args)
+        if not files:
+            return 2
+        report = update_index(files, path, args.jobs)
+        path = report['index']
+        for item in report['errors']:
+            print(f"解析失败 {item['file']}: {item['error']}", file=sys.stderr)
+        if not args.json:
+            print(f"索引已更新: {path} ({report['atlases']} 个 Atlas, {report['frames']} 帧; "
+                  f"解析 {report['parsed']}, 复用 {report['reused']}, 移除 {report['removed']})")
+    else:
+        report = None
+        path = path or index_path(_inputs(args))
+    index = open_index(path) if path else None
+    if index is None:
+        print(f"无法打开索引: {path}", file=sys.stderr)
+        return 2
+    with index:
+        matches = []
+        for name in args.find or []:
+            found = index.find(name)
+            if not found:
+                print(f"没有找到区域: {name}", file=sys.stderr)
+            matches.extend(found)
+        if args.min_size is not None:
+            # 同时指定 --find 时作为过滤条件
+            if args.find:
+                matches = [m for m in matches if max(m['size']) > args.min_size]
+            else:
+                matches = index.frames_larger(args.min_size)
+        stale = index.stale() if args.no_update else []
+    if args.json:
+        print(json.dumps({'command': 'index', 'report': report, 'stale': stale, 'matches': matches},
+                         ensure_ascii=False, indent=2))
+    else:
+        for item in matches:
+            print(f"{item['frame']}: {item['atlas']} [{item['page']}] "
+                  f"{item['size'][0]}x{item['size'][1]} @ {item['xy'][0]},{item['xy'][1]}")
+        for file_path in stale:
+            print(f"索引已过期: {file_path}", file=sys.stderr)
+    return 1 if report and report['errors'] else 0
+
+def cmd_bench(args):
+    from AtlasEXBench import (generate_tree, run_benchmarks, save_results, load_results, compare_results,
+                              format_results, format_comparison, tree_config)
+    import tempfile
+    import shutil
+    try:
+        config = tree_config(atlases=args.atlases, pages=args.pages, page_size=args.page_size, frames=args.frames,
+                             rotate=args.rotate, pma=args.pma, legacy=args.legacy, seed=args.seed)
+    except ValueError as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+    root = args.root or tempfile.mkdtemp(prefix="atlasex_tree_")
+    try:
+        if not args.json:
+            print(f"生成合成 Atlas 目录: {root}")
+        tree = generate_tree(root, config)
+        if not args.json:
+            print(f"{len(tree['atlases'])} 个 Atlas, {len(tree['pages'])} 个纹理页, {tree['frames']} 个帧")
+        progress = None if args.json else lambda i, n, name: print(f"[{i + 1}/{n}] {name}", flush=True)
+        only = [p.strip() for p in args.only.split(";") if p.strip()] if args.only else None
+        results = run_benchmarks(tree, args.repeat, only, args.gui, args.jobs, args.sample, progress=progress)
+    finally:
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+    if args.output:
+        save_results(args.output, results)
+    comparison = None
+    if args.baseline:
+        comparison = compare_results(results, load_results(args.baseline), args.threshold)
+    if args.json:
+        print(json.dumps({'command': 'bench', 'results': results, 'comparison': comparison},
+                         ensure_ascii=False, indent=2))
+    else:
+        for line in format_results(results):
+            print(line)
+        if args.output:
+            print(f"结果已保存到: {args.output}")
+        if comparison is not None:
+            for line in format_comparison(comparison):
+                print(line)
+            if comparison['regressions']:
+                print(f"性能退化: {', '.join(comparison['regressions'])}")
+    failed = any('error' in r for r in results['benchmarks'].values())
+    return 1 if failed or (comparison and comparison['regressions']) else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="atlas-tool", description="SpineAtlas 批处理工具")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="+", help="文件, 目录, 通配符或 .zip 压缩包 (成员写作 a.zip!/x.atlas)")
+    common.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数 (默认: CPU 核心数)")
+    common.add_argument("-r", "--recursive", action="store_true", help="目录和 ** 通配符包含子目录")
+    common.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    common.add_argument("--include", help="目录中要处理的文件 (通配符, 以分号分隔)")
+    common.add_argument("--exclude", help="排除的文件/目录 (通配符, 以分号分隔; Atlas 默认: *_modified.atlas)")
+    common.add_argument("--run-report", help="JSONL 运行报告路径 (默认: 输入目录下的 .atlasex_runs/)")
+    common.add_argument("--no-run-report", action="store_true", help="不写入运行报告")
+    common.add_argument("--timings", action="store_true", help="输出各阶段耗时的百分位数和吞吐量")
+    common.add_argument("--trace", help="保存 Chrome Trace / Perfetto JSON")
+    common.add_argument("--profile", metavar="DIR", help="用 cProfile 分析本次运行 (包括工作进程), 结果保存到目录")
+
+    modify = argparse.ArgumentParser(add_help=False)
+    modify.add_argument("--overwrite", action="store_true", help="覆盖原文件")
+    modify.add_argument("--suffix", default="_modified", help="输出文件后缀 (默认: _modified)")
+    modify.add_argument("--incremental", action="store_true", help="按清单跳过未变化的文件")
+    modify.add_argument("--output-root", help="输出目录, 按输入的目录结构镜像 (默认: 保存在源文件旁边)")
+    modify.add_argument("--dry-run", action="store_true", help="只输出差异, 不写入文件")
+    modify.add_argument("--no-fsync", action="store_true", help="结束时不批量同步到磁盘")
+    modify.add_argument("--watch", type=float, metavar="SECONDS", help="处理后监视输入目录, 按间隔轮询并处理变化的文件")
+
+    queued = argparse.ArgumentParser(add_help=False)
+    queued.add_argument("--queue", metavar="DIR",
+                        help="通过共享目录中的队列运行, 其他机器用 worker 命令加入; 中断后重新运行同样的命令继续")
+    queued.add_argument("--shard-size", type=int, default=32, help="每个分片的文件数 (默认: 32)")
+    queued.add_argument("--lease", type=float, default=60.0, help="分片租约 (秒), 超时未续期的分片由其他工作者接管")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", parents=[common, modify, queued], help="转换 Atlas 格式")
+    p.add_argument("--to", choices=["4.0", "3.0"], default="4.0", help="目标格式")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("rescale", parents=[common, modify, queued], help="按纹理尺寸重新缩放")
+    p.set_defaults(func=cmd_rescale)
+
+    p = sub.add_parser("anchor", parents=[common, modify, queued], help="重新计算裁剪/偏移锚点")
+    p.add_argument("--cut", type=_anchor, help="裁剪锚点")
+    p.add_argument("--offset", type=_anchor, help="偏移锚点")
+    p.set_defaults(func=cmd_anchor)
+
+    p = sub.add_parser("pipeline", parents=[common, modify, queued], help="按顺序应用多个操作, 每个文件只读写一次")
+    p.add_argument("--preset", help="流水线预设 (JSON)")
+    p.add_argument("--step", type=_step, action="append",
+                   help="追加步骤: convert[:4.0|3.0], rescale, cut:<锚点>, offset:<锚点> (可重复)")
+    p.add_argument("--save-preset", help="将步骤保存为预设")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("check", parents=[common, queued], help="检查缺失纹理")
+    p.set_defaults(func=cmd_check)
+
+    p = sub.add_parser("verify", parents=[common], help="校验纹理缺失, 尺寸和孤立 PNG (只读取文件头)")
+    p.add_argument("--roots", nargs="+", help="查找孤立 PNG 的根目录 (默认: 输入中的目录)")
+    p.add_argument("--threads", type=int, default=32, help="I/O 线程数 (默认: 32)")
+    p.add_argument("--report", help="保存 JSON 报告")
+    p.add_argument("--strict", action="store_true", help="存在孤立 PNG 时也返回非零退出码")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("export", parents=[common, queued], help="导出帧")
+    p.add_argument("-o", "--output", required=True, help="导出目录")
+    p.add_argument("--mode", choices=["Normal", "Premul", "NonPremul"], default="Normal")
+    p.add_argument("--no-pipeline", action="store_true", help="逐个 Atlas 调用 SaveFrames")
+    p.add_argument("--memory-limit", type=int, default=1024, help="流水线内存上限 (MB)")
+    p.add_argument("--encoder", help="帧的编码器, 例如 png:level=1 / webp (默认: png)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("worker", help="加入共享目录中的队列, 处理未完成的分片")
+    p.add_argument("queue", help="队列目录 (与 --queue 相同)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数 (默认: CPU 核心数)")
+    p.add_argument("--no-wait", action="store_true", help="没有可领取的分片时立即退出, 不等待其他工作者")
+    p.add_argument("--status", action="store_true", help="只输出各队列的进度")
+    p.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser("resample", parents=[common], help="重采样纹理页并写入对应的 Atlas")
+    p.add_argument("-o", "--output", required=True, help="输出目录 (按输入的目录结构镜像)")
+    p.add_argument("--scale", type=float, default=0.5, help="缩放比例 (默认: 0.5)")
+    p.add_argument("--filter", choices=["Lanczos", "Bicubic", "Hamming", "Bilinear", "Box", "Nearest"],
+                   default="Lanczos", help="重采样滤镜")
+    p.set_defaults(func=cmd_resample)
+
+    p = sub.add_parser("trim", parents=[common], help="收紧帧的透明边框, 把边缘颜色扩展到透明像素")
+    p.add_argument("-o", "--output", required=True, help="输出目录 (按输入的目录结构镜像)")
+    p.add_argument("--no-trim", action="store_true", help="只扩展边缘颜色, 不收紧帧")
+    p.add_argument("--bleed", type=int, default=8, help="边缘颜色扩展的像素圈数, 0 为不扩展 (默认: 8)")
+    p.add_argument("--threshold", type=int, default=0, help="alpha 不大于此值的像素视为透明 (默认: 0)")
+    p.set_defaults(func=cmd_trim)
+
+    p = sub.add_parser("repack", parents=[common], help="重新装箱帧, 合并到更少更密的纹理页")
+    p.add_argument("-o", "--output", required=True,
+                   help="输出目录 (按输入的目录结构镜像); 使用 --merge 时为输出的 Atlas 文件")
+    p.add_argument("--merge", action="store_true", help="把所有输入合并为一个 Atlas")
+    p.add_argument("--max-size", type=int, default=2048, help="最大页尺寸 (默认: 2048)")
+    p.add_argument("--padding", type=int, default=2, help="帧间距 (默认: 2)")
+    p.add_argument("--no-trim", action="store_true", help="不裁掉透明边框")
+    p.add_argument("--no-rotate", action="store_true", help="不允许旋转帧")
+    p.add_argument("--heuristic", choices=["maxrects", "skyline"], default="maxrects", help="装箱算法")
+    p.add_argument("--pot", action="store_true", help="页尺寸取 2 的幂")
+    p.set_defaults(func=cmd_repack)
+
+    p = sub.add_parser("dedup", parents=[common], help="查找跨 Atlas 像素相同的帧, 可提取到共享纹理页")
+    p.add_argument("--report", help="保存 JSON 报告")
+    p.add_argument("--apply", action="store_true", help="把重复帧提取到共享纹理页并改写受影响的 Atlas")
+    p.add_argument("--shared", help="共享纹理页路径 (默认: 输出目录或输入公共目录下的 shared_frames.png)")
+    p.add_argument("--overwrite", action="store_true", help="覆盖原 Atlas")
+    p.add_argument("--suffix", default="_modified", help="输出文件后缀 (默认: _modified)")
+    p.add_argument("--output-root", help="输出目录, 按输入的目录结构镜像 (默认: 保存在源文件旁边)")
+    p.add_argument("--max-size", type=int, default=2048, help="共享纹理页最大尺寸 (默认: 2048)")
+    p.add_argument("--padding", type=int, default=2, help="帧间距 (默认: 2)")
+    p.set_defaults(func=cmd_dedup)
+
+    p = sub.add_parser("prune", parents=[common], help="按骨骼 (.json / .skel) 引用的附件清理 Atlas 中未使用的帧")
+    p.add_argument("--skeleton", action="append",
+                   help="所有 Atlas 共用的骨骼文件 (可重复; 默认: 同名骨骼, 没有时为同一目录中的骨骼)")
+    p.add_argument("--apply", action="store_true", help="写入清理后的 Atlas (默认只报告)")
+    p.add_argument("--compact", action="store_true", help="清理后重新打包纹理页 (包含 --apply)")
+    p.add_argument("--overwrite", action="store_true", help="覆盖原 Atlas")
+    p.add_argument("--suffix", default="_modified", help="输出文件后缀 (默认: _modified)")
+    p.add_argument("--output-root", help="输出目录, 按输入的目录结构镜像 (默认: 保存在源文件旁边)")
+    p.add_argument("--max-size", type=int, default=2048, help="重新打包的最大页尺寸 (默认: 2048)")
+    p.add_argument("--padding", type=int, default=2, help="重新打包的帧间距 (默认: 2)")
+    p.add_argument("--report", help="保存 JSON 报告")
+    p.set_defaults(func=cmd_prune)
+
+    p = sub.add_parser("json2atlas", parents=[common], help="转换 JSON 到 Spine Atlas")
+    p.add_argument("-o", "--output", help="输出文件 (默认: 与 JSON 同名的 .atlas)")
+    p.set_defaults(func=cmd_json2atlas)
+
+    p = sub.add_parser("skel2json", parents=[common], help="转换二进制骨骼 (.skel) 到 JSON, 自动识别 Spine 版本")
+    p.add_argument("-o", "--output", help="输出目录, 按输入的目录结构镜像 (默认: 保存在源文件旁边)")
+    p.add_argument("--indent", type=int, default=None, help="JSON 缩进空格数 (默认: 紧凑输出)")
+    p.set_defaults(func=cmd_skel2json)
+
+    p = sub.add_parser("index", parents=[common], help="按 mtime 同步二进制区域索引, 并按名称或尺寸查询")
+    p.add_argument("--index", help="索引文件 (默认: 输入目录或输入公共目录下的 .atlasex_index.bin)")
+    p.add_argument("--find", action="append", metavar="NAME", help="查找区域所在的 Atlas, 支持通配符 (可重复)")
+    p.add_argument("--min-size", type=int, help="列出宽或高超过该像素数的区域 (与 --find 同时使用时为过滤条件)")
+    p.add_argument("--no-update", action="store_true", help="直接查询现有索引, 只报告过期的 Atlas")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("premul", parents=[common], help="预乘/非预乘转换图像")
+    p.add_argument("-o", "--output", required=True, help="输出目录")
+    p.add_argument("--mode", choices=["Premul", "NonPremul"], default="Premul")
+    p.add_argument("--pages", action="store_true", help="输入为 Atlas, 处理其引用的纹理页")
+    p.add_argument("--encoder", help="输出的编码器, 例如 png:level=9,optimize / webp (默认: png)")
+    p.set_defaults(func=cmd_premul)
+
+    p = sub.add_parser("encode", parents=[common], help="用指定编码器重新编码纹理页, 或比较多个编码器的大小和耗时")
+    p.add_argument("-o", "--output", help="输出目录 (按输入的目录结构镜像)")
+    p.add_argument("--encoder", action="append",
+                   help="编码器: png[:level=0-9,strategy=default|filtered|huffman|rle|fixed,optimize,quantize=N] "
+                        "或 webp[:method=0-6,quantize=N]; --compare 时可重复")
+    p.add_argument("--compare", action="store_true", help="只在内存中编码并比较, 不写入文件")
+    p.add_argument("--report", help="保存逐文件的编码报告 (JSON)")
+    p.set_defaults(func=cmd_encode)
+
+    p = sub.add_parser("bench", help="在合成 Atlas 目录上运行基准测试, 可与上次结果对比")
+    p.add_argument("--root", help="合成目录位置, 参数相同时复用 (默认: 临时目录, 结束后删除)")
+    p.add_argument("--atlases", type=int, help="Atlas 数量 (默认: 24)")
+    p.add_argument("--pages", type=int, help="每个 Atlas 的纹理页数 (默认: 2)")
+    p.add_argument("--page-size", type=int, help="纹理页边长 (默认: 1024)")
+    p.add_argument("--frames", type=int, help="每个 Atlas 的帧数 (默认: 120)")
+    p.add_argument("--rotate", type=float, help="旋转帧的比例 (默认: 0.25)")
+    p.add_argument("--pma", type=float, help="预乘纹理页的比例 (默认: 0.5)")
+    p.add_argument("--legacy", type=float, help="Atlas 3.x 格式的比例 (默认: 0)")
+    p.add_argument("--seed", type=int, help="随机种子 (默认: 0)")
+    p.add_argument("--repeat", type=int, default=3, help="每项重复次数, 取中位数 (默认: 3)")
+    p.add_argument("--sample", type=int, default=8, help="导出/预乘等图像密集测试使用的 Atlas 或纹理页数 (默认: 8)")
+    p.add_argument("--only", help="只运行匹配的测试 (通配符, 以分号分隔, 如 api.*;batch.convert)")
+    p.add_argument("--gui", action="store_true", help="同时无界面运行界面的批处理路径 (需要 PySide6)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数 (默认: CPU 核心数)")
+    p.add_argument("-o", "--output", help="保存结果的 JSON 路径")
+    p.add_argument("--baseline", help="对比的基准结果 JSON, 有退化时退出码为 1")
+    p.add_argument("--threshold", type=float, default=0.15, help="中位数变慢超过该比例视为退化 (默认: 0.15)")
+    p.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    p.set_defaults(func=cmd_bench)
+    return parser
+
+def main(argv=None):
+    import time
+    args = build_parser().parse_args(argv)
+    args.started = time.time()
+    args.clock = time.perf_counter()
+    if getattr(args, 'profile', None):
+        from AtlasEXProfile import set_profile_dir
+        set_profile_dir(os.path.abspath(args.profile))
+    return args.func(args)
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+    freeze_support()
+    sys.exit(main())
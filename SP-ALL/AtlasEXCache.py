@@ -0,0 +1,224 @@
+import os
+import json
+import stat
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+from SpineAtlas import ReadAtlas, Atlas, AtlasTex, AtlasFrame
+from AtlasEXZip import split_member, path_stamp, read_bytes, open_image, exists
+from AtlasEXWriter import atomic_write
+
+# 清单文件名 - 保存在资源目录根部
+MANIFEST_NAME = ".atlasex_cache.json"
+MANIFEST_VERSION = 1
+
+# 工作进程内的清单缓存 {清单路径: (mtime_ns, entries)}
+_loaded = {}
+
+def manifest_path(files):
+    """根据文件列表的公共目录确定清单位置 (压缩包中的文件按压缩包所在目录)"""
+    if not files:
+        return None
+    real = [(split_member(f) or (f,))[0] for f in files]
+    root = os.path.commonpath([str(Path(f).resolve().parent) for f in real])
+    return str(Path(root).joinpath(MANIFEST_NAME))
+
+def content_hash(data):
+    """内容哈希"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def file_hash(file_path):
+    """文件内容哈希, 文件不存在时返回 None"""
+    try:
+        return content_hash(read_bytes(file_path))
+    except OSError:
+        return None
+
+def texture_signature(textures):
+    """纹理的 mtime/size 签名, 缺失的纹理记为 None"""
+    signature = []
+    for texture in textures:
+        try:
+            signature.append([texture, *path_stamp(texture)])
+        except OSError:
+            signature.append([texture, None, None])
+    return signature
+
+def cache_key(manifest, file_path, operation, params, overwrite, suffix, output_root=None):
+    """清单条目的键 - 文件相对路径 + 操作 + 参数 + 保存方式"""
+    path = Path(file_path).resolve()
+    try:
+        path = path.relative_to(Path(manifest).parent)
+    except ValueError:
+        pass
+    target = "overwrite" if overwrite else f"suffix:{suffix}"
+    if output_root and not overwrite:
+        target += f"@{Path(output_root).resolve().as_posix()}"
+    return json.dumps([path.as_posix(), operation, params or {}, target], sort_keys=True, ensure_ascii=False)
+
+def load_manifest(manifest):
+    """读取清单, 同一进程内按 mtime 复用"""
+    try:
+        mtime = os.stat(manifest).st_mtime_ns
+    except OSError:
+        return {}
+    cached = _loaded.get(manifest)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(manifest, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        entries = data.get('entries', {}) if data.get('version') == MANIFEST_VERSION else {}
+    except (OSError, ValueError):
+        entries = {}
+    _loaded[manifest] = (mtime, entries)
+    return entries
+
+def save_manifest(manifest, updates):
+    """合并更新并原子写入清单"""
+    entries = dict(load_manifest(manifest))
+    entries.update(updates)
+    atomic_write(manifest, json.dumps({'version': MANIFEST_VERSION, 'entries': entries}, ensure_ascii=False))
+
+def make_record(input_hash, textures, output, output_hash):
+    """生成清单条目"""
+    return {
+        'input': input_hash,
+        'textures': texture_signature(textures),
+        'output': str(Path(output).resolve()),
+        'output_hash': output_hash,
+    }
+
+def is_up_to_date(record, data, overwrite):
+    """判断输出是否已是最新 - data 为当前 Atlas 文件内容"""
+    if not record:
+        return False
+    current = content_hash(data)
+    if overwrite:
+        # 覆盖模式下原文件就是上次的输出
+        if current != record['output_hash']:
+            return False
+    elif current != record['input'] or file_hash(record['output']) != record['output_hash']:
+        return False
+    return texture_signature([t[0] for t in record['textures']]) == record['textures']
+
+# 会话缓存的默认内存预算 (每个进程)
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024
+
+# 内存估算 - 每帧/每页的对象开销
+_FRAME_COST = 320
+_PAGE_COST = 256
+
+class LRUCache:
+    """按内存预算淘汰的 LRU 缓存, 条目以 (mtime_ns, size) 作为版本"""
+
+    def __init__(self, budget=DEFAULT_CACHE_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, stamp):
+        entry = self.items.get(key)
+        if entry is not None and entry[0] == stamp:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, stamp, value, cost):
+        self.discard(key)
+        self.items[key] = (stamp, value, cost)
+        self.size += cost
+        while self.size > self.budget and len(self.items) > 1:
+            _, (_, _, old) = self.items.popitem(last=False)
+            self.size -= old
+
+    def discard(self, key):
+        entry = self.items.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self):
+        self.items.clear()
+        self.size = 0
+
+# 当前进程的会话缓存
+ATLAS_CACHE = LRUCache()
+TEXTURE_CACHE = LRUCache(16 * 1024 * 1024)
+
+def set_cache_budget(budget):
+    """设置 Atlas 缓存的内存预算"""
+    ATLAS_CACHE.budget = budget
+
+def cache_stats():
+    """当前进程的缓存命中统计"""
+    return ATLAS_CACHE.hits + TEXTURE_CACHE.hits, ATLAS_CACHE.misses + TEXTURE_CACHE.misses
+
+def _cache_key(path):
+    return os.path.abspath(path)
+
+def copy_atlas(atlas):
+    """快速复制 Atlas - 比重新解析快一个数量级, 调用方可以随意修改副本"""
+    pages = []
+    for tex in atlas.atlas:
+        frames = [AtlasFrame(f.name, f.cutx, f.cuty, f.cutw, f.cuth, f.offx, f.offy, f.offw, f.offh,
+                             f.rota, f.arrs, f.valt) for f in tex.frames]
+        pages.append(AtlasTex(tex.png, tex.w, tex.h, tex.pma, tex.scale, frames, tex.tex))
+    return Atlas(pages, atlas.cutp, atlas.offp, atlas.version, atlas.covt, atlas.path, atlas.name)
+
+def load_atlas(file_path, data=None):
+    """读取 Atlas - 按路径和 mtime 命中缓存, 返回可修改的副本
+
+    data 为已读取的文件内容, 未命中时可省去一次读取.
+    """
+    key = _cache_key(file_path)
+    stamp = path_stamp(file_path)
+    atlas = ATLAS_CACHE.get(key, stamp)
+    if atlas is None:
+        # 压缩包中的 Atlas 以虚拟目录 <压缩包>!/<目录> 解析纹理
+        atlas = ReadAtlas(read_bytes(file_path) if data is None else data, path=Path(file_path).parent)
+        cost = sum(_PAGE_COST + _FRAME_COST * len(tex.frames) for tex in atlas.atlas)
+        ATLAS_CACHE.put(key, stamp, atlas, cost)
+    return copy_atlas(atlas)
+
+def texture_info(texture):
+    """纹理头信息 (宽, 高, 模式), 文件不存在时返回 None"""
+    if split_member(texture) is not None:
+        if not exists(texture):
+            return None
+        stamp = path_stamp(texture)
+    else:
+        try:
+            st = os.stat(texture)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+    key = _cache_key(texture)
+    info = TEXTURE_CACHE.get(key, stamp)
+    if info is None:
+        # 只解析文件头, 不解码像素
+        with open_image(texture) as img:
+            info = (img.size[0], img.size[1], img.mode)
+        TEXTURE_CACHE.put(key, stamp, info, _PAGE_COST)
+    return info
+
+def attach_textures(atlas):
+    """为压缩包中的 Atlas 预先打开纹理页 (tex.tex), 供 ReScale/SaveFrames 使用
+
+    SpineAtlas 只能从磁盘打开纹理; 图像按需解码, 只读取尺寸时不会解码像素.
+    """
+    for tex in atlas.atlas:
+        texture = atlas.path.joinpath(tex.png)
+        if tex.tex is None and split_member(texture) is not None and exists(texture):
+            tex.tex = open_image(texture)
+    return atlas
+
+def invalidate(file_path):
+    """文件被写入后使缓存失效"""
+    ATLAS_CACHE.discard(_cache_key(file_path))
+    TEXTURE_CACHE.discard(_cache_key(file_path))
@@ -0,0 +1,367 @@
+import os
+import json
+import functools
+from time import perf_counter
+from glob import glob, has_magic
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from SpineAtlas import Anchor, Atlas
+from AtlasEXCache import cache_key, load_manifest, is_up_to_date, make_record, content_hash, file_hash
+from AtlasEXJson import read_texture_json
+from AtlasEXDiscover import scan_files
+from AtlasEXWriter import atlas_text, output_path, sibling_output, atomic_write, diff_text
+from AtlasEXCache import load_atlas, texture_info, invalidate, cache_stats, set_cache_budget, DEFAULT_CACHE_BUDGET
+from AtlasEXCache import attach_textures
+from AtlasEXZip import is_archive, is_member, list_members, read_bytes, exists, file_size
+from AtlasEXProfile import PhaseTimer, profiled, profile_dir, set_profile_dir
+
+def default_workers():
+    """默认进程数 - 每个核心一个进程"""
+    return max(1, os.cpu_count() or 1)
+
+def _init_worker(budget, profile):
+    set_cache_budget(budget)
+    set_profile_dir(profile)
+
+class AffinityPool:
+    """固定路由的常驻进程池 - 同一文件总是交给同一个工作进程, 使进程内的会话缓存能够命中
+
+    创建时的 cProfile 设置 (profile_dir) 传给工作进程; 设置改变后需要重新创建.
+    """
+
+    def __init__(self, max_workers=None, cache_budget=DEFAULT_CACHE_BUDGET):
+        self.max_workers = max_workers or default_workers()
+        self.profile_dir = profile_dir()
+        # 内存预算平均分给每个工作进程
+        budget = max(1, cache_budget // self.max_workers)
+        self.shards = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                           initargs=(budget, self.profile_dir))
+                       for _ in range(self.max_workers)]
+
+    def submit(self, key, func, *args):
+        return self.shards[hash(key) % len(self.shards)].submit(func, *args)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        for shard in self.shards:
+            shard.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+def with_cache_stats(func):
+    """在结果中附加本次调用的缓存命中/未命中次数"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        hits, misses = cache_stats()
+        result = func(*args, **kwargs)
+        now_hits, now_misses = cache_stats()
+        result['cache_hits'] = now_hits - hits
+        result['cache_misses'] = now_misses - misses
+        return result
+    return wrapper
+
+def timed_call(func, item, *args):
+    """执行 func(item, *args), 在结果的 'duration' 中记录耗时 (秒); 开启 cProfile 时在分析器下运行"""
+    start = perf_counter()
+    result = profiled(func, item, *args)
+    if isinstance(result, dict):
+        result.setdefault('duration', round(perf_counter() - start, 6))
+    return result
+
+def iter_batch(func, items, args=(), max_workers=None, cancelled=None, pool=None):
+    """在进程池中执行 func(item, *args), 按完成顺序产出结果
+
+    指定 pool (AffinityPool) 时复用常驻进程; 否则临时创建进程池,
+    max_workers 为 1 时直接在当前进程中执行, 省去启动进程池的开销.
+    每个结果都带有工作进程中测得的 'duration'.
+    """
+    items = list(items)
+    max_workers = pool.max_workers if pool is not None else max_workers or default_workers()
+    cancelled = cancelled or (lambda: False)
+    if pool is None and (max_workers == 1 or len(items) <= 1):
+        for item in items:
+            if cancelled():
+                return
+            yield timed_call(func, item, *args)
+        return
+
+    if pool is not None:
+        yield from _drain(lambda item: pool.submit(item, timed_call, func, item, *args), items, max_workers, cancelled)
+        return
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(items)), initializer=set_profile_dir,
+                             initargs=(profile_dir(),)) as executor:
+        yield from _drain(lambda item: executor.submit(timed_call, func, item, *args), items, max_workers, cancelled)
+
+def _drain(submit, items, max_workers, cancelled):
+    """提交并收集结果 - 限制在途任务数量, 以便及时响应取消"""
+    window = max_workers * 4
+    pending = {}
+    queue = iter(items)
+    while True:
+        while not cancelled() and len(pending) < window:
+            item = next(queue, None)
+            if item is None:
+                break
+            pending[submit(item)] = item
+        if not pending:
+            break
+        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in finished:
+            item = pending.pop(future)
+            try:
+                yield future.result()
+            except Exception as e:
+                # 进程崩溃或参数无法序列化
+                yield {'file': item, 'ok': False, 'error': str(e)}
+
+def collect_atlas_files(directory, recursive=True, pattern="*.atlas", exclude=()):
+    """收集目录中的所有 Atlas 文件"""
+    return scan_files(directory, recursive, (pattern,), exclude)
+
+def expand_inputs(inputs, recursive=True, pattern="*.atlas", exclude=(), include=None):
+    """展开命令行输入 - 支持文件, 目录, 通配符和 .zip 压缩包, 保持顺序并去重
+
+    include/exclude 只作用于目录和压缩包中收集到的文件, 显式指定的文件总会被处理.
+    压缩包只读取中央目录, 成员以 <压缩包>!/<成员名> 表示, 也可以直接指定.
+    """
+    include = include or (pattern,)
+    files = {}
+    for item in inputs:
+        if has_magic(item):
+            matches = sorted(glob(item, recursive=recursive))
+        else:
+            matches = [item]
+        for match in matches:
+            if os.path.isdir(match):
+                for f in scan_files(match, recursive, include, exclude):
+                    files.setdefault(f, None)
+            elif is_archive(match):
+                for f in list_members(match, include, exclude):
+                    files.setdefault(f, None)
+            elif os.path.isfile(match) or (is_member(match) and exists(match)):
+                files.setdefault(match, None)
+    return list(files)
+
+# 批处理操作 - 模块级函数, 可被进程池序列化
+def op_convert(atlas, version):
+    """转换 Atlas 格式 (True - 4.0 / False - 3.x)"""
+    atlas.version = version
+
+def op_rescale(atlas):
+    """按实际纹理尺寸重新缩放"""
+    attach_textures(atlas)
+    atlas.ReScale()
+
+def op_cut_anchor(atlas, anchor):
+    """重新计算裁剪锚点"""
+    atlas.cutp = Anchor(anchor)
+    atlas.ReOffset()
+
+def op_offset_anchor(atlas, anchor):
+    """重新计算偏移锚点"""
+    atlas.offp = Anchor(anchor)
+    atlas.ReOffset()
+
+def op_pipeline(atlas, steps):
+    """依次应用多个操作 - 每个文件只读取和写入一次, steps 为 [(操作名, 参数)]"""
+    for operation, params in steps:
+        OPERATIONS[operation](atlas, **(params or {}))
+
+OPERATIONS = {
+    'convert': op_convert,
+    'rescale': op_rescale,
+    'cut_anchor': op_cut_anchor,
+    'offset_anchor': op_offset_anchor,
+    'pipeline': op_pipeline,
+}
+
+# 操作的显示名称
+OPERATION_TITLES = {
+    'convert': "格式转换",
+    'rescale': "纹理缩放",
+    'cut_anchor': "裁剪锚点重新计算",
+    'offset_anchor': "偏移锚点重新计算",
+    'pipeline': "流水线",
+}
+
+PRESET_VERSION = 1
+
+def normalize_steps(steps):
+    """检查并规范化流水线步骤 - 锚点可以是名称或数值, 返回 [[操作名, 参数]]"""
+    normalized = []
+    for step in steps:
+        if isinstance(step, dict):
+            operation, params = step.get('operation'), dict(step.get('params') or {})
+        else:
+            operation, params = step[0], dict(step[1] or {})
+        if operation not in OPERATIONS or operation == 'pipeline':
+            raise ValueError(f"未知操作: {operation}")
+        if 'anchor' in params and isinstance(params['anchor'], str):
+            params['anchor'] = Anchor[params['anchor'].upper().replace("-", "_").replace(" ", "_")].value
+        if 'anchor' in params:
+            params['anchor'] = Anchor(params['anchor']).value
+        if 'version' in params:
+            params['version'] = bool(params['version'])
+        normalized.append([operation, params])
+    return normalized
+
+def describe_step(operation, params):
+    """步骤的显示文本"""
+    title = OPERATION_TITLES[operation]
+    if operation == 'convert':
+        return f"{title}: {'Atlas 4.0' if params.get('version') else 'Atlas 3.0'}"
+    if 'anchor' in params:
+        return f"{title}: {Anchor(params['anchor']).name}"
+    return title
+
+def save_preset(path, steps, name=""):
+    """保存流水线预设 - 锚点以名称保存, 便于阅读和编辑"""
+    data = []
+    for operation, params in normalize_steps(steps):
+        params = dict(params)
+        if 'anchor' in params:
+            params['anchor'] = Anchor(params['anchor']).name
+        data.append({'operation': operation, 'params': params})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'version': PRESET_VERSION, 'name': name, 'steps': data}, f, ensure_ascii=False, indent=2)
+
+def load_preset(path):
+    """读取流水线预设, 返回 (名称, 步骤)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != PRESET_VERSION:
+        raise ValueError(f"不支持的预设版本: {data.get('version')}")
+    return data.get('name', ''), normalize_steps(data.get('steps', []))
+
+@with_cache_stats
+def process_batch_file(file_path, operation, params=None, overwrite=False, suffix="_modified", manifest=None,
+                       output_root=None, root=None, dry_run=False):
+    """处理单个文件 - 支持覆盖和添加后缀选项
+
+    输出保存在源文件旁边, 指定 output_root 时按相对 root 的结构镜像到输出目录.
+    指定 manifest 时按清单跳过已是最新的输出, 并在结果的 'cache' 中返回新的清单条目.
+    dry_run 时不写入, 在结果的 'diff' 中返回与现有输出的差异.
+    输出是压缩包成员时不写入, 在结果的 'data' 中返回内容, 由调用方用 write_archives 统一写入.
+    """
+    result = {'file': file_path, 'operation': operation, 'ok': False, 'output': None, 'error': None,
+              'skipped': False, 'cache': None}
+    timer = PhaseTimer(result)
+    try:
+        # 确定最终保存路径
+        save_path = output_path(file_path, overwrite, suffix, output_root, root)
+        result['bytes'] = file_size(file_path)
+        data = None
+        if manifest:
+            with timer.phase('read'):
+                data = read_bytes(file_path)
+        if manifest and not dry_run:
+            with timer.phase('manifest'):
+                key = cache_key(manifest, file_path, operation, params, overwrite, suffix.strip(), output_root)
+                record = load_manifest(manifest).get(key)
+                up_to_date = is_up_to_date(record, data, overwrite)
+            if up_to_date:
+                result.update(ok=True, skipped=True, output=record['output'])
+                return result
+
+        # 处理文件
+        with timer.phase('parse'):
+            atlas = load_atlas(file_path, data)
+        with timer.phase('transform'):
+            OPERATIONS[operation](atlas, **(params or {}))
+        with timer.phase('serialize'):
+            text = atlas_text(atlas)
+
+        result['output'] = save_path
+        if dry_run:
+            with timer.phase('diff'):
+                result['diff'] = diff_text(save_path, text)
+            result['ok'] = True
+            return result
+
+        if is_member(save_path):
+            result['data'] = text
+            result['ok'] = True
+            return result
+
+        # 写入目标目录中的唯一临时文件后原子替换
+        with timer.phase('write'):
+            atomic_write(save_path, text)
+        invalidate(save_path)
+
+        result['ok'] = True
+        if manifest:
+            with timer.phase('manifest'):
+                textures = [atlas.path.joinpath(tex.png).as_posix() for tex in atlas.atlas]
+                result['cache'] = (key, make_record(content_hash(data), textures, save_path, file_hash(save_path)))
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+@with_cache_stats
+def check_file(file_path):
+    """检查单个文件的缺失纹理"""
+    result = {'file': file_path, 'ok': False, 'missing': [], 'error': None}
+    timer = PhaseTimer(result)
+    try:
+        result['bytes'] = file_size(file_path)
+        with timer.phase('parse'):
+            atlas = load_atlas(file_path)
+        with timer.phase('textures'):
+            for tex in atlas.atlas:
+                texture = atlas.path.joinpath(tex.png).as_posix()
+                try:
+                    if texture_info(texture) is None:
+                        result['missing'].append(texture)
+                except Exception:
+                    # 文件存在但无法识别, 不算缺失
+                    pass
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+@with_cache_stats
+def export_file(file_path, export_dir, mode="Normal"):
+    """导出单个文件的帧"""
+    result = {'file': file_path, 'ok': False, 'error': None}
+    timer = PhaseTimer(result)
+    try:
+        with timer.phase('parse'):
+            atlas = attach_textures(load_atlas(file_path))
+        # SaveFrames 内部完成解码, 转换, 裁剪和编码
+        with timer.phase('frames'):
+            atlas.SaveFrames(path=export_dir, mode=mode)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def json_to_atlas(json_path, output_file):
+    """转换 JSON 到 Spine Atlas - 流式读取, 支持多纹理"""
+    pages = read_texture_json(json_path)
+    if not pages:
+        raise ValueError("不是纹理 JSON: 缺少 Texture/Frame")
+
+    # 创建并保存 Atlas
+    atlas = Atlas(pages)
+    atlas.SaveAtlas(output_file)
+    return atlas
+
+def convert_json_file(json_path, output_file=None):
+    """转换单个 JSON 文件, 默认保存为同目录下同名的 .atlas
+
+    不是纹理 JSON 的文件 (例如同目录下的骨骼 JSON) 标记为跳过.
+    压缩包中的 JSON 默认输出到新压缩包, 内容在结果的 'data' 中返回.
+    """
+    output_file = output_file or sibling_output(json_path, '.atlas')
+    result = {'file': json_path, 'ok': False, 'output': output_file, 'error': None, 'skipped': False, 'pages': 0}
+    try:
+        pages = read_texture_json(json_path)
+        if not pages:
+            result.update(ok=True, skipped=True, output=None)
+            return result
+        if is_member(output_file):
+            result['data'] = atlas_text(Atlas(pages))
+        else:
+            Atlas(pages).SaveAtlas(output_file)
+        result['ok'] = True
+        result['pages'] = len(pages)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
@@ -0,0 +1,232 @@
+import os
+import zlib
+import hashlib
+from pathlib import Path
+from SpineAtlas import AtlasTex, AtlasFrame
+from AtlasEXCore import iter_batch
+from AtlasEXCache import load_atlas, invalidate
+from AtlasEXWriter import atlas_text, atomic_write, output_path, source_root
+from AtlasEXZip import is_member
+from AtlasEXPack import pack_rects, frame_image, load_page, page_names, compose_pages, save_pages
+
+# 共享纹理页的默认文件名 (不含扩展名)
+SHARED_NAME = "shared_frames"
+
+def _size_key(tex, frame):
+    """预筛选键 - 帧尺寸 (未旋转) 和纹理页属性, 直接取自 Atlas, 不需要解码图像"""
+    return frame.cutw, frame.cuth, bool(tex.pma), tex.scale
+
+def plan_candidates(files):
+    """第一阶段: 按尺寸分组, 返回 ([(文件, 需要计算哈希的帧名)], {文件: 帧数}, 解析错误)
+
+    尺寸唯一的帧不可能重复, 不再解码.
+    """
+    counts = {}
+    parsed = []
+    errors = []
+    totals = {}
+    for file_path in files:
+        try:
+            atlas = load_atlas(file_path)
+        except Exception as e:
+            errors.append({'file': file_path, 'error': str(e)})
+            continue
+        keys = [(frame.name, _size_key(tex, frame)) for tex in atlas.atlas for frame in tex.frames]
+        for _, key in keys:
+            counts[key] = counts.get(key, 0) + 1
+        totals[file_path] = len(keys)
+        parsed.append((file_path, keys))
+    jobs = []
+    for file_path, keys in parsed:
+        names = tuple(name for name, key in keys if counts[key] > 1)
+        jobs.append((file_path, names))
+    return jobs, totals, errors
+
+def hash_frames(job):
+    """第二阶段 (进程池任务): 解码候选帧所在的纹理页, 计算帧像素的快速哈希和完整摘要
+
+    job 为 (Atlas 文件, 帧名); 帧按 SaveFrames 的方式裁剪并转回未旋转方向, 只在内存中处理.
+    """
+    file_path, names = job
+    result = {'file': file_path, 'ok': False, 'error': None, 'frames': []}
+    try:
+        wanted = set(names)
+        if wanted:
+            atlas = load_atlas(file_path)
+            for tex in atlas.atlas:
+                frames = [f for f in tex.frames if f.name in wanted]
+                if not frames:
+                    continue
+                page = load_page(atlas.path.joinpath(tex.png))
+                for frame in frames:
+                    data = frame_image(page, frame).tobytes()
+                    result['frames'].append([tex.png, frame.name, *_size_key(tex, frame),
+                                             zlib.crc32(data), hashlib.blake2b(data, digest_size=16).hexdigest()])
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def scan_duplicates(files, max_workers=None, cancelled=None, pool=None):
+    """扫描重复帧 - 逐个产出 Atlas 的哈希结果, 由 group_duplicates 汇总
+
+    先按 Atlas 中记录的尺寸预筛选, 只有尺寸相同的帧才解码并计算哈希.
+    """
+    jobs, totals, errors = plan_candidates(files)
+    for error in errors:
+        yield dict(error, ok=False, frames=[], total=0)
+    # 没有候选帧的 Atlas 不必提交到进程池
+    for file_path, names in jobs:
+        if not names:
+            yield {'file': file_path, 'ok': True, 'error': None, 'frames': [], 'total': totals[file_path]}
+    jobs = [job for job in jobs if job[1]]
+    for result in iter_batch(hash_frames, jobs, (), max_workers, cancelled, pool):
+        if not isinstance(result['file'], str):
+            result = dict(result, file=result['file'][0], frames=[])
+        result['total'] = totals[result['file']]
+        yield result
+
+def group_duplicates(results):
+    """汇总哈希结果, 返回重复帧报告
+
+    先按 (尺寸, CRC32) 分桶, 桶内再按完整像素摘要确认; 浪费的字节数按 RGBA 未压缩计算.
+    """
+    buckets = {}
+    total = 0
+    hashed = 0
+    errors = []
+    for result in results:
+        if not result['ok']:
+            errors.append({'file': result['file'], 'error': result['error']})
+            continue
+        total += result.get('total', 0)
+        for png, name, w, h, pma, scale, crc, digest in result['frames']:
+            hashed += 1
+            buckets.setdefault((w, h, pma, scale, crc), []).append((digest, result['file'], png, name))
+    groups = []
+    for (w, h, pma, scale, _), members in buckets.items():
+        if len(members) < 2:
+            continue
+        confirmed = {}
+        for digest, file_path, png, name in members:
+            confirmed.setdefault(digest, []).append({'atlas': file_path, 'page': png, 'frame': name})
+        for frames in confirmed.values():
+            if len(frames) > 1:
+                groups.append({'size': [w, h], 'pma': pma, 'scale': scale, 'count': len(frames),
+                               'wasted_bytes': (len(frames) - 1) * w * h * 4, 'frames': frames})
+    groups.sort(key=lambda g: g['wasted_bytes'], reverse=True)
+    return {
+        'frames': total,
+        'hashed': hashed,
+        'groups': groups,
+        'duplicates': sum(g['count'] - 1 for g in groups),
+        'wasted_bytes': sum(g['wasted_bytes'] for g in groups),
+        'errors': errors,
+    }
+
+def find_duplicates(files, max_workers=None, cancelled=None, pool=None):
+    """扫描并汇总重复帧 (命令行使用)"""
+    return group_duplicates(scan_duplicates(list(files), max_workers, cancelled, pool))
+
+def _relative(target, directory):
+    """纹理页相对于 Atlas 所在目录的路径 (使用 /)"""
+    return Path(os.path.relpath(target, directory)).as_posix()
+
+def apply_dedup(report, shared_file=None, overwrite=False, suffix="_modified", output_root=None, root=None,
+                max_size=2048, padding=2, progress=None, cancelled=None):
+    """把重复帧提取到共享纹理页, 并改写受影响的 Atlas 指向共享副本
+
+    每组重复帧只保留一份像素, 装箱到 shared_file (<名称>.png, <名称>_2.png ...);
+    受影响的 Atlas 追加引用共享纹理页的页, 帧保留各自的名称和偏移.
+    原纹理页中的旧区域不再被引用, 可再用重新打包压缩.
+    """
+    cancelled = cancelled or (lambda: False)
+    groups = [g for g in report['groups'] if g['count'] > 1]
+    files = list(dict.fromkeys(f['atlas'] for g in groups for f in g['frames']))
+    result = {'file': '', 'ok': False, 'error': None, 'shared': [], 'outputs': [], 'groups': len(groups),
+              'saved_bytes': 0, 'cancelled': False}
+    if not groups:
+        result['ok'] = True
+        return result
+    if any(is_member(f) for f in files):
+        # 改写后的 Atlas 仍要引用原纹理页中未移动的帧, 压缩包中的纹理页无法从包外引用
+        raise ValueError("压缩包中的 Atlas 只能生成报告, 提取共享纹理页前请先解压")
+    root = root or source_root(files)
+    if shared_file is None:
+        shared_file = Path(output_root or root).joinpath(f"{SHARED_NAME}.png")
+    shared_file = Path(shared_file).resolve()
+
+    # 取每组第一个帧的像素作为共享副本
+    atlases = {}
+    pages = {}
+    images = []
+    for group in groups:
+        if cancelled():
+            result['cancelled'] = True
+            return result
+        first = group['frames'][0]
+        if first['atlas'] not in atlases:
+            atlases[first['atlas']] = load_atlas(first['atlas'])
+        atlas = atlases[first['atlas']]
+        tex = next(t for t in atlas.atlas if t.png == first['page'])
+        frame = next(f for f in tex.frames if f.name == first['frame'])
+        page_path = str(atlas.path.joinpath(tex.png).resolve())
+        if page_path not in pages:
+            pages[page_path] = load_page(page_path)
+        images.append(frame_image(pages[page_path], frame))
+    pages.clear()
+
+    placements, sizes = pack_rects([image.size for image in images], max_size, padding)
+    pngs = [shared_file.parent.joinpath(name) for name in page_names(shared_file.stem, len(sizes))]
+    sources = {str(Path(f).resolve().parent.joinpath(t.png).resolve())
+               for f in files for t in load_atlas(f).atlas}
+    if any(str(png) in sources for png in pngs):
+        raise ValueError("共享纹理页会覆盖源纹理页, 请选择其他位置")
+    shared_file.parent.mkdir(parents=True, exist_ok=True)
+    save_pages(compose_pages(images, placements, sizes), pngs)
+    result['shared'] = [str(png) for png in pngs]
+    images.clear()
+
+    # 每个 Atlas 中需要改写的帧 -> (共享页序号, x, y, 是否旋转)
+    moved = {}
+    for group, (page, x, y, rotated) in zip(groups, placements):
+        for item in group['frames']:
+            moved.setdefault(item['atlas'], {})[(item['page'], item['frame'])] = (page, x, y, rotated)
+        result['saved_bytes'] += group['wasted_bytes']
+
+    for index, file_path in enumerate(files):
+        if cancelled():
+            result['cancelled'] = True
+            break
+        atlas = load_atlas(file_path)
+        target = output_path(file_path, overwrite, suffix, output_root, root)
+        out_dir = Path(target).resolve().parent
+        shared_frames = {}
+        textures = []
+        for tex in atlas.atlas:
+            keep = []
+            for frame in tex.frames:
+                placement = moved[file_path].get((tex.png, frame.name))
+                if placement is None:
+                    keep.append(frame)
+                    continue
+                page, x, y, rotated = placement
+                shared_frames.setdefault((page, bool(tex.pma), tex.scale), []).append(AtlasFrame(
+                    frame.name, x, y, frame.cutw, frame.cuth, frame.offx, frame.offy, frame.offw, frame.offh,
+                    90 if rotated else 0))
+            if keep:
+                # 输出位置改变时, 原纹理页按新位置重新计算相对路径
+                tex.png = _relative(atlas.path.joinpath(tex.png).resolve(), out_dir)
+                tex.frames = keep
+                textures.append(tex)
+        for (page, pma, scale), frames in shared_frames.items():
+            w, h = sizes[page]
+            textures.append(AtlasTex(_relative(pngs[page], out_dir), w, h, pma, scale, frames))
+        atlas.atlas = textures
+        atomic_write(target, atlas_text(atlas))
+        invalidate(target)
+        result['outputs'].append(target)
+        if progress is not None:
+            progress(index + 1, len(files))
+    result['ok'] = not result['cancelled']
+    return result
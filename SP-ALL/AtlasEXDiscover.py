@@ -0,0 +1,137 @@
+import os
+import re
+from fnmatch import fnmatch
+
+# 默认的包含/排除规则 - 排除批处理生成的 *_modified.atlas
+DEFAULT_INCLUDE = ("*.atlas",)
+DEFAULT_EXCLUDE = ("*_modified.atlas",)
+
+# 每批产出的文件数
+_BATCH = 256
+
+def parse_patterns(text):
+    """解析以分号, 逗号或空白分隔的通配符列表"""
+    return tuple(p for p in re.split(r'[;,\s]+', text or '') if p)
+
+def match_patterns(name, rel, patterns):
+    """按文件名匹配; 含 / 的规则按相对路径匹配"""
+    for pattern in patterns:
+        if fnmatch(rel if '/' in pattern else name, pattern):
+            return True
+    return False
+
+def iter_entries(root, recursive=True, include=DEFAULT_INCLUDE, exclude=(), cancelled=None):
+    """用 os.scandir 遍历目录, 逐个产出匹配的 DirEntry
+
+    exclude 同时作用于目录名, 匹配的目录不再进入.
+    """
+    cancelled = cancelled or (lambda: False)
+    stack = [(root, '')]
+    while stack:
+        if cancelled():
+            return
+        current, prefix = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            rel = prefix + entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            if is_dir:
+                if recursive and not match_patterns(entry.name, rel, exclude):
+                    subdirs.append((entry.path, rel + '/'))
+            elif match_patterns(entry.name, rel, include) and not match_patterns(entry.name, rel, exclude):
+                yield entry
+        # 逆序入栈, 保持按目录顺序遍历
+        stack.extend(reversed(subdirs))
+
+def scan_files(root, recursive=True, include=DEFAULT_INCLUDE, exclude=()):
+    """收集目录中匹配的文件"""
+    return [entry.path for entry in iter_entries(root, recursive, include, exclude)]
+
+def discover_files(root, recursive=True, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE, cancelled=None):
+    """后台发现文件 - 按批产出 {'files': [...]}, 以便界面边找边显示"""
+    batch = []
+    for entry in iter_entries(root, recursive, include, exclude, cancelled):
+        batch.append(entry.path)
+        if len(batch) >= _BATCH:
+            yield {'files': batch}
+            batch = []
+    if batch:
+        yield {'files': batch}
+
+def _stamp(entry):
+    st = entry.stat()
+    return st.st_mtime_ns, st.st_size
+
+class PollWatcher:
+    """轮询监视 - 比较 mtime/size 快照, 找出新增或修改的文件
+
+    不依赖 inotify, 在网络盘上同样可用. 文件需在连续两次轮询中保持不变
+    才会被报告, 避免处理仍在写入的文件.
+    """
+
+    def __init__(self, roots, recursive=True, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE):
+        self.roots = list(roots)
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.state = None
+        self.pending = {}
+
+    def snapshot(self, cancelled=None):
+        state = {}
+        for root in self.roots:
+            for entry in iter_entries(root, self.recursive, self.include, self.exclude, cancelled):
+                try:
+                    state[os.path.normpath(entry.path)] = _stamp(entry)
+                except OSError:
+                    continue
+        return state
+
+    def poll(self, progress=None, cancelled=None):
+        """返回自上次轮询以来变化且已稳定的文件; 第一次调用只建立快照"""
+        current = self.snapshot(cancelled)
+        if cancelled is not None and cancelled():
+            return []
+        if self.state is None:
+            self.state = current
+            return []
+        changed = []
+        pending = {}
+        for path, stamp in current.items():
+            if self.state.get(path) == stamp:
+                continue
+            if self.pending.get(path) == stamp:
+                changed.append(path)
+            else:
+                pending[path] = stamp
+        self.pending = pending
+        # 未稳定的文件保持旧状态, 下次继续比较
+        for path in pending:
+            current[path] = self.state.get(path)
+        self.state = current
+        return changed
+
+    def refresh(self, paths):
+        """接受文件的当前状态 - 用于忽略批处理自身写入的输出"""
+        if self.state is None:
+            return
+        for path in paths:
+            path = os.path.normpath(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            self.state[path] = (st.st_mtime_ns, st.st_size)
+            self.pending.pop(path, None)
+
+def watch_poll(watcher, progress=None, cancelled=None):
+    """在后台任务中轮询一次, 返回 {'files': 变化的文件}"""
+    return {'files': watcher.poll(progress, cancelled)}
@@ -0,0 +1,314 @@
+import io
+import os
+import shutil
+from pathlib import Path
+from time import perf_counter
+from PIL import Image
+from AtlasEXCore import iter_batch
+from AtlasEXCache import load_atlas, invalidate
+from AtlasEXWriter import atlas_text, atomic_write, atomic_file, source_root
+from AtlasEXZip import open_image, source_dir, exists, file_size
+from AtlasEXProfile import PhaseTimer
+
+# 输出格式和对应的文件后缀
+FORMATS = {'png': '.png', 'webp': '.webp'}
+
+# zlib 压缩策略 (PNG 的 IDAT 压缩方式); Pillow 的 PNG 行过滤器总是自适应选择
+STRATEGIES = {
+    'default': -1,
+    'filtered': Image.FILTERED,
+    'huffman': Image.HUFFMAN_ONLY,
+    'rle': Image.RLE,
+    'fixed': 4,
+}
+
+# 默认编码器 - 与之前的 image.save(path) 完全一致
+DEFAULT_ENCODER = "png"
+
+# 界面中的预设 {显示名称: 编码器}
+PRESETS = {
+    "PNG (默认)": "png",
+    "PNG 快速 (level 1)": "png:level=1",
+    "PNG 最小 (level 9, optimize)": "png:level=9,optimize",
+    "PNG RLE (level 6)": "png:level=6,strategy=rle",
+    "PNG 256 色": "png:quantize=256,level=9",
+    "WebP 无损": "webp",
+    "WebP 无损 (最小)": "webp:method=6",
+}
+
+def parse_encoder(spec=None):
+    """解析编码器描述 - "格式[:键=值,...]", 例如 png:level=9,strategy=rle / webp:method=6 / png:quantize=256
+
+    PNG: level (zlib 0-9), strategy (default/filtered/huffman/rle/fixed), optimize, quantize (调色板颜色数);
+    WebP: method (0-6, 越大越慢越小), quantize. WebP 总是无损并保留透明像素的颜色.
+    返回 {'format', 'level', 'strategy', 'optimize', 'method', 'quantize', 'name'}.
+    """
+    spec = (spec or DEFAULT_ENCODER).strip()
+    fmt, _, rest = spec.partition(':')
+    fmt = fmt.strip().lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的输出格式: {fmt} (可选: {', '.join(FORMATS)})")
+    options = {'format': fmt, 'level': None, 'strategy': 'default', 'optimize': False, 'method': 4, 'quantize': 0}
+    for item in filter(None, (part.strip() for part in rest.split(','))):
+        key, sep, value = item.partition('=')
+        key = key.strip().lower()
+        if key == 'optimize' and not sep:
+            options['optimize'] = True
+        elif key == 'level' and fmt == 'png':
+            options['level'] = int(value)
+            if not 0 <= options['level'] <= 9:
+                raise ValueError(f"zlib 压缩级别应为 0-9: {value}")
+        elif key == 'strategy' and fmt == 'png':
+            if value not in STRATEGIES:
+                raise ValueError(f"未知的压缩策略: {value} (可选: {', '.join(STRATEGIES)})")
+            options['strategy'] = value
+        elif key == 'method' and fmt == 'webp':
+            options['method'] = int(value)
+            if not 0 <= options['method'] <= 6:
+                raise ValueError(f"WebP method 应为 0-6: {value}")
+        elif key == 'quantize':
+            options['quantize'] = int(value)
+            if options['quantize'] and not 2 <= options['quantize'] <= 256:
+                raise ValueError(f"调色板颜色数应为 2-256: {value}")
+        else:
+            raise ValueError(f"编码器 {fmt} 不支持参数: {item}")
+    options['name'] = spec
+    return options
+
+def encoder_suffix(encoder):
+    """编码器对应的文件后缀"""
+    return FORMATS[_options(encoder)['format']]
+
+def _options(encoder):
+    return encoder if isinstance(encoder, dict) else parse_encoder(encoder)
+
+def quantize_image(image, colors):
+    """量化为调色板图像 (有损) - 保留 alpha, 使用 Pillow 内置的快速八叉树算法"""
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    return image.quantize(colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+
+def encode_image(image, target, encoder=None, timer=None):
+    """按编码器写入图像 - target 为路径或文件对象; timer (PhaseTimer) 记录 quantize / encode 阶段"""
+    options = _options(encoder)
+    if options['quantize']:
+        if timer is not None:
+            with timer.phase('quantize'):
+                image = quantize_image(image, options['quantize'])
+        else:
+            image = quantize_image(image, options['quantize'])
+    if options['format'] == 'webp':
+        params = {'format': 'WEBP', 'lossless': True, 'quality': 100, 'method': options['method'], 'exact': True}
+        if image.mode == 'P':
+            # WebP 没有调色板模式, 量化只减少颜色数
+            image = image.convert('RGBA')
+    else:
+        params = {'format': 'PNG', 'optimize': options['optimize'], 'compress_type': STRATEGIES[options['strategy']]}
+        if options['level'] is not None:
+            params['compress_level'] = options['level']
+    if timer is not None:
+        with timer.phase('encode'):
+            image.save(target, **params)
+    else:
+        image.save(target, **params)
+
+def encode_bytes(image, encoder=None, timer=None):
+    """编码到内存, 返回字节串"""
+    buffer = io.BytesIO()
+    encode_image(image, buffer, encoder, timer)
+    return buffer.getvalue()
+
+def save_image(image, path, encoder=None, timer=None):
+    """编码并写入文件 - 先写入临时文件再替换, 中断时不会留下不完整的图像"""
+    with atomic_file(path) as f:
+        encode_image(image, f, encoder, timer)
+
+def _phase_seconds(phases, names):
+    return round(sum(duration for name, _, duration, _ in phases if name in names), 6)
+
+def transcode_page(job, encoder=None):
+    """重新编码单个纹理页 (进程池任务) - job 为 (源文件, 目标文件); 结果包含编码耗时和前后字节数"""
+    src, dst = job
+    options = _options(encoder)
+    result = {'file': src, 'ok': False, 'output': dst, 'error': None, 'encoder': options['name'],
+              'bytes': 0, 'encoded_bytes': 0, 'encode_seconds': 0.0}
+    timer = PhaseTimer(result)
+    try:
+        result['bytes'] = file_size(src)
+        with open_image(src) as img:
+            with timer.phase('decode'):
+                img.load()
+            Path(dst).parent.mkdir(parents=True, exist_ok=True)
+            save_image(img, dst, options, timer)
+        result['encoded_bytes'] = os.path.getsize(dst)
+        result['encode_seconds'] = _phase_seconds(result['phases'], ('quantize', 'encode'))
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _plan(files, output_root, root, suffix):
+    """解析 Atlas, 确定每个纹理页的输出位置 (按编码器更换后缀); 共享的纹理页只编码一次"""
+    atlases = []
+    pages = {}
+    for file_path in files:
+        entry = {'file': file_path, 'atlas': None, 'output': None, 'pages': [], 'error': None}
+        atlases.append(entry)
+        try:
+            atlas = load_atlas(file_path)
+            rel = source_dir(file_path).relative_to(root)
+            out_dir = Path(output_root).joinpath(rel)
+            entry['atlas'] = atlas
+            entry['output'] = str(out_dir.joinpath(Path(file_path).name))
+            for tex in atlas.atlas:
+                src = atlas.path.joinpath(tex.png).resolve()
+                name = Path(tex.png).with_suffix(suffix).as_posix()
+                dst = out_dir.joinpath(name).resolve()
+                if not exists(src):
+                    raise FileNotFoundError(f"缺失纹理: {src.as_posix()}")
+                if src == dst:
+                    raise ValueError("输出目录不能与源目录相同")
+                tex.png = name
+                page = pages.setdefault(str(src), {'outputs': [], 'atlases': {}})
+                if str(dst) not in page['outputs']:
+                    page['outputs'].append(str(dst))
+                page['atlases'][id(entry)] = entry
+                entry['pages'].append(str(src))
+        except Exception as e:
+            entry['error'] = str(e)
+    return atlases, pages
+
+def _finish_atlas(entry, pages, failed):
+    """所有纹理页完成后写入 Atlas (纹理页名称已换为新后缀); 结果附带每个纹理页的编码记录"""
+    result = {'file': entry['file'], 'ok': False, 'output': entry['output'], 'error': entry['error'],
+              'pages': [], 'bytes': 0, 'encoded_bytes': 0, 'encode_seconds': 0.0}
+    if result['error'] is None:
+        for src in dict.fromkeys(entry['pages']):
+            report = pages[src].get('report')
+            if report is not None:
+                result['pages'].append(report)
+                result['bytes'] += report['bytes']
+                result['encoded_bytes'] += report['encoded_bytes']
+                result['encode_seconds'] = round(result['encode_seconds'] + report['encode_seconds'], 6)
+        errors = [failed[p] for p in dict.fromkeys(entry['pages']) if p in failed]
+        if errors:
+            result['error'] = "; ".join(errors)
+    if result['error'] is None:
+        try:
+            Path(entry['output']).parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(entry['output'], atlas_text(entry['atlas']))
+            invalidate(entry['output'])
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+    return result
+
+def transcode_atlases(files, output_root, encoder=None, max_workers=None, cancelled=None, pool=None):
+    """用指定编码器重新编码 Atlas 引用的所有纹理页并写入对应的 Atlas, 按 Atlas 产出结果
+
+    纹理页在进程池中并行编码; 输出按源目录结构镜像到 output_root.
+    """
+    files = list(files)
+    cancelled = cancelled or (lambda: False)
+    if not files:
+        return
+    options = _options(encoder)
+    root = source_root(files)
+    atlases, pages = _plan(files, output_root, root, FORMATS[options['format']])
+
+    # 解析失败的 Atlas 立即产出, 其余的等待各自的纹理页
+    remaining = {}
+    for entry in atlases:
+        if entry['error'] is not None:
+            yield _finish_atlas(entry, pages, {})
+        else:
+            remaining[id(entry)] = len(set(entry['pages']))
+            if not entry['pages']:
+                yield _finish_atlas(entry, pages, {})
+
+    jobs = [(src, page['outputs'][0]) for src, page in pages.items()]
+    failed = {}
+    for result in iter_batch(transcode_page, jobs, (options,), max_workers, cancelled, pool):
+        src = result['file'] if isinstance(result['file'], str) else result['file'][0]
+        page = pages[src]
+        if result['ok']:
+            page['report'] = {key: result[key] for key in ('file', 'output', 'bytes', 'encoded_bytes',
+                                                           'encode_seconds')}
+            # 同一纹理页在多个输出位置被引用时直接复制
+            for extra in page['outputs'][1:]:
+                try:
+                    Path(extra).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(page['outputs'][0], extra)
+                except OSError as e:
+                    failed[src] = f"{Path(src).name}: {e}"
+        else:
+            failed[src] = f"{Path(src).name}: {result['error']}"
+        for entry in page['atlases'].values():
+            remaining[id(entry)] -= 1
+            if remaining[id(entry)] == 0:
+                yield _finish_atlas(entry, pages, failed)
+
+def measure_page(page_path, encoders):
+    """用多个编码器在内存中编码同一纹理页 (进程池任务), 纹理页只解码一次; 不写入任何文件"""
+    result = {'file': page_path, 'ok': False, 'error': None, 'bytes': 0, 'encoders': {}}
+    try:
+        result['bytes'] = file_size(page_path)
+        with open_image(page_path) as img:
+            img.load()
+            for encoder in encoders:
+                options = _options(encoder)
+                start = perf_counter()
+                size = len(encode_bytes(img, options))
+                result['encoders'][options['name']] = {'bytes': size, 'seconds': round(perf_counter() - start, 6)}
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def compare_encoders(pages, encoders, max_workers=None, cancelled=None, pool=None):
+    """在进程池中比较多个编码器, 按纹理页产出 measure_page 的结果"""
+    encoders = tuple(_options(encoder)['name'] for encoder in encoders)
+    yield from iter_batch(measure_page, pages, (encoders,), max_workers, cancelled, pool)
+
+def summarize_encoders(results):
+    """汇总比较结果 - [{encoder, pages, bytes, encoded_bytes, saved, ratio, seconds, mb_per_second}]"""
+    totals = {}
+    source = 0
+    for result in results:
+        if not result['ok']:
+            continue
+        source += result['bytes']
+        for name, item in result['encoders'].items():
+            total = totals.setdefault(name, {'encoder': name, 'pages': 0, 'bytes': 0, 'encoded_bytes': 0,
+                                             'seconds': 0.0})
+            total['pages'] += 1
+            total['bytes'] += result['bytes']
+            total['encoded_bytes'] += item['bytes']
+            total['seconds'] += item['seconds']
+    rows = []
+    for total in totals.values():
+        total['saved'] = total['bytes'] - total['encoded_bytes']
+        total['ratio'] = round(total['encoded_bytes'] / max(1, total['bytes']), 4)
+        total['seconds'] = round(total['seconds'], 6)
+        total['mb_per_second'] = round(total['bytes'] / 1048576 / max(total['seconds'], 1e-9), 2)
+        rows.append(total)
+    return rows
+
+def format_encoders(rows):
+    """比较结果的文本表格"""
+    lines = [f"{'编码器':32s} {'原大小':>12s} {'编码后':>12s} {'比例':>7s} {'耗时':>9s} {'MB/秒':>8s}"]
+    for row in rows:
+        lines.append(f"{row['encoder']:32s} {row['bytes']:12d} {row['encoded_bytes']:12d} {row['ratio']:7.1%} "
+                     f"{row['seconds']:8.2f}s {row['mb_per_second']:8.2f}")
+    return lines
+
+def encode_report(results):
+    """逐文件的编码报告 - 展开 transcode_atlases 结果中每个纹理页的记录, 附带汇总"""
+    files = []
+    for result in results:
+        for page in result.get('pages') or ():
+            files.append(dict(page, saved=page['bytes'] - page['encoded_bytes']))
+    before = sum(f['bytes'] for f in files)
+    after = sum(f['encoded_bytes'] for f in files)
+    return {'files': files, 'bytes': before, 'encoded_bytes': after, 'saved': before - after,
+            'encode_seconds': round(sum(f['encode_seconds'] for f in files), 6)}
@@ -0,0 +1,220 @@
+import os
+from math import ceil
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing.shared_memory import SharedMemory
+from SpineAtlas import CutFrame, getPngSize
+from AtlasEXCache import load_atlas
+from AtlasEXZip import open_file, open_image, exists, file_size
+from AtlasEXProfile import PhaseTimer, profiled, profile_dir, set_profile_dir
+from PIL.Image import frombuffer
+from AtlasEXImage import img_premultiplied, img_non_premultiplied
+from AtlasEXEncode import encode_image, encoder_suffix
+
+# 默认内存上限 - 同时驻留的已解码纹理页总字节数
+DEFAULT_MEMORY_LIMIT = 1024 * 1024 * 1024
+
+# 可以按原始字节传递的图像模式, 其余模式统一转换为 RGBA
+_RAW_MODES = ('RGBA', 'RGB', 'LA', 'L')
+
+def _plan_file(file_path):
+    """解析 Atlas, 返回每个纹理页的路径和帧列表"""
+    try:
+        atlas = load_atlas(file_path)
+    except Exception as e:
+        return file_path, None, str(e)
+    pages = [(atlas.path.joinpath(tex.png).as_posix(), tex.frames) for tex in atlas.atlas]
+    return file_path, pages, None
+
+def _page_size(png_path):
+    """读取纹理页尺寸 - PNG 只读文件头"""
+    with open_file(png_path) as f:
+        head = f.read(24)
+    if head.startswith(b'\x89PNG'):
+        return getPngSize(head)
+    with open_image(png_path) as img:
+        return img.size
+
+def _decode_page(png_path, mode, shm_name):
+    """解码纹理页并按导出模式转换, 写入共享内存; 返回 (模式, 尺寸, 字节数, 文件字节数, 阶段耗时)"""
+    timer = PhaseTimer({})
+    with open_image(png_path) as tex:
+        with timer.phase('decode'):
+            tex.load()
+        if mode in ('Premul', 'NonPremul'):
+            with timer.phase('premultiply'):
+                img = (img_premultiplied if mode == 'Premul' else img_non_premultiplied)(tex, threads=1)
+        else:
+            img = tex if tex.mode in _RAW_MODES else tex.convert('RGBA')
+        with timer.phase('copy'):
+            data = img.tobytes()
+            shm = SharedMemory(name=shm_name)
+            try:
+                shm.buf[:len(data)] = data
+            finally:
+                shm.close()
+        return img.mode, img.size, len(data), file_size(png_path), timer.phases
+
+def _encode_frames(shm_name, page_mode, page_size, nbytes, frames, export_dir, encoder=None):
+    """从共享内存裁剪帧并按编码器编码 (默认为 PNG); 返回 (帧数, 阶段耗时)"""
+    timer = PhaseTimer({})
+    shm = SharedMemory(name=shm_name)
+    page = None
+    suffix = encoder_suffix(encoder)
+    try:
+        page = frombuffer(page_mode, page_size, shm.buf[:nbytes], 'raw', page_mode, 0, 1)
+        for frame in frames:
+            w = Path(export_dir).joinpath(frame.name)
+            w.parent.mkdir(parents=True, exist_ok=True)
+            with timer.phase('crop'):
+                image = CutFrame(page, frame)
+            encode_image(image, f'{w.as_posix()}{suffix}', encoder, timer)
+            del image
+    finally:
+        # 释放对共享内存的引用后才能关闭
+        del page
+        shm.close()
+    return len(frames), timer.phases
+
+def export_frames_pipeline(files, export_dir, mode="Normal", encoder=None, max_workers=None,
+                           memory_limit=DEFAULT_MEMORY_LIMIT, cancelled=None, pool=None):
+    """流水线导出帧 - 解码/裁剪/编码分布在进程池中, 按文件逐个产出结果
+
+    输出与逐个调用 Atlas.SaveFrames 相同: 同名帧以最后出现的为准; encoder 为 AtlasEXEncode 的编码器描述, 默认为 PNG.
+    指定 pool (AffinityPool) 时在常驻进程中解析 Atlas, 以复用会话缓存.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    cancelled = cancelled or (lambda: False)
+    if os.name == 'posix':
+        # 在创建工作进程之前启动资源跟踪进程, 使其被所有工作进程共享
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=set_profile_dir,
+                             initargs=(profile_dir(),)) as executor:
+        # 解析阶段
+        if pool is not None:
+            plans = [f.result() for f in [pool.submit(file_path, _plan_file, file_path) for file_path in files]]
+        else:
+            chunksize = max(1, len(files) // (max_workers * 4))
+            plans = list(executor.map(_plan_file, files, chunksize=chunksize))
+
+        # 同名帧只导出最后一次出现的那个
+        owner = {}
+        for fi, (_, pages, _) in enumerate(plans):
+            for pi, (_, frames) in enumerate(pages or ()):
+                for frame in frames:
+                    owner[frame.name] = (fi, pi, id(frame))
+
+        results = []
+        remaining = []
+        pages_queue = deque()
+        for fi, (file_path, pages, error) in enumerate(plans):
+            results.append({'file': file_path, 'ok': error is None, 'frames': 0, 'missing': [], 'error': error,
+                            'phases': [], 'bytes': 0})
+            remaining.append(0)
+            for pi, (png_path, frames) in enumerate(pages or ()):
+                frames = [f for f in frames if owner[f.name] == (fi, pi, id(f))]
+                if not frames:
+                    continue
+                if not exists(png_path):
+                    results[fi]['missing'].append(png_path)
+                    continue
+                remaining[fi] += 1
+                pages_queue.append((fi, png_path, frames))
+
+        # 没有页面需要处理的文件直接产出
+        for fi, count in enumerate(remaining):
+            if count == 0:
+                yield results[fi]
+
+        window = max_workers * 2
+        resident = 0
+        next_id = 0
+        pending = {}
+        ready = deque()
+        live = {}
+        try:
+            while (pages_queue or ready or pending) and not cancelled():
+                # 优先提交编码任务以尽快释放内存
+                while ready and len(pending) < window:
+                    page_id, chunk = ready.popleft()
+                    page = live[page_id]
+                    future = executor.submit(profiled, _encode_frames, page['shm'].name, page['mode'], page['size'],
+                                             page['nbytes'], chunk, export_dir, encoder)
+                    pending[future] = ('encode', page_id)
+                # 内存预算允许时解码新的纹理页
+                while pages_queue and len(pending) < window:
+                    fi, png_path, frames = pages_queue[0]
+                    try:
+                        w, h = _page_size(png_path)
+                    except Exception as e:
+                        pages_queue.popleft()
+                        results[fi]['ok'] = False
+                        results[fi]['error'] = str(e)
+                        remaining[fi] -= 1
+                        if remaining[fi] == 0:
+                            yield results[fi]
+                        continue
+                    cost = w * h * 4
+                    if resident and resident + cost > memory_limit:
+                        break
+                    pages_queue.popleft()
+                    resident += cost
+                    page_id = next_id = next_id + 1
+                    live[page_id] = {'fi': fi, 'shm': SharedMemory(create=True, size=max(1, cost)),
+                                     'cost': cost, 'frames': frames, 'chunks': 0}
+                    future = executor.submit(profiled, _decode_page, png_path, mode, live[page_id]['shm'].name)
+                    pending[future] = ('decode', page_id)
+                if not pending:
+                    continue
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, page_id = pending.pop(future)
+                    page = live[page_id]
+                    fi = page['fi']
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        results[fi]['ok'] = False
+                        results[fi]['error'] = str(e)
+                        value = None
+                    if stage == 'decode':
+                        if value is not None:
+                            # 按帧分块, 大纹理页也能分散到多个进程编码
+                            page['mode'], page['size'], page['nbytes'], size, phases = value
+                            results[fi]['bytes'] += size
+                            results[fi]['phases'].extend(phases)
+                            frames = page['frames']
+                            step = min(256, max(8, ceil(len(frames) / max_workers)))
+                            for i in range(0, len(frames), step):
+                                ready.append((page_id, frames[i:i + step]))
+                                page['chunks'] += 1
+                            continue
+                    else:
+                        if value is not None:
+                            results[fi]['frames'] += value[0]
+                            results[fi]['phases'].extend(value[1])
+                        page['chunks'] -= 1
+                        if page['chunks'] > 0:
+                            continue
+                    # 当前纹理页处理结束 - 释放共享内存
+                    _release(page)
+                    resident -= page['cost']
+                    del live[page_id]
+                    remaining[fi] -= 1
+                    if remaining[fi] == 0:
+                        yield results[fi]
+        finally:
+            if pending:
+                wait(pending)
+            for page in live.values():
+                _release(page)
+
+def _release(page):
+    """释放纹理页的共享内存"""
+    shm = page['shm']
+    shm.close()
+    shm.unlink()
@@ -1,18 +1,56 @@
 import sys
 import os
 import json
+import time
 from pathlib import Path
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QLineEdit, QComboBox, QTextEdit, QFileDialog,
+    QPushButton, QLabel, QLineEdit, QComboBox, QFileDialog,
     QTabWidget, QGroupBox, QMessageBox, QCheckBox, QProgressBar,
-    QRadioButton, QButtonGroup
+    QRadioButton, QButtonGroup, QListWidget, QDoubleSpinBox, QSpinBox
 )
 from PySide6.QtGui import QIcon
-from PySide6.QtCore import Qt
-from SpineAtlas import ReadAtlasFile, AtlasFrame, AtlasTex, Atlas, Anchor
-from SpineAtlas import ImgPremultiplied, ImgNonPremultiplied
+from PySide6.QtCore import Qt, QTimer, QThreadPool
+from SpineAtlas import Anchor
 from PIL.Image import open as imgop
+from multiprocessing import freeze_support
+from AtlasEXCore import process_batch_file, check_file, export_file, collect_atlas_files, json_to_atlas, convert_json_file
+from AtlasEXCore import describe_step, save_preset, load_preset
+from AtlasEXCache import manifest_path, save_manifest
+from AtlasEXJobs import JobEngine, CallJob
+from AtlasEXExport import export_frames_pipeline
+from AtlasEXImage import convert_image, collect_images, collect_atlas_pages, process_image_into
+from AtlasEXVerify import verify_textures, REPORT_NAME
+from AtlasEXWriter import source_root, exclude_outputs, find_conflicts, sync_files
+from AtlasEXResample import resample_atlases, FILTERS
+from AtlasEXTrim import trim_atlases, DEFAULT_BLEED
+from AtlasEXEncode import PRESETS, encoder_suffix, save_image, transcode_atlases, compare_encoders, summarize_encoders
+from AtlasEXEncode import format_encoders, encode_report
+from AtlasEXQueue import queue_batch, task_name
+from AtlasEXPack import repack, repack_file, HEURISTICS
+from AtlasEXDedup import scan_duplicates, group_duplicates, apply_dedup, SHARED_NAME
+from AtlasEXPrune import prune_atlases
+from AtlasEXDiscover import discover_files, parse_patterns, PollWatcher, watch_poll, DEFAULT_INCLUDE, DEFAULT_EXCLUDE
+from AtlasEXDiscover import scan_files
+from AtlasEXSkel import skel_to_json_file, SKEL_PATTERNS
+from AtlasEXZip import is_archive, list_members, write_archives
+from AtlasEXIndex import update_index, open_index, index_path, INDEX_NAME
+from AtlasEXLog import RunReport, run_report_path, INFO, WARNING, ERROR
+from AtlasEXLogView import LogView
+from AtlasEXBrowser import AtlasBrowser
+from AtlasEXProfile import Profiler, format_percentiles, set_profile_dir, profiled, merge_profiles
+
+# 重复帧报告的文件名
+DEDUP_REPORT_NAME = "duplicate_frames.json"
+
+# 未引用帧报告的文件名
+PRUNE_REPORT_NAME = "unused_frames.json"
+
+# 纹理页编码报告的文件名 (写入输出目录)
+ENCODE_REPORT_NAME = "encode_report.json"
+
+# 监视模式的轮询间隔 (毫秒)
+WATCH_INTERVAL = 2000
 
 class SpineAtlasGUI(QMainWindow):
     def __init__(self):
@@ -28,19 +66,61 @@ class SpineAtlasGUI(QMainWindow):
         self.create_basic_tab()
         self.create_convert_tab()
         self.create_anchor_tab()
+        self.create_pipeline_tab()
+        self.create_repack_tab()
         self.create_image_tab()
+        self.create_browser_tab()
         
         # 状态变量
         self.current_atlas = None
+        self.pipeline_steps = []
+        self.dedup_results = []
+        self.dedup_report = None
+        self.trim_area = [0, 0]
+        self.prune_results = []
+        self.encode_results = []
         self.selected_files = []
+        self.selected_root = None
         self.atlas_files = []
         
-        # 批处理进度条
+        # 后台任务引擎
+        self.jobs = JobEngine(self)
+        self.batch_items = []
+        self.batch_success = 0
+        self.batch_missing = 0
+        self.batch_skipped = 0
+        self.batch_cache = {}
+        self.batch_outputs = []
+        self.batch_members = {}
+        self.batch_hits = 0
+        self.batch_misses = 0
+        self.run_report = None
+        self.profiler = None
+        self.profile_dir = None
+        self.throughput_shown = 0.0
+        
+        # 监视模式 - 定时轮询, 对变化的 Atlas 重新运行上一次的操作
+        self.watch_operation = None
+        self.watcher = None
+        self.watch_job = None
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(WATCH_INTERVAL)
+        self.watch_timer.timeout.connect(self.poll_watch)
+        
+        # 批处理进度条, 左侧显示实时吞吐量
         self.status_bar = self.statusBar()
+        self.throughput_label = QLabel()
+        self.status_bar.addPermanentWidget(self.throughput_label)
         self.progress_bar = QProgressBar()
         self.progress_bar.setMaximumWidth(300)
         self.status_bar.addPermanentWidget(self.progress_bar)
         self.progress_bar.setVisible(False)
+        
+        # 取消按钮
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.clicked.connect(self.cancel_batch_operation)
+        self.status_bar.addPermanentWidget(self.cancel_button)
+        self.cancel_button.setVisible(False)
     
     def create_basic_tab(self):
         """基本操作标签页 - 增强批处理功能"""
@@ -64,14 +144,44 @@ class SpineAtlasGUI(QMainWindow):
         self.recursive_checkbox = QCheckBox("包含子目录")
         self.recursive_checkbox.setChecked(True)
         
+        # 包含/排除规则 - 以分号分隔, 排除规则同时跳过匹配的目录
+        filter_layout = QHBoxLayout()
+        self.include_input = QLineEdit("; ".join(DEFAULT_INCLUDE))
+        self.exclude_input = QLineEdit("; ".join(DEFAULT_EXCLUDE))
+        filter_layout.addWidget(QLabel("包含:"))
+        filter_layout.addWidget(self.include_input)
+        filter_layout.addWidget(QLabel("排除:"))
+        filter_layout.addWidget(self.exclude_input)
+        
         # 文件列表预览
         self.file_list_info = QLabel("0 个文件待处理")
         
+        # 区域索引 - 二进制索引按 mtime 增量更新, 查询时不解析 Atlas
+        region_layout = QHBoxLayout()
+        self.region_input = QLineEdit()
+        self.region_input.setPlaceholderText("区域名称, 支持通配符")
+        self.region_min_size = QSpinBox()
+        self.region_min_size.setRange(0, 16384)
+        self.region_min_size.setSpecialValueText("不限")
+        find_region_button = QPushButton("查找区域")
+        find_region_button.clicked.connect(self.find_regions)
+        update_index_button = QPushButton("更新索引")
+        update_index_button.clicked.connect(self.update_region_index)
+        
+        region_layout.addWidget(QLabel("区域:"))
+        region_layout.addWidget(self.region_input)
+        region_layout.addWidget(QLabel("最小边长:"))
+        region_layout.addWidget(self.region_min_size)
+        region_layout.addWidget(find_region_button)
+        region_layout.addWidget(update_index_button)
+        
         file_layout.addWidget(self.atlas_path_label)
         file_layout.addWidget(browse_button)
         file_layout.addWidget(browse_dir_button)
         file_layout.addWidget(self.recursive_checkbox)
+        file_layout.addLayout(filter_layout)
         file_layout.addWidget(self.file_list_info)
+        file_layout.addLayout(region_layout)
         file_group.setLayout(file_layout)
         
         # 批处理选项组
@@ -96,13 +206,64 @@ class SpineAtlasGUI(QMainWindow):
         save_options_layout.addWidget(self.suffix_radio)
         save_options_layout.addWidget(self.suffix_input)
         
+        # 输出目录 - 为空时保存在源文件旁边, 否则按目录结构镜像
+        output_root_layout = QHBoxLayout()
+        self.output_root_input = QLineEdit()
+        self.output_root_input.setPlaceholderText("保存在源文件旁边")
+        output_root_button = QPushButton("浏览...")
+        output_root_button.clicked.connect(self.browse_output_root)
+        
+        output_root_layout.addWidget(QLabel("输出目录:"))
+        output_root_layout.addWidget(self.output_root_input)
+        output_root_layout.addWidget(output_root_button)
+        
+        # 共享队列 - 文件分片写入共享目录, 其他机器运行 worker 命令即可分担; 中断后重新运行继续未完成的分片
+        queue_layout = QHBoxLayout()
+        self.queue_input = QLineEdit()
+        self.queue_input.setPlaceholderText("为空时只在本机运行")
+        queue_button = QPushButton("浏览...")
+        queue_button.clicked.connect(self.browse_queue_root)
+        
+        queue_layout.addWidget(QLabel("共享队列目录:"))
+        queue_layout.addWidget(self.queue_input)
+        queue_layout.addWidget(queue_button)
+        
+        # 增量处理 - 按清单跳过未变化的文件
+        self.incremental_checkbox = QCheckBox("增量处理 (跳过未变化的文件)")
+        self.incremental_checkbox.setChecked(True)
+        
+        # 预演 - 只显示差异, 不写入文件
+        self.dry_run_checkbox = QCheckBox("预演 (只显示差异, 不写入)")
+        
         batch_layout.addLayout(save_options_layout)
+        batch_layout.addLayout(output_root_layout)
+        batch_layout.addLayout(queue_layout)
+        batch_layout.addWidget(self.incremental_checkbox)
+        batch_layout.addWidget(self.dry_run_checkbox)
+        
+        # 性能分析 - 阶段耗时总会统计; Trace 和 cProfile 结果保存在运行报告旁边
+        profile_layout = QHBoxLayout()
+        self.trace_checkbox = QCheckBox("保存 Chrome Trace")
+        self.cprofile_checkbox = QCheckBox("cProfile 分析 (较慢)")
+        profile_layout.addWidget(QLabel("性能分析:"))
+        profile_layout.addWidget(self.trace_checkbox)
+        profile_layout.addWidget(self.cprofile_checkbox)
+        profile_layout.addStretch()
+        batch_layout.addLayout(profile_layout)
+        
+        # 监视模式
+        self.watch_checkbox = QCheckBox("监视目录 (自动对变化的 Atlas 重新运行上一次的操作)")
+        self.watch_checkbox.toggled.connect(self.toggle_watch)
+        batch_layout.addWidget(self.watch_checkbox)
         batch_options.setLayout(batch_layout)
         
         # 连接覆盖选项变化
         self.overwrite_radio.toggled.connect(
             lambda: self.suffix_input.setEnabled(not self.overwrite_radio.isChecked())
         )
+        self.overwrite_radio.toggled.connect(
+            lambda: self.output_root_input.setEnabled(not self.overwrite_radio.isChecked())
+        )
         
         # 操作组
         operation_group = QGroupBox("基本操作")
@@ -123,10 +284,46 @@ class SpineAtlasGUI(QMainWindow):
         check_button = QPushButton("检查缺失纹理")
         check_button.clicked.connect(self.check_textures)
         
+        # 校验纹理尺寸 - 只读取 PNG 文件头
+        verify_button = QPushButton("校验纹理尺寸")
+        verify_button.clicked.connect(self.verify_textures)
+        
         # 缩放
         scale_button = QPushButton("应用纹理缩放")
         scale_button.clicked.connect(self.apply_scaling)
         
+        # 重采样纹理页 - 缩放 PNG 并写入对应的 Atlas
+        resample_layout = QHBoxLayout()
+        self.resample_scale = QDoubleSpinBox()
+        self.resample_scale.setRange(0.05, 4.0)
+        self.resample_scale.setSingleStep(0.05)
+        self.resample_scale.setValue(0.5)
+        self.resample_filter = QComboBox()
+        self.resample_filter.addItems(list(FILTERS))
+        resample_button = QPushButton("重采样纹理页...")
+        resample_button.clicked.connect(self.resample_pages)
+        
+        resample_layout.addWidget(QLabel("缩放比例:"))
+        resample_layout.addWidget(self.resample_scale)
+        resample_layout.addWidget(QLabel("滤镜:"))
+        resample_layout.addWidget(self.resample_filter)
+        resample_layout.addWidget(resample_button)
+        
+        # 收紧透明边框并扩展边缘颜色 - 避免双线性过滤出现暗边
+        trim_layout = QHBoxLayout()
+        self.trim_frames_check = QCheckBox("收紧帧")
+        self.trim_frames_check.setChecked(True)
+        self.bleed_passes = QSpinBox()
+        self.bleed_passes.setRange(0, 64)
+        self.bleed_passes.setValue(DEFAULT_BLEED)
+        trim_button = QPushButton("裁剪透明边并扩展边缘颜色...")
+        trim_button.clicked.connect(self.trim_pages)
+        
+        trim_layout.addWidget(self.trim_frames_check)
+        trim_layout.addWidget(QLabel("扩展像素:"))
+        trim_layout.addWidget(self.bleed_passes)
+        trim_layout.addWidget(trim_button)
+        
         # 导出帧
         export_layout = QHBoxLayout()
         self.mode_combo = QComboBox()
@@ -134,25 +331,32 @@ class SpineAtlasGUI(QMainWindow):
         export_button = QPushButton("导出帧")
         export_button.clicked.connect(self.export_frames)
         
+        # 流水线导出 - 解码/裁剪/编码并行, 限制内存占用
+        self.pipeline_checkbox = QCheckBox("流水线导出")
+        self.pipeline_checkbox.setChecked(True)
+        
         export_layout.addWidget(QLabel("导出模式:"))
         export_layout.addWidget(self.mode_combo)
+        export_layout.addWidget(self.pipeline_checkbox)
         export_layout.addWidget(export_button)
         
         operation_layout.addLayout(format_layout)
         operation_layout.addWidget(check_button)
+        operation_layout.addWidget(verify_button)
         operation_layout.addWidget(scale_button)
+        operation_layout.addLayout(resample_layout)
+        operation_layout.addLayout(trim_layout)
         operation_layout.addLayout(export_layout)
         operation_group.setLayout(operation_layout)
         
-        # 日志
-        self.log_area = QTextEdit()
-        self.log_area.setReadOnly(True)
+        # 日志 - 缓冲后批量刷新到虚拟化列表, 支持按级别过滤和搜索
+        self.log_view = LogView()
         
         layout.addWidget(file_group)
         layout.addWidget(batch_options)
         layout.addWidget(operation_group)
         layout.addWidget(QLabel("操作日志:"))
-        layout.addWidget(self.log_area)
+        layout.addWidget(self.log_view)
         
         tab.setLayout(layout)
         self.tab_widget.addTab(tab, "基本操作")
@@ -187,8 +391,32 @@ class SpineAtlasGUI(QMainWindow):
         convert_layout.addWidget(convert_button)
         convert_group.setLayout(convert_layout)
         
+        # 批量转换 - .atlas 保存在 JSON 旁边
+        json_batch_group = QGroupBox("批量转换")
+        json_batch_layout = QVBoxLayout()
+        
+        json_batch_button = QPushButton("转换目录中的 JSON...")
+        json_batch_button.clicked.connect(self.convert_json_directory)
+        
+        json_batch_layout.addWidget(QLabel("每个 JSON 转换为同目录下同名的 .atlas, 非纹理 JSON 将被跳过"))
+        json_batch_layout.addWidget(json_batch_button)
+        json_batch_group.setLayout(json_batch_layout)
+        
+        # 骨骼转换 - 二进制 .skel 转为 JSON, 自动识别 Spine 版本
+        skel_group = QGroupBox("骨骼 .skel 转 JSON")
+        skel_layout = QVBoxLayout()
+        
+        skel_button = QPushButton("转换目录中的 .skel...")
+        skel_button.clicked.connect(self.convert_skel_directory)
+        
+        skel_layout.addWidget(QLabel("支持 Spine 3.4 - 3.8, 4.0 和 4.2, 每个 .skel 保存为同目录下同名的 .json"))
+        skel_layout.addWidget(skel_button)
+        skel_group.setLayout(skel_layout)
+        
         layout.addWidget(json_group)
         layout.addWidget(convert_group)
+        layout.addWidget(json_batch_group)
+        layout.addWidget(skel_group)
         layout.addStretch()
         
         tab.setLayout(layout)
@@ -238,6 +466,161 @@ class SpineAtlasGUI(QMainWindow):
         tab.setLayout(layout)
         self.tab_widget.addTab(tab, "锚点操作")
     
+    def create_pipeline_tab(self):
+        """流水线标签页 - 多个操作合并为一次读取/写入"""
+        tab = QWidget()
+        layout = QVBoxLayout()
+        
+        # 添加步骤
+        add_group = QGroupBox("添加步骤")
+        add_layout = QHBoxLayout()
+        
+        self.step_combo = QComboBox()
+        self.step_combo.addItem("格式转换 → Atlas 4.0", ('convert', {'version': True}))
+        self.step_combo.addItem("格式转换 → Atlas 3.0", ('convert', {'version': False}))
+        self.step_combo.addItem("纹理缩放", ('rescale', {}))
+        self.step_combo.addItem("裁剪锚点", ('cut_anchor', {}))
+        self.step_combo.addItem("偏移锚点", ('offset_anchor', {}))
+        
+        self.step_anchor_combo = QComboBox()
+        for anchor in Anchor:
+            self.step_anchor_combo.addItem(anchor.name.replace("_", " "), anchor.value)
+        self.step_anchor_combo.setEnabled(False)
+        self.step_combo.currentIndexChanged.connect(
+            lambda: self.step_anchor_combo.setEnabled(self.step_combo.currentData()[0].endswith('_anchor'))
+        )
+        
+        add_step_button = QPushButton("添加")
+        add_step_button.clicked.connect(self.add_pipeline_step)
+        
+        add_layout.addWidget(self.step_combo)
+        add_layout.addWidget(self.step_anchor_combo)
+        add_layout.addWidget(add_step_button)
+        add_group.setLayout(add_layout)
+        
+        # 步骤列表
+        steps_group = QGroupBox("流水线步骤 (按顺序应用)")
+        steps_layout = QVBoxLayout()
+        
+        self.steps_list = QListWidget()
+        
+        steps_buttons = QHBoxLayout()
+        for text, slot in (("上移", lambda: self.move_pipeline_step(-1)),
+                           ("下移", lambda: self.move_pipeline_step(1)),
+                           ("删除", self.remove_pipeline_step),
+                           ("清空", self.clear_pipeline_steps)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            steps_buttons.addWidget(button)
+        
+        steps_layout.addWidget(self.steps_list)
+        steps_layout.addLayout(steps_buttons)
+        steps_group.setLayout(steps_layout)
+        
+        # 预设与运行
+        run_layout = QHBoxLayout()
+        load_preset_button = QPushButton("载入预设...")
+        load_preset_button.clicked.connect(self.load_pipeline_preset)
+        save_preset_button = QPushButton("保存预设...")
+        save_preset_button.clicked.connect(self.save_pipeline_preset)
+        run_pipeline_button = QPushButton("运行流水线")
+        run_pipeline_button.clicked.connect(self.run_pipeline)
+        
+        run_layout.addWidget(load_preset_button)
+        run_layout.addWidget(save_preset_button)
+        run_layout.addWidget(run_pipeline_button)
+        
+        layout.addWidget(add_group)
+        layout.addWidget(steps_group)
+        layout.addLayout(run_layout)
+        
+        tab.setLayout(layout)
+        self.tab_widget.addTab(tab, "操作流水线")
+    
+    def create_repack_tab(self):
+        """重新打包标签页 - 重新装箱帧, 合并到更少更密的纹理页"""
+        tab = QWidget()
+        layout = QVBoxLayout()
+        
+        # 装箱选项
+        options_group = QGroupBox("装箱选项")
+        options_layout = QVBoxLayout()
+        
+        size_layout = QHBoxLayout()
+        self.repack_size_combo = QComboBox()
+        for size in (1024, 2048, 4096, 8192):
+            self.repack_size_combo.addItem(f"{size} x {size}", size)
+        self.repack_size_combo.setCurrentIndex(1)
+        self.repack_padding = QSpinBox()
+        self.repack_padding.setRange(0, 32)
+        self.repack_padding.setValue(2)
+        self.repack_heuristic_combo = QComboBox()
+        self.repack_heuristic_combo.addItems(HEURISTICS)
+        size_layout.addWidget(QLabel("最大页尺寸:"))
+        size_layout.addWidget(self.repack_size_combo)
+        size_layout.addWidget(QLabel("帧间距:"))
+        size_layout.addWidget(self.repack_padding)
+        size_layout.addWidget(QLabel("算法:"))
+        size_layout.addWidget(self.repack_heuristic_combo)
+        
+        check_layout = QHBoxLayout()
+        self.repack_trim_check = QCheckBox("裁掉透明边框")
+        self.repack_trim_check.setChecked(True)
+        self.repack_rotate_check = QCheckBox("允许旋转")
+        self.repack_rotate_check.setChecked(True)
+        self.repack_pot_check = QCheckBox("页尺寸取 2 的幂")
+        check_layout.addWidget(self.repack_trim_check)
+        check_layout.addWidget(self.repack_rotate_check)
+        check_layout.addWidget(self.repack_pot_check)
+        
+        options_layout.addLayout(size_layout)
+        options_layout.addLayout(check_layout)
+        options_group.setLayout(options_layout)
+        
+        # 运行
+        run_group = QGroupBox("重新打包")
+        run_layout = QHBoxLayout()
+        repack_each_button = QPushButton("逐个重新打包到输出目录")
+        repack_each_button.clicked.connect(self.repack_each)
+        repack_merge_button = QPushButton("合并为一个 Atlas...")
+        repack_merge_button.clicked.connect(self.repack_merge)
+        run_layout.addWidget(repack_each_button)
+        run_layout.addWidget(repack_merge_button)
+        run_group.setLayout(run_layout)
+        
+        # 重复帧
+        dedup_group = QGroupBox("跨 Atlas 重复帧")
+        dedup_layout = QHBoxLayout()
+        scan_dedup_button = QPushButton("分析重复帧")
+        scan_dedup_button.clicked.connect(self.scan_duplicate_frames)
+        apply_dedup_button = QPushButton("提取到共享纹理页...")
+        apply_dedup_button.clicked.connect(self.apply_duplicate_frames)
+        dedup_layout.addWidget(scan_dedup_button)
+        dedup_layout.addWidget(apply_dedup_button)
+        dedup_group.setLayout(dedup_layout)
+        
+        # 未引用的帧
+        prune_group = QGroupBox("骨骼未引用的帧")
+        prune_layout = QHBoxLayout()
+        scan_prune_button = QPushButton("分析未引用的帧")
+        scan_prune_button.clicked.connect(lambda: self.prune_frames(False))
+        apply_prune_button = QPushButton("删除未引用的帧")
+        apply_prune_button.clicked.connect(lambda: self.prune_frames(True))
+        self.prune_compact_check = QCheckBox("删除后重新打包纹理页")
+        prune_layout.addWidget(scan_prune_button)
+        prune_layout.addWidget(apply_prune_button)
+        prune_layout.addWidget(self.prune_compact_check)
+        prune_group.setLayout(prune_layout)
+        
+        layout.addWidget(options_group)
+        layout.addWidget(run_group)
+        layout.addWidget(dedup_group)
+        layout.addWidget(prune_group)
+        layout.addStretch()
+        
+        tab.setLayout(layout)
+        self.tab_widget.addTab(tab, "重新打包")
+    
     def create_image_tab(self):
         """图像处理标签页"""
         tab = QWidget()
@@ -260,7 +643,8 @@ class SpineAtlasGUI(QMainWindow):
         process_layout = QVBoxLayout()
         
         self.process_combo = QComboBox()
-        self.process_combo.addItems(["转换为预乘", "转换为非预乘"])
+        self.process_combo.addItem("转换为预乘", "Premul")
+        self.process_combo.addItem("转换为非预乘", "NonPremul")
         
         process_button = QPushButton("应用处理")
         process_button.clicked.connect(self.process_image)
@@ -271,13 +655,61 @@ class SpineAtlasGUI(QMainWindow):
         process_layout.addWidget(process_button)
         process_group.setLayout(process_layout)
         
+        # 批量处理组 - 使用进程池
+        batch_group = QGroupBox("批量处理")
+        batch_layout = QVBoxLayout()
+        
+        batch_dir_button = QPushButton("处理目录中的 PNG...")
+        batch_dir_button.clicked.connect(self.process_image_directory)
+        
+        batch_atlas_button = QPushButton("处理所选 Atlas 的纹理页...")
+        batch_atlas_button.clicked.connect(self.process_atlas_pages)
+        
+        batch_layout.addWidget(batch_dir_button)
+        batch_layout.addWidget(batch_atlas_button)
+        batch_group.setLayout(batch_layout)
+        
+        # 输出编码 - 图像处理, 流水线导出帧和纹理页转码都使用这里选择的编码器
+        encode_group = QGroupBox("输出编码")
+        encode_layout = QVBoxLayout()
+        
+        self.encoder_combo = QComboBox()
+        for name, spec in PRESETS.items():
+            self.encoder_combo.addItem(name, spec)
+        
+        encode_buttons = QHBoxLayout()
+        transcode_button = QPushButton("转码所选 Atlas 的纹理页...")
+        transcode_button.clicked.connect(self.transcode_pages)
+        compare_button = QPushButton("比较所有编码器")
+        compare_button.clicked.connect(self.compare_page_encoders)
+        encode_buttons.addWidget(transcode_button)
+        encode_buttons.addWidget(compare_button)
+        
+        encode_layout.addWidget(QLabel("编码器:"))
+        encode_layout.addWidget(self.encoder_combo)
+        encode_layout.addLayout(encode_buttons)
+        encode_group.setLayout(encode_layout)
+        
         layout.addWidget(image_group)
         layout.addWidget(process_group)
+        layout.addWidget(batch_group)
+        layout.addWidget(encode_group)
         layout.addStretch()
         
         tab.setLayout(layout)
         self.tab_widget.addTab(tab, "图像处理")
     
+    def create_browser_tab(self):
+        """Atlas 浏览标签页 - 切换到此页时载入所选文件"""
+        self.browser = AtlasBrowser()
+        self.browser.status.connect(lambda message: self.log(message, warning=True))
+        self.browser_tab_index = self.tab_widget.addTab(self.browser, "浏览")
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+    
+    def on_tab_changed(self, index):
+        if index == self.browser_tab_index:
+            self.browser.set_files(self.selected_files)
+    
     def browse_atlas(self, is_directory=False):
         """浏览并选择 Atlas 文件或目录"""
         if is_directory:
@@ -289,35 +721,82 @@ class SpineAtlasGUI(QMainWindow):
                 self.collect_files(path)
         else:
             paths, _ = QFileDialog.getOpenFileNames(
-                self, "选择 Atlas 文件", "", "Atlas Files (*.atlas)"
+                self, "选择 Atlas 文件", "", "Atlas 文件或压缩包 (*.atlas *.zip);;Atlas Files (*.atlas)"
             )
             if paths:
+                paths = self.expand_archives(paths)
                 self.selected_files = paths
+                self.selected_root = None
                 self.atlas_path_label.setText(f"文件: {', '.join([Path(p).name for p in paths])}")
                 self.file_list_info.setText(f"{len(paths)} 个文件待处理")
     
+    def expand_archives(self, paths):
+        """把选择的 .zip 展开为其中匹配的成员 (只读取中央目录)"""
+        include = parse_patterns(self.include_input.text()) or DEFAULT_INCLUDE
+        exclude = parse_patterns(self.exclude_input.text())
+        files = []
+        for path in paths:
+            if not is_archive(path):
+                files.append(path)
+                continue
+            try:
+                members = list_members(path, include, exclude)
+            except Exception as e:
+                self.log(f"读取压缩包失败 {Path(path).name}: {str(e)}", error=True)
+                continue
+            self.log(f"压缩包 {Path(path).name} 中找到 {len(members)} 个文件")
+            files.extend(members)
+        return files
+    
     def collect_files(self, directory_path):
-        """收集目录中的所有 Atlas 文件"""
+        """在后台收集目录中的所有 Atlas 文件, 边找边更新列表"""
+        if self.jobs.is_running():
+            self.log("已有批处理任务正在运行", error=True)
+            return
+        
         recursive = self.recursive_checkbox.isChecked()
+        include = parse_patterns(self.include_input.text()) or DEFAULT_INCLUDE
+        exclude = parse_patterns(self.exclude_input.text())
         self.selected_files = []
-        
-        try:
-            path_obj = Path(directory_path)
-            pattern = "*.atlas"
-            
-            if recursive:
-                for file in path_obj.rglob(pattern):
-                    if file.is_file():
-                        self.selected_files.append(str(file))
-            else:
-                for file in path_obj.glob(pattern):
-                    if file.is_file():
-                        self.selected_files.append(str(file))
-            
-            self.file_list_info.setText(f"找到 {len(self.selected_files)} 个 Atlas 文件")
-            self.log(f"在目录中收集到 {len(self.selected_files)} 个 Atlas 文件")
-        except Exception as e:
-            self.log(f"收集文件失败: {str(e)}", error=True)
+        self.selected_root = directory_path
+        self.stop_watch()
+        
+        job = self.jobs.submit_iter(discover_files, (directory_path, recursive, include, exclude))
+        job.signals.result.connect(self.on_files_found)
+        job.signals.finished.connect(self.end_discovery)
+        self.file_list_info.setText("正在查找 Atlas 文件...")
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.cancel_button.setVisible(True)
+        self.jobs.start(job)
+    
+    def on_files_found(self, result):
+        """发现一批文件"""
+        if 'error' in result:
+            self.log(f"收集文件失败: {result['error']}", error=True)
+            return
+        self.selected_files.extend(result['files'])
+        self.file_list_info.setText(f"已找到 {len(self.selected_files)} 个 Atlas 文件...")
+    
+    def end_discovery(self, done, cancelled):
+        """文件发现结束"""
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        state = " (已取消)" if cancelled else ""
+        self.file_list_info.setText(f"找到 {len(self.selected_files)} 个 Atlas 文件{state}")
+        self.log(f"在目录中收集到 {len(self.selected_files)} 个 Atlas 文件{state}")
+    
+    def browse_output_root(self):
+        """选择镜像输出目录"""
+        path = QFileDialog.getExistingDirectory(self, "选择输出目录", "")
+        if path:
+            self.output_root_input.setText(path)
+    
+    def browse_queue_root(self):
+        """选择共享队列目录"""
+        path = QFileDialog.getExistingDirectory(self, "选择共享队列目录", "")
+        if path:
+            self.queue_input.setText(path)
     
     def browse_json(self):
         """浏览并选择 JSON 文件"""
@@ -335,131 +814,712 @@ class SpineAtlasGUI(QMainWindow):
         if path:
             self.image_path_label.setText(Path(path).name)
     
-    def log(self, message, error=False):
-        """记录日志"""
-        prefix = "[ERROR] " if error else "[INFO] "
-        self.log_area.append(prefix + message)
+    def log(self, message, error=False, warning=False):
+        """记录日志 - 写入缓冲, 由日志视图定时批量显示"""
+        self.log_view.write(ERROR if error else WARNING if warning else INFO, message)
     
-    def start_batch_operation(self):
-        """开始批处理操作"""
-        if not self.selected_files:
+    def start_batch_operation(self, items=None):
+        """开始批处理操作, 默认处理 selected_files"""
+        if self.jobs.is_running():
+            self.log("已有批处理任务正在运行", error=True)
+            return False
+        
+        items = self.selected_files if items is None else items
+        if not items:
             self.log("没有选择任何文件或目录", error=True)
             return False
         
-        self.progress_bar.setRange(0, len(self.selected_files))
+        self.batch_items = items
+        self.batch_success = 0
+        self.batch_missing = 0
+        self.batch_skipped = 0
+        self.batch_cache = {}
+        self.batch_outputs = []
+        self.batch_members = {}
+        self.batch_hits = 0
+        self.batch_misses = 0
+        self.run_report = None
+        self.progress_bar.setRange(0, len(items))
         self.progress_bar.setValue(0)
         self.progress_bar.setVisible(True)
         return True
     
-    def update_progress(self, index):
+    def run_batch_operation(self, func, args, on_result, summary, stream=False):
+        """在后台进程池中运行批处理, summary(done, cancelled) 在结束时调用"""
+        self.begin_run_report(func.__name__)
+        queue_root = self.queue_input.text().strip()
+        task = task_name(func) if queue_root and not stream else None
+        if task is not None:
+            # 通过共享队列运行, 本进程同时作为工作者, 产出所有工作者的结果
+            job = self.jobs.submit(queue_batch, self.batch_items, (queue_root, task, args), stream=True)
+            self.log(f"通过共享队列运行: {queue_root}")
+        else:
+            if queue_root:
+                self.log("此操作不支持共享队列, 在本机运行", warning=True)
+            job = self.jobs.submit(func, self.batch_items, args, stream=stream)
+        job.signals.result.connect(self.count_cache_stats)
+        job.signals.result.connect(self.collect_member_output)
+        job.signals.result.connect(self.record_run_result)
+        job.signals.result.connect(on_result)
+        job.signals.progress.connect(self.update_progress)
+        job.signals.finished.connect(
+            lambda done, cancelled: self.end_batch_operation(summary, done, cancelled)
+        )
+        self.cancel_button.setVisible(True)
+        self.jobs.start(job)
+    
+    def submit_call(self, func, args, total):
+        """提交单次调用任务, 并开始记录运行报告"""
+        self.begin_run_report(func.__name__)
+        if self.profile_dir is not None:
+            # 在任务线程中运行 cProfile
+            job = self.jobs.submit_call(lambda *a, **k: profiled(func, *a, **k), args, total)
+        else:
+            job = self.jobs.submit_call(func, args, total)
+        job.signals.result.connect(self.record_run_result)
+        return job
+    
+    def begin_run_report(self, command):
+        """为本次批处理打开 JSONL 运行报告 (保存在输入目录的 .atlasex_runs/ 中), 并开始统计耗时"""
+        self.profiler = Profiler()
+        self.throughput_label.setText("")
+        try:
+            path = run_report_path(self.batch_items, command)
+            self.run_report = RunReport(path, command, len(self.batch_items)) if path else None
+        except OSError as e:
+            self.run_report = None
+            self.log(f"无法创建运行报告: {str(e)}", warning=True)
+        # cProfile 结果保存在运行报告旁边的 <报告名>.profile/ 中
+        if self.cprofile_checkbox.isChecked() and self.run_report is not None:
+            self.profile_dir = os.path.splitext(self.run_report.path)[0] + ".profile"
+            set_profile_dir(self.profile_dir)
+    
+    def record_run_result(self, result):
+        """把单个文件的结果写入运行报告, 并更新吞吐量"""
+        if self.run_report is not None:
+            self.run_report.record(result)
+        if self.profiler is not None:
+            self.profiler.add(result)
+            # 每秒最多刷新 4 次
+            now = time.perf_counter()
+            if now - self.throughput_shown >= 0.25:
+                self.throughput_shown = now
+                self.show_throughput(self.profiler)
+    
+    def show_throughput(self, profiler):
+        files_rate, mb_rate = profiler.throughput()
+        self.throughput_label.setText(f"{files_rate:.1f} 文件/秒, {mb_rate:.2f} MB/秒")
+    
+    def finish_profiling(self):
+        """输出阶段耗时的百分位数, 按选项保存 Chrome Trace 和 cProfile 结果"""
+        profiler, self.profiler = self.profiler, None
+        if profiler is None:
+            return
+        if profiler.files:
+            self.show_throughput(profiler)
+        stats = profiler.percentiles()
+        if profiler.phases:
+            for line in format_percentiles(stats):
+                self.log(line)
+        base = os.path.splitext(self.run_report.path)[0] if self.run_report is not None else None
+        if self.trace_checkbox.isChecked() and base and profiler.events:
+            try:
+                profiler.write_trace(base + ".trace.json")
+                self.log(f"Trace 已保存到: {base}.trace.json (可用 chrome://tracing 或 Perfetto 打开)")
+            except OSError as e:
+                self.log(f"保存 Trace 失败: {str(e)}", warning=True)
+        if self.profile_dir is not None:
+            set_profile_dir(None)
+            try:
+                merged = merge_profiles(self.profile_dir)
+                if merged:
+                    self.log(f"cProfile 结果已保存到: {merged}")
+            except Exception as e:
+                self.log(f"合并 cProfile 结果失败: {str(e)}", warning=True)
+            self.profile_dir = None
+        return stats
+    
+    def count_cache_stats(self, result):
+        """累计会话缓存命中统计"""
+        self.batch_hits += result.get('cache_hits', 0)
+        self.batch_misses += result.get('cache_misses', 0)
+    
+    def collect_member_output(self, result):
+        """输出到压缩包成员的结果先保存在内存中, 批处理结束时统一写入新压缩包"""
+        if 'data' in result:
+            self.batch_members[result['output']] = result.pop('data')
+    
+    def update_progress(self, done, total):
         """更新进度条"""
-        self.progress_bar.setValue(index + 1)
-        QApplication.processEvents()  # 确保UI更新
+        self.progress_bar.setValue(done)
+    
+    def cancel_batch_operation(self):
+        """取消正在运行的批处理"""
+        if self.jobs.is_running():
+            self.jobs.cancel()
+            self.log("正在取消批处理, 等待进行中的文件完成...")
     
-    def end_batch_operation(self):
+    def end_batch_operation(self, summary=None, done=0, cancelled=False):
         """结束批处理操作"""
         self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+        if cancelled:
+            self.log(f"批处理已取消, 已处理 {done}/{len(self.batch_items)} 个文件")
+        if self.batch_members:
+            try:
+                for archive in write_archives(self.batch_members):
+                    self.log(f"已写入压缩包: {archive}")
+            except Exception as e:
+                self.log(f"写入压缩包失败: {str(e)}", error=True)
+            self.batch_members = {}
+        if summary is not None:
+            summary(done, cancelled)
+        if self.batch_hits or self.batch_misses:
+            self.log(f"缓存命中: {self.batch_hits}, 未命中: {self.batch_misses}")
+        timings = self.finish_profiling()
+        if self.run_report is not None:
+            try:
+                self.run_report.close({'done': done, 'cache_hits': self.batch_hits,
+                                       'cache_misses': self.batch_misses, 'timings': timings}, cancelled)
+                self.log(f"运行报告已保存到: {self.run_report.path}")
+            except OSError as e:
+                self.log(f"写入运行报告失败: {str(e)}", warning=True)
+            self.run_report = None
     
-    def process_batch_file(self, file_path, operation_callback):
-        """处理单个文件 - 支持覆盖和添加后缀选项"""
-        try:
-            # 创建临时文件路径避免覆盖问题
-            temp_file = f"{file_path}.tmp"
-            
-            # 处理文件
-            atlas = ReadAtlasFile(file_path)
-            operation_callback(atlas)
-            
-            # 保存到临时文件
-            atlas.SaveAtlas(temp_file)
-            
-            # 确定最终保存路径
-            if self.overwrite_radio.isChecked():
-                # 安全覆盖原文件
-                os.replace(temp_file, file_path)
-                self.log(f"成功覆盖: {Path(file_path).name}")
+    def run_modify_batch(self, operation, params, title, files=None):
+        """运行修改 Atlas 的批处理操作 - files 为空时处理所选文件, 并记录为监视模式的操作"""
+        if files is None:
+            files = self.selected_files
+            self.watch_operation = (operation, params, title)
+        overwrite = self.overwrite_radio.isChecked()
+        suffix = self.suffix_input.text().strip()
+        output_root = None if overwrite else self.output_root_input.text().strip() or None
+        root = self.selected_root or source_root(self.selected_files)
+        dry_run = self.dry_run_checkbox.isChecked()
+        
+        # 上次运行生成的输出不再作为输入
+        files, excluded = exclude_outputs(files, overwrite, suffix, output_root, root)
+        if excluded:
+            self.log(f"跳过 {len(excluded)} 个上次生成的输出文件")
+        
+        # 多个输入写到同一输出时拒绝执行, 避免静默覆盖
+        conflicts = find_conflicts(files, overwrite, suffix, output_root, root)
+        if conflicts:
+            for target, sources in conflicts.items():
+                self.log(f"输出冲突: {target} <- {', '.join(sources)}", error=True)
+            self.log("请修改后缀或输出目录后重试", error=True)
+            return
+        
+        if not self.start_batch_operation(files):
+            return
+        
+        manifest = manifest_path(files) if self.incremental_checkbox.isChecked() else None
+        total = len(files)
+        
+        def summary(done, cancelled):
+            if dry_run:
+                self.log(f"{title}预演完成! 将修改: {len(self.batch_outputs)}/{total}")
+                return
+            # 批量刷盘, 每个目录只同步一次
+            for path, error in sync_files(self.batch_outputs):
+                self.log(f"同步到磁盘失败 {path}: {error}", error=True)
+            # 监视模式下忽略本次写入的输出
+            if self.watcher is not None:
+                self.watcher.refresh(self.batch_outputs)
+            if manifest and self.batch_cache:
+                try:
+                    save_manifest(manifest, self.batch_cache)
+                except Exception as e:
+                    self.log(f"保存增量清单失败: {str(e)}", error=True)
+            skipped = f", 跳过未变化: {self.batch_skipped}" if manifest else ""
+            self.log(f"{title}完成! 成功: {self.batch_success}/{total}{skipped}")
+        
+        self.run_batch_operation(
+            process_batch_file, (operation, params, overwrite, suffix, manifest, output_root, root, dry_run),
+            self.on_file_processed,
+            summary
+        )
+    
+    def on_file_processed(self, result):
+        """单个文件处理完成"""
+        name = Path(result['file']).name
+        if result.get('cache'):
+            key, record = result['cache']
+            self.batch_cache[key] = record
+        if result.get('skipped'):
+            self.batch_success += 1
+            self.batch_skipped += 1
+            self.log(f"跳过未变化: {name}")
+        elif 'diff' in result:
+            self.batch_success += 1
+            if result['diff']:
+                self.batch_outputs.append(result['output'])
+                self.log(f"将修改 {result['output']}:")
+                self.log(result['diff'])
             else:
-                # 添加后缀保存
-                suffix = self.suffix_input.text().strip()
-                save_path = f"{Path(file_path).stem}{suffix}.atlas"
-                os.replace(temp_file, save_path)
-                self.log(f"保存为: {Path(save_path).name}")
-            
-            return True
-        except Exception as e:
-            # 删除临时文件
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-            self.log(f"处理失败 {Path(file_path).name}: {str(e)}", error=True)
-            return False
+                self.log(f"无变化: {name}")
+        elif result['ok']:
+            self.batch_success += 1
+            self.batch_outputs.append(result['output'])
+            if result['output'] == result['file']:
+                self.log(f"成功覆盖: {name}")
+            else:
+                self.log(f"保存为: {result['output']}")
+        else:
+            self.log(f"处理失败 {name}: {result['error']}", error=True)
     
     def convert_format(self):
         """转换 Atlas 格式 - 支持批处理"""
+        target_format = True if "4.0" in self.format_combo.currentText() else False
+        self.run_modify_batch('convert', {'version': target_format}, "格式转换")
+    
+    def check_textures(self):
+        """检查缺失纹理 - 支持批处理"""
         if not self.start_batch_operation():
             return
         
-        target_format = True if "4.0" in self.format_combo.currentText() else False
-        success_count = 0
+        total = len(self.selected_files)
+        self.run_batch_operation(
+            check_file, (),
+            self.on_file_checked,
+            lambda done, cancelled: self.log(f"纹理检查完成! 共在 {total} 个文件中发现 {self.batch_missing} 个缺失纹理")
+        )
+    
+    def on_file_checked(self, result):
+        """单个文件纹理检查完成"""
+        name = Path(result['file']).name
+        if not result['ok']:
+            self.log(f"检查 {name} 失败: {result['error']}", error=True)
+            return
         
-        # 定义格式转换操作
-        def convert_op(atlas):
-            atlas.version = target_format
+        miss = result['missing']
+        if miss:
+            self.batch_missing += len(miss)
+            self.log(f"{name} 缺失 {len(miss)} 个纹理:")
+            for texture in miss:
+                self.log(f" - {texture}")
+        else:
+            self.log(f"{name} 没有缺失纹理")
+    
+    def verify_textures(self):
+        """校验缺失纹理, 尺寸不一致和孤立 PNG, 并保存 JSON 报告"""
+        if not self.start_batch_operation():
+            return
         
-        for i, file_path in enumerate(self.selected_files):
-            self.update_progress(i)
-            if self.process_batch_file(file_path, convert_op):
-                success_count += 1
+        files = list(self.selected_files)
+        roots = [self.selected_root] if self.selected_root else None
+        job = self.submit_call(verify_textures, (files, roots), len(files))
+        job.signals.result.connect(self.on_textures_verified)
+        job.signals.progress.connect(self.update_progress)
+        job.signals.finished.connect(
+            lambda done, cancelled: self.end_batch_operation(None, done, cancelled)
+        )
+        self.cancel_button.setVisible(True)
+        self.jobs.start(job)
+    
+    def on_textures_verified(self, report):
+        """纹理校验完成"""
+        if 'error' in report:
+            self.log(f"纹理校验失败: {report['error']}", error=True)
+            return
+        if report['cancelled']:
+            return
+        for item in report['missing']:
+            self.log(f"缺失纹理: {item['texture']} (被 {len(item['atlases'])} 个 Atlas 引用)", error=True)
+        for item in report['mismatched']:
+            self.log(f"尺寸不一致: {item['texture']} 声明 {item['declared'][0]}x{item['declared'][1]}, "
+                     f"实际 {item['actual'][0]}x{item['actual'][1]} ({Path(item['atlas']).name})", error=True)
+        for item in report['errors']:
+            self.log(f"读取失败 {item['file']}: {item['error']}", error=True)
+        self.log(f"纹理校验完成! {report['atlases']} 个 Atlas, {report['textures']} 个纹理页, "
+                 f"缺失: {len(report['missing'])}, 尺寸不一致: {len(report['mismatched'])}, "
+                 f"孤立 PNG: {len(report['orphans'])}")
+        
+        # 报告保存在所选目录 (或所选文件的公共目录)
+        root = self.selected_root or os.path.commonpath([str(Path(f).resolve().parent) for f in self.batch_items])
+        report_file = Path(root).joinpath(REPORT_NAME)
+        try:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.log(f"校验报告已保存到: {report_file}")
+        except Exception as e:
+            self.log(f"保存校验报告失败: {str(e)}", error=True)
+    
+    def region_index_file(self):
+        """当前选择对应的索引文件 - 所选目录或所选文件的公共目录"""
+        if self.selected_root:
+            return str(Path(self.selected_root).joinpath(INDEX_NAME))
+        return index_path(self.selected_files)
+    
+    def update_region_index(self):
+        """按 mtime 同步区域索引, 只解析新增或修改的 Atlas"""
+        if not self.start_batch_operation():
+            return
         
-        self.end_batch_operation()
-        self.log(f"格式转换完成! 成功: {success_count}/{len(self.selected_files)}")
+        files = list(self.selected_files)
+        job = self.submit_call(update_index, (files, self.region_index_file()), len(files))
+        job.signals.result.connect(self.on_index_updated)
+        job.signals.progress.connect(self.update_progress)
+        job.signals.finished.connect(
+            lambda done, cancelled: self.end_batch_operation(None, done, cancelled)
+        )
+        self.cancel_button.setVisible(True)
+        self.jobs.start(job)
     
-    def check_textures(self):
-        """检查缺失纹理 - 支持批处理"""
+    def on_index_updated(self, report):
+        """区域索引更新完成"""
+        if 'error' in report:
+            self.log(f"更新索引失败: {report['error']}", error=True)
+            return
+        if report['cancelled']:
+            return
+        for item in report['errors']:
+            self.log(f"解析失败 {item['file']}: {item['error']}", error=True)
+        self.log(f"索引已更新: {report['index']} ({report['atlases']} 个 Atlas, {report['frames']} 帧; "
+                 f"解析 {report['parsed']}, 复用 {report['reused']}, 移除 {report['removed']})")
+    
+    def find_regions(self):
+        """在区域索引中按名称或尺寸查找 - 直接查询 mmap 索引, 不解析 Atlas"""
+        name = self.region_input.text().strip()
+        min_size = self.region_min_size.value()
+        if not name and not min_size:
+            self.log("请输入区域名称或最小边长", error=True)
+            return
+        path = self.region_index_file()
+        index = open_index(path) if path else None
+        if index is None:
+            self.log("尚未建立区域索引, 请先更新索引", error=True)
+            return
+        with index:
+            matches = index.find(name) if name else index.frames_larger(min_size)
+            if name and min_size:
+                matches = [m for m in matches if m['size'][0] > min_size or m['size'][1] > min_size]
+            stale = index.stale()
+        # 只显示前 200 条, 避免日志过长
+        for item in matches[:200]:
+            self.log(f"{item['frame']}: {item['atlas']} [{item['page']}] "
+                     f"{item['size'][0]}x{item['size'][1]} @ {item['xy'][0]},{item['xy'][1]}")
+        more = ", 只显示前 200 个" if len(matches) > 200 else ""
+        self.log(f"找到 {len(matches)} 个区域{more}")
+        if stale:
+            self.log(f"索引中有 {len(stale)} 个 Atlas 已变化, 请更新索引", warning=True)
+    
+    def apply_scaling(self):
+        """应用纹理缩放 - 支持批处理"""
+        self.run_modify_batch('rescale', {}, "纹理缩放")
+    
+    def resample_pages(self):
+        """重采样所选 Atlas 的纹理页, 与 Atlas 一起写入输出目录"""
+        if not self.selected_files:
+            self.log("没有选择任何文件或目录", error=True)
+            return
+        
+        output_root = self.output_root_input.text().strip()
+        if not output_root:
+            output_root = QFileDialog.getExistingDirectory(self, "选择输出目录")
+            if not output_root:
+                return
+        
         if not self.start_batch_operation():
             return
         
-        total_missing = 0
+        scale = self.resample_scale.value()
+        filter_name = self.resample_filter.currentText()
+        total = len(self.selected_files)
+        self.run_batch_operation(
+            resample_atlases, (output_root, scale, filter_name),
+            self.on_atlas_resampled,
+            lambda done, cancelled: self.log(f"纹理页重采样完成! 成功: {self.batch_success}/{total}"),
+            stream=True
+        )
+    
+    def on_atlas_resampled(self, result):
+        """单个 Atlas 的纹理页重采样完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.log(f"已重采样 {name} 的 {result['pages']} 个纹理页, 保存为: {result['output']}")
+        else:
+            self.log(f"重采样 {name} 失败: {result['error']}", error=True)
+    
+    def trim_pages(self):
+        """收紧所选 Atlas 的帧并扩展纹理页的边缘颜色, 与 Atlas 一起写入输出目录"""
+        if not self.selected_files:
+            self.log("没有选择任何文件或目录", error=True)
+            return
+        
+        output_root = self.output_root_input.text().strip()
+        if not output_root:
+            output_root = QFileDialog.getExistingDirectory(self, "选择输出目录")
+            if not output_root:
+                return
         
-        for i, file_path in enumerate(self.selected_files):
-            self.update_progress(i)
-            try:
-                atlas = ReadAtlasFile(file_path)
-                miss = atlas.CheckTextures()
-                
-                if miss:
-                    total_missing += len(miss)
-                    self.log(f"{Path(file_path).name} 缺失 {len(miss)} 个纹理:")
-                    for texture in miss:
-                        self.log(f" - {texture}")
-                else:
-                    self.log(f"{Path(file_path).name} 没有缺失纹理")
-            except Exception as e:
-                self.log(f"检查 {Path(file_path).name} 失败: {str(e)}", error=True)
+        if not self.start_batch_operation():
+            return
         
-        self.end_batch_operation()
-        self.log(f"纹理检查完成! 共在 {len(self.selected_files)} 个文件中发现 {total_missing} 个缺失纹理")
+        self.trim_area = [0, 0]
+        total = len(self.selected_files)
+        self.run_batch_operation(
+            trim_atlases, (output_root, self.trim_frames_check.isChecked(), self.bleed_passes.value()),
+            self.on_atlas_trimmed,
+            lambda done, cancelled: self.log(
+                f"裁剪透明边完成! 成功: {self.batch_success}/{total}, 帧面积 {self.trim_area[0]} -> "
+                f"{self.trim_area[0] - self.trim_area[1]} 像素, 节省 {self.trim_area[1]}"),
+            stream=True
+        )
     
-    def apply_scaling(self):
-        """应用纹理缩放 - 支持批处理"""
+    def on_atlas_trimmed(self, result):
+        """单个 Atlas 的帧收紧和边缘扩展完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.trim_area[0] += result['area_before']
+            self.trim_area[1] += result['area_saved']
+            self.log(f"已处理 {name}: 收紧 {result['trimmed']}/{result['frames']} 帧, 节省 {result['area_saved']} 像素, "
+                     f"扩展 {result['bled']} 像素, 保存为: {result['output']}")
+            if result['bleed_skipped']:
+                self.log(f"{name} 有 {result['bleed_skipped']} 个预乘纹理页, 未扩展边缘颜色", warning=True)
+        else:
+            self.log(f"处理 {name} 失败: {result['error']}", error=True)
+    
+    def repack_options(self):
+        """重新打包选项 - (最大页尺寸, 帧间距, 裁剪, 旋转, 算法, 2 的幂)"""
+        return (self.repack_size_combo.currentData(), self.repack_padding.value(),
+                self.repack_trim_check.isChecked(), self.repack_rotate_check.isChecked(),
+                self.repack_heuristic_combo.currentText(), self.repack_pot_check.isChecked())
+    
+    def repack_each(self):
+        """逐个重新打包所选 Atlas, 按源目录结构写入输出目录"""
+        if not self.selected_files:
+            self.log("没有选择任何文件或目录", error=True)
+            return
+        
+        output_root = self.output_root_input.text().strip()
+        if not output_root:
+            output_root = QFileDialog.getExistingDirectory(self, "选择输出目录")
+            if not output_root:
+                return
+        
         if not self.start_batch_operation():
             return
         
-        success_count = 0
+        total = len(self.selected_files)
+        self.run_batch_operation(
+            repack_file, (output_root, source_root(self.selected_files)) + self.repack_options(),
+            self.on_atlas_repacked,
+            lambda done, cancelled: self.log(f"重新打包完成! 成功: {self.batch_success}/{total}")
+        )
+    
+    def repack_merge(self):
+        """把所选 Atlas 的帧合并到一个新的 Atlas"""
+        if not self.selected_files:
+            self.log("没有选择任何文件或目录", error=True)
+            return
         
-        # 定义缩放操作
-        def scale_op(atlas):
-            atlas.ReScale()
+        output_file, _ = QFileDialog.getSaveFileName(self, "保存合并的 Atlas", "", "Atlas Files (*.atlas)")
+        if not output_file:
+            return
         
-        for i, file_path in enumerate(self.selected_files):
-            self.update_progress(i)
-            if self.process_batch_file(file_path, scale_op):
-                success_count += 1
+        if not self.start_batch_operation():
+            return
         
-        self.end_batch_operation()
-        self.log(f"纹理缩放完成! 成功: {success_count}/{len(self.selected_files)}")
+        files = list(self.selected_files)
+        job = self.submit_call(repack, (files, output_file) + self.repack_options(), len(files))
+        job.signals.result.connect(self.on_atlas_merged)
+        job.signals.progress.connect(self.update_progress)
+        job.signals.finished.connect(
+            lambda done, cancelled: self.end_batch_operation(None, done, cancelled)
+        )
+        self.cancel_button.setVisible(True)
+        self.jobs.start(job)
+    
+    def log_repack_report(self, report):
+        """输出重新打包前后的纹理页数和占用率"""
+        before, after = report['before'], report['after']
+        self.log(f"{report['frames']} 帧, 纹理页 {before['pages']} -> {after['pages']}, "
+                 f"占用率 {before['occupancy']:.1%} -> {after['occupancy']:.1%}, "
+                 f"装箱耗时 {report['pack_seconds']:.3f} 秒")
+        if report['duplicates']:
+            self.log(f"跳过 {len(report['duplicates'])} 个同名帧: {', '.join(report['duplicates'][:10])}")
+    
+    def on_atlas_repacked(self, result):
+        """单个 Atlas 重新打包完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.log(f"已重新打包 {name}, 保存为: {result['output']}")
+            self.log_repack_report(result['report'])
+        else:
+            self.log(f"重新打包 {name} 失败: {result['error']}", error=True)
+    
+    def on_atlas_merged(self, report):
+        """合并完成"""
+        if 'error' in report:
+            self.log(f"合并失败: {report['error']}", error=True)
+            return
+        if report['cancelled']:
+            return
+        self.log(f"已合并 {len(report['files'])} 个 Atlas, 保存为: {report['output']}")
+        self.log_repack_report(report)
+    
+    def scan_duplicate_frames(self):
+        """分析所选 Atlas 中像素完全相同的帧, 并保存 JSON 报告"""
+        if not self.start_batch_operation():
+            return
+        
+        self.dedup_results = []
+        self.dedup_report = None
+        self.run_batch_operation(
+            scan_duplicates, (),
+            self.dedup_results.append,
+            self.on_duplicates_found,
+            stream=True
+        )
+    
+    def on_duplicates_found(self, done, cancelled):
+        """重复帧分析完成 - 汇总各 Atlas 的哈希结果"""
+        if cancelled:
+            return
+        report = group_duplicates(self.dedup_results)
+        self.dedup_results = []
+        self.dedup_report = report
+        for item in report['errors']:
+            self.log(f"读取失败 {item['file']}: {item['error']}", error=True)
+        for group in report['groups'][:20]:
+            w, h = group['size']
+            names = ', '.join(f"{Path(f['atlas']).name}:{f['frame']}" for f in group['frames'][:5])
+            self.log(f"{w}x{h} 重复 {group['count']} 次, 浪费 {group['wasted_bytes'] / 1024:.1f} KB: {names}")
+        if len(report['groups']) > 20:
+            self.log(f"... 其余 {len(report['groups']) - 20} 组见报告文件")
+        self.log(f"重复帧分析完成! {report['frames']} 帧 (解码 {report['hashed']}), "
+                 f"重复组: {len(report['groups'])}, 多余副本: {report['duplicates']}, "
+                 f"浪费: {report['wasted_bytes'] / 1024 / 1024:.2f} MB")
+        
+        root = self.selected_root or source_root(self.batch_items)
+        report_file = Path(root).joinpath(DEDUP_REPORT_NAME)
+        try:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.log(f"重复帧报告已保存到: {report_file}")
+        except Exception as e:
+            self.log(f"保存重复帧报告失败: {str(e)}", error=True)
+    
+    def apply_duplicate_frames(self):
+        """把上次分析出的重复帧提取到共享纹理页, 改写受影响的 Atlas"""
+        if not self.dedup_report or not self.dedup_report['groups']:
+            self.log("没有可提取的重复帧, 请先分析重复帧", error=True)
+            return
+        
+        overwrite = self.overwrite_radio.isChecked()
+        suffix = self.suffix_input.text().strip()
+        output_root = None if overwrite else self.output_root_input.text().strip() or None
+        root = self.selected_root or source_root(self.selected_files)
+        default = str(Path(output_root or root).joinpath(f"{SHARED_NAME}.png"))
+        shared_file, _ = QFileDialog.getSaveFileName(self, "保存共享纹理页", default, "PNG Files (*.png)")
+        if not shared_file:
+            return
+        
+        files = list(dict.fromkeys(f['atlas'] for g in self.dedup_report['groups'] for f in g['frames']))
+        if not self.start_batch_operation(files):
+            return
+        
+        job = self.submit_call(
+            apply_dedup,
+            (self.dedup_report, shared_file, overwrite, suffix, output_root, root,
+             self.repack_size_combo.currentData(), self.repack_padding.value()),
+            len(files)
+        )
+        job.signals.result.connect(self.on_duplicates_applied)
+        job.signals.progress.connect(self.update_progress)
+        job.signals.finished.connect(
+            lambda done, cancelled: self.end_batch_operation(None, done, cancelled)
+        )
+        self.cancel_button.setVisible(True)
+        self.jobs.start(job)
+    
+    def on_duplicates_applied(self, result):
+        """共享纹理页提取完成"""
+        if not result['ok']:
+            if result.get('error'):
+                self.log(f"提取重复帧失败: {result['error']}", error=True)
+            return
+        for path, error in sync_files(result['outputs'] + result['shared']):
+            self.log(f"同步到磁盘失败 {path}: {error}", error=True)
+        for shared in result['shared']:
+            self.log(f"共享纹理页: {shared}")
+        self.log(f"已提取 {result['groups']} 组重复帧, 改写 {len(result['outputs'])} 个 Atlas, "
+                 f"节省 {result['saved_bytes'] / 1024 / 1024:.2f} MB (原纹理页中的旧区域可再重新打包)")
+        self.dedup_report = None
+    
+    def prune_frames(self, apply):
+        """按 Atlas 旁边的骨骼 (.json / .skel) 找出没有附件引用的帧, apply 时写入删除后的 Atlas"""
+        if not self.selected_files:
+            self.log("没有选择任何文件或目录", error=True)
+            return
+        
+        if not self.start_batch_operation():
+            return
+        
+        overwrite = self.overwrite_radio.isChecked()
+        suffix = self.suffix_input.text().strip()
+        output_root = None if overwrite else self.output_root_input.text().strip() or None
+        self.prune_results = []
+        self.run_batch_operation(
+            prune_atlases,
+            (None, apply, apply and self.prune_compact_check.isChecked(), overwrite, suffix, output_root,
+             self.repack_size_combo.currentData(), self.repack_padding.value()),
+            self.on_atlas_pruned,
+            self.finish_prune,
+            stream=True
+        )
+    
+    def on_atlas_pruned(self, result):
+        """单个 Atlas 的未引用帧分析 (或删除) 完成"""
+        name = Path(result['file']).name
+        self.prune_results.append(result)
+        if not result['ok']:
+            self.log(f"清理 {name} 失败: {result['error']}", error=True)
+            return
+        self.batch_success += 1
+        unused = result['unused']
+        text = (f"{name}: 未引用 {len(unused)}/{result['frames']} 帧, {result['unused_area']} 像素, "
+                f"可删除纹理页 {result['pages_removed']}/{result['pages']}")
+        if unused:
+            text += f" ({', '.join(unused[:5])}{' ...' if len(unused) > 5 else ''})"
+        self.log(text)
+        if result['compacted']:
+            self.log_repack_report(result['compacted'])
+        for page in result['pages_deleted']:
+            self.log(f"已删除不再引用的纹理页: {page}")
+        if result['output']:
+            self.log(f"已保存: {result['output']}")
+    
+    def finish_prune(self, done, cancelled):
+        """汇总未引用的帧并保存 JSON 报告"""
+        results = [r for r in self.prune_results if r['ok']]
+        unused = sum(len(r['unused']) for r in results)
+        frames = sum(r['frames'] for r in results)
+        area = sum(r['unused_area'] for r in results)
+        self.log(f"未引用帧分析完成! 成功: {self.batch_success}/{len(self.batch_items)}, "
+                 f"未引用的帧: {unused}/{frames}, 面积 {area} 像素")
+        if cancelled or not self.prune_results:
+            return
+        root = self.selected_root or source_root(self.batch_items)
+        report_file = Path(root).joinpath(PRUNE_REPORT_NAME)
+        try:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(self.prune_results, f, ensure_ascii=False, indent=2)
+            self.log(f"未引用帧报告已保存到: {report_file}")
+        except Exception as e:
+            self.log(f"保存未引用帧报告失败: {str(e)}", error=True)
+        self.prune_results = []
     
     def export_frames(self):
         """导出帧 - 支持批处理"""
+        if self.jobs.is_running():
+            self.log("已有批处理任务正在运行", error=True)
+            return
+        
         if not self.selected_files:
             self.log("没有选择任何文件或目录", error=True)
             return
@@ -474,24 +1534,30 @@ class SpineAtlasGUI(QMainWindow):
         if not export_dir:
             return
         
-        self.progress_bar.setRange(0, len(self.selected_files))
-        self.progress_bar.setValue(0)
-        self.progress_bar.setVisible(True)
-        
-        success_count = 0
-        
-        for i, file_path in enumerate(self.selected_files):
-            self.update_progress(i)
-            try:
-                atlas = ReadAtlasFile(file_path)
-                atlas.SaveFrames(path=export_dir, mode=mode)
-                success_count += 1
-                self.log(f"成功导出 {Path(file_path).name} 的帧")
-            except Exception as e:
-                self.log(f"导出 {Path(file_path).name} 失败: {str(e)}", error=True)
+        if not self.start_batch_operation():
+            return
         
-        self.progress_bar.setVisible(False)
-        self.log(f"帧导出完成! 成功: {success_count}/{len(self.selected_files)}")
+        total = len(self.selected_files)
+        pipeline = self.pipeline_checkbox.isChecked()
+        encoder = self.encoder_combo.currentData()
+        if not pipeline and encoder != "png":
+            self.log("逐个调用 SaveFrames 时只能输出默认 PNG, 忽略所选编码器", warning=True)
+        self.run_batch_operation(
+            export_frames_pipeline if pipeline else export_file,
+            (export_dir, mode, encoder) if pipeline else (export_dir, mode),
+            self.on_file_exported,
+            lambda done, cancelled: self.log(f"帧导出完成! 成功: {self.batch_success}/{total}"),
+            stream=pipeline
+        )
+    
+    def on_file_exported(self, result):
+        """单个文件帧导出完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.log(f"成功导出 {name} 的帧")
+        else:
+            self.log(f"导出 {name} 失败: {result['error']}", error=True)
     
     def convert_to_atlas(self):
         """转换 JSON 到 Spine Atlas"""
@@ -501,47 +1567,69 @@ class SpineAtlasGUI(QMainWindow):
             return
         
         try:
-            # 加载 JSON 数据
-            with open(json_path, 'r', encoding='utf-8') as f:
-                texture_dict = json.load(f)
-            
-            # 创建帧列表
-            frames = []
-            for frame_info in texture_dict['Frame']:
-                frame = AtlasFrame(
-                    frame_info['Frame_Name'],
-                    frame_info['Cut_X'],
-                    frame_info['Cut_Y'],
-                    frame_info['Cut_Width'],
-                    frame_info['Cut_Height'],
-                    frame_info['Original_X'],
-                    frame_info['Original_Y'],
-                    frame_info['Original_Width'],
-                    frame_info['Original_Height'],
-                    frame_info['Rotate']
-                )
-                frames.append(frame)
-            
-            # 创建纹理
-            tex = texture_dict['Texture']
-            texture = AtlasTex(
-                tex['Texture_Name'],
-                tex['Texture_Width'],
-                tex['Texture_Height'],
-                frames=frames
-            )
-            
-            # 创建 Atlas
-            atlas = Atlas([texture])
-            
-            # 保存 Atlas
             output_file = self.output_name.text()
-            atlas.SaveAtlas(output_file)
+            json_to_atlas(json_path, output_file)
             self.log(f"成功转换 JSON 并保存到: {output_file}")
             
         except Exception as e:
             self.log(f"转换 JSON 失败: {str(e)}", error=True)
     
+    def convert_json_directory(self):
+        """批量转换目录中的 JSON"""
+        directory = QFileDialog.getExistingDirectory(self, "选择 JSON 目录")
+        if not directory:
+            return
+        
+        files = collect_atlas_files(directory, self.recursive_checkbox.isChecked(), "*.json")
+        if not self.start_batch_operation(files):
+            return
+        
+        total = len(files)
+        self.run_batch_operation(
+            convert_json_file, (),
+            self.on_json_converted,
+            lambda done, cancelled: self.log(
+                f"JSON 批量转换完成! 成功: {self.batch_success}/{total}, 跳过非纹理 JSON: {self.batch_skipped}"
+            )
+        )
+    
+    def on_json_converted(self, result):
+        """单个 JSON 转换完成"""
+        name = Path(result['file']).name
+        if result.get('skipped'):
+            self.batch_skipped += 1
+        elif result['ok']:
+            self.batch_success += 1
+            self.log(f"成功转换 {name} ({result['pages']} 个纹理页) 并保存到: {result['output']}")
+        else:
+            self.log(f"转换 {name} 失败: {result['error']}", error=True)
+    
+    def convert_skel_directory(self):
+        """批量转换目录中的 .skel"""
+        directory = QFileDialog.getExistingDirectory(self, "选择 .skel 目录")
+        if not directory:
+            return
+        
+        files = scan_files(directory, self.recursive_checkbox.isChecked(), SKEL_PATTERNS)
+        if not self.start_batch_operation(files):
+            return
+        
+        total = len(files)
+        self.run_batch_operation(
+            skel_to_json_file, (),
+            self.on_skel_converted,
+            lambda done, cancelled: self.log(f".skel 批量转换完成! 成功: {self.batch_success}/{total}")
+        )
+    
+    def on_skel_converted(self, result):
+        """单个 .skel 转换完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.log(f"成功转换 {name} (Spine {result['version']}) 并保存到: {result['output']}")
+        else:
+            self.log(f"转换 {name} 失败: {result['error']}", error=True)
+    
     def recalculate_cut_anchor(self):
         """重新计算裁剪锚点"""
         if not self.selected_files:
@@ -550,24 +1638,7 @@ class SpineAtlasGUI(QMainWindow):
         
         # 获取选择的锚点
         anchor_value = self.cut_combo.currentData()
-        
-        if not self.start_batch_operation():
-            return
-        
-        success_count = 0
-        
-        # 定义锚点操作
-        def anchor_op(atlas):
-            atlas.cutp = Anchor(anchor_value)
-            atlas.ReOffset()
-        
-        for i, file_path in enumerate(self.selected_files):
-            self.update_progress(i)
-            if self.process_batch_file(file_path, anchor_op):
-                success_count += 1
-        
-        self.end_batch_operation()
-        self.log(f"裁剪锚点重新计算完成! 成功: {success_count}/{len(self.selected_files)}")
+        self.run_modify_batch('cut_anchor', {'anchor': anchor_value}, "裁剪锚点重新计算")
     
     def recalculate_offset_anchor(self):
         """重新计算偏移锚点"""
@@ -577,24 +1648,148 @@ class SpineAtlasGUI(QMainWindow):
         
         # 获取选择的锚点
         anchor_value = self.offset_combo.currentData()
-        
-        if not self.start_batch_operation():
+        self.run_modify_batch('offset_anchor', {'anchor': anchor_value}, "偏移锚点重新计算")
+    
+    def refresh_pipeline_steps(self, row=None):
+        """刷新步骤列表"""
+        self.steps_list.clear()
+        for index, (operation, params) in enumerate(self.pipeline_steps, 1):
+            self.steps_list.addItem(f"{index}. {describe_step(operation, params)}")
+        if row is not None:
+            self.steps_list.setCurrentRow(row)
+    
+    def add_pipeline_step(self):
+        """添加步骤"""
+        operation, params = self.step_combo.currentData()
+        params = dict(params)
+        if operation.endswith('_anchor'):
+            params['anchor'] = self.step_anchor_combo.currentData()
+        self.pipeline_steps.append([operation, params])
+        self.refresh_pipeline_steps(len(self.pipeline_steps) - 1)
+    
+    def remove_pipeline_step(self):
+        """删除所选步骤"""
+        row = self.steps_list.currentRow()
+        if 0 <= row < len(self.pipeline_steps):
+            del self.pipeline_steps[row]
+            self.refresh_pipeline_steps(min(row, len(self.pipeline_steps) - 1))
+    
+    def move_pipeline_step(self, offset):
+        """上移/下移所选步骤"""
+        row = self.steps_list.currentRow()
+        target = row + offset
+        if 0 <= row < len(self.pipeline_steps) and 0 <= target < len(self.pipeline_steps):
+            steps = self.pipeline_steps
+            steps[row], steps[target] = steps[target], steps[row]
+            self.refresh_pipeline_steps(target)
+    
+    def clear_pipeline_steps(self):
+        """清空步骤"""
+        self.pipeline_steps = []
+        self.refresh_pipeline_steps()
+    
+    def save_pipeline_preset(self):
+        """保存流水线预设"""
+        if not self.pipeline_steps:
+            self.log("流水线没有任何步骤", error=True)
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "保存预设", "pipeline.json", "Preset Files (*.json)")
+        if not path:
+            return
+        try:
+            save_preset(path, self.pipeline_steps, Path(path).stem)
+            self.log(f"预设已保存到: {path}")
+        except Exception as e:
+            self.log(f"保存预设失败: {str(e)}", error=True)
+    
+    def load_pipeline_preset(self):
+        """载入流水线预设"""
+        path, _ = QFileDialog.getOpenFileName(self, "载入预设", "", "Preset Files (*.json)")
+        if not path:
+            return
+        try:
+            name, steps = load_preset(path)
+        except Exception as e:
+            self.log(f"载入预设失败: {str(e)}", error=True)
+            return
+        self.pipeline_steps = steps
+        self.refresh_pipeline_steps()
+        self.log(f"已载入预设 {name or Path(path).stem}: {len(steps)} 个步骤")
+    
+    def run_pipeline(self):
+        """对所选文件运行流水线 - 每个文件只读取和写入一次"""
+        if not self.pipeline_steps:
+            self.log("流水线没有任何步骤", error=True)
+            return
+        if not self.selected_files:
+            self.log("请先选择文件或目录", error=True)
+            return
+        steps = [[operation, dict(params)] for operation, params in self.pipeline_steps]
+        self.run_modify_batch('pipeline', {'steps': steps}, "流水线")
+    
+    def toggle_watch(self, checked):
+        """开启/关闭监视模式"""
+        if not checked:
+            self.stop_watch()
+            return
+        if not self.selected_root:
+            self.log("监视模式需要先选择目录", error=True)
+            self.watch_checkbox.setChecked(False)
+            return
+        if self.watch_operation is None:
+            self.log("请先运行一次要在变化时重复的操作", error=True)
+            self.watch_checkbox.setChecked(False)
             return
         
-        success_count = 0
-        
-        # 定义锚点操作
-        def anchor_op(atlas):
-            atlas.offp = Anchor(anchor_value)
-            atlas.ReOffset()
-        
-        for i, file_path in enumerate(self.selected_files):
-            self.update_progress(i)
-            if self.process_batch_file(file_path, anchor_op):
-                success_count += 1
-        
-        self.end_batch_operation()
-        self.log(f"偏移锚点重新计算完成! 成功: {success_count}/{len(self.selected_files)}")
+        include = parse_patterns(self.include_input.text()) or DEFAULT_INCLUDE
+        exclude = parse_patterns(self.exclude_input.text())
+        self.watcher = PollWatcher([self.selected_root], self.recursive_checkbox.isChecked(), include, exclude)
+        self.watch_timer.start()
+        self.poll_watch()
+        self.log(f"开始监视: {self.selected_root} (变化时运行: {self.watch_operation[2]})")
+    
+    def stop_watch(self):
+        """停止监视模式"""
+        if self.watcher is None:
+            return
+        self.watch_timer.stop()
+        if self.watch_job is not None:
+            self.watch_job.cancel()
+        self.watcher = None
+        self.watch_checkbox.setChecked(False)
+        self.log("已停止监视")
+    
+    def poll_watch(self):
+        """定时轮询 - 上一次轮询或批处理未结束时跳过"""
+        if self.watcher is None or self.watch_job is not None or self.jobs.is_running():
+            return
+        job = CallJob(watch_poll, (self.watcher,))
+        job.signals.result.connect(self.on_watch_changes)
+        job.signals.finished.connect(self.end_watch_poll)
+        self.watch_job = job
+        self.jobs.start_background(job)
+    
+    def end_watch_poll(self, done, cancelled):
+        self.watch_job = None
+    
+    def on_watch_changes(self, result):
+        """对变化的 Atlas 重新运行操作"""
+        if 'error' in result:
+            self.log(f"监视失败: {result['error']}", error=True)
+            return
+        if self.watcher is None or not result['files']:
+            return
+        operation, params, title = self.watch_operation
+        self.log(f"检测到 {len(result['files'])} 个 Atlas 发生变化")
+        self.run_modify_batch(operation, params, title, result['files'])
+    
+    def closeEvent(self, event):
+        """关闭窗口时取消后台任务"""
+        self.stop_watch()
+        QThreadPool.globalInstance().waitForDone()
+        self.jobs.shutdown()
+        self.browser.shutdown()
+        super().closeEvent(event)
     
     def process_image(self):
         """处理图像"""
@@ -608,24 +1803,164 @@ class SpineAtlasGUI(QMainWindow):
             img = imgop(image_path)
             
             # 确定处理类型
-            process_type = self.process_combo.currentText()
-            if "预乘" in process_type:
-                processed_img = ImgPremultiplied(img)
-            else:
-                processed_img = ImgNonPremultiplied(img)
+            processed_img = convert_image(img, self.process_combo.currentData())
             
-            # 保存处理后的图像
+            # 按所选编码器保存处理后的图像
+            encoder = self.encoder_combo.currentData()
+            suffix = encoder_suffix(encoder)
             save_path, _ = QFileDialog.getSaveFileName(
-                self, "保存处理后的图像", "", "PNG Images (*.png)"
+                self, "保存处理后的图像", "", f"{suffix[1:].upper()} Images (*{suffix})"
             )
             if save_path:
-                processed_img.save(save_path)
+                save_path = str(Path(save_path).with_suffix(suffix))
+                save_image(processed_img, save_path, encoder)
                 self.log(f"成功处理图像并保存到: {save_path}")
                 
         except Exception as e:
             self.log(f"图像处理失败: {str(e)}", error=True)
 
+    def process_image_directory(self):
+        """批量处理目录中的 PNG 图像"""
+        directory = QFileDialog.getExistingDirectory(self, "选择图像目录")
+        if not directory:
+            return
+        
+        images = collect_images(directory, self.recursive_checkbox.isChecked())
+        self.run_image_batch(images, directory)
+    
+    def process_atlas_pages(self):
+        """批量处理所选 Atlas 引用的纹理页"""
+        if not self.selected_files:
+            self.log("请先选择文件或目录", error=True)
+            return
+        
+        try:
+            pages = collect_atlas_pages(self.selected_files)
+        except Exception as e:
+            self.log(f"收集纹理页失败: {str(e)}", error=True)
+            return
+        
+        # 以纹理页的公共父目录为根, 保持目录结构
+        self.run_image_batch(pages, source_root(pages))
+    
+    def run_image_batch(self, images, root):
+        """在进程池中批量转换图像"""
+        if not images:
+            self.log("没有找到需要处理的图像", error=True)
+            return
+        
+        output_dir = QFileDialog.getExistingDirectory(self, "选择输出目录")
+        if not output_dir:
+            return
+        
+        if not self.start_batch_operation(images):
+            return
+        
+        mode = self.process_combo.currentData()
+        total = len(images)
+        self.run_batch_operation(
+            process_image_into, (output_dir, mode, root, self.encoder_combo.currentData()),
+            self.on_image_processed,
+            lambda done, cancelled: self.log(f"图像批量处理完成! 成功: {self.batch_success}/{total}")
+        )
+    
+    def on_image_processed(self, result):
+        """单个图像处理完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.log(f"成功处理图像并保存到: {result['output']}")
+        else:
+            self.log(f"图像处理失败 {name}: {result['error']}", error=True)
+    
+    def transcode_pages(self):
+        """用所选编码器重新编码所选 Atlas 的纹理页, 与 Atlas 一起写入输出目录"""
+        if not self.selected_files:
+            self.log("没有选择任何文件或目录", error=True)
+            return
+        
+        output_root = self.output_root_input.text().strip()
+        if not output_root:
+            output_root = QFileDialog.getExistingDirectory(self, "选择输出目录")
+            if not output_root:
+                return
+        
+        if not self.start_batch_operation():
+            return
+        
+        encoder = self.encoder_combo.currentData()
+        self.encode_results = []
+        self.run_batch_operation(
+            transcode_atlases, (output_root, encoder),
+            self.on_atlas_transcoded,
+            lambda done, cancelled: self.finish_transcode(output_root, encoder),
+            stream=True
+        )
+    
+    def on_atlas_transcoded(self, result):
+        """单个 Atlas 的纹理页转码完成"""
+        name = Path(result['file']).name
+        if result['ok']:
+            self.batch_success += 1
+            self.encode_results.append(result)
+            self.log(f"已编码 {name} 的 {len(result['pages'])} 个纹理页: {result['bytes']} -> "
+                     f"{result['encoded_bytes']} 字节, 编码 {result['encode_seconds']:.2f}s, 保存为: {result['output']}")
+        else:
+            self.log(f"编码 {name} 失败: {result['error']}", error=True)
+    
+    def finish_transcode(self, output_root, encoder):
+        """汇总转码结果并把逐文件的报告写入输出目录"""
+        report = dict(encode_report(self.encode_results), encoder=encoder)
+        self.log(f"纹理页转码完成! 成功: {self.batch_success}/{len(self.batch_items)}, {report['bytes']} -> "
+                 f"{report['encoded_bytes']} 字节, 节省 {report['saved'] / max(1, report['bytes']):.1%}, "
+                 f"编码 {report['encode_seconds']:.2f}s")
+        report_file = Path(output_root).joinpath(ENCODE_REPORT_NAME)
+        try:
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.log(f"编码报告已保存到: {report_file}")
+        except Exception as e:
+            self.log(f"保存编码报告失败: {str(e)}", error=True)
+    
+    def compare_page_encoders(self):
+        """用所有预设编码器在内存中编码所选 Atlas 的纹理页, 比较大小和耗时 (不写入文件)"""
+        if not self.selected_files:
+            self.log("请先选择文件或目录", error=True)
+            return
+        
+        try:
+            pages = collect_atlas_pages(self.selected_files)
+        except Exception as e:
+            self.log(f"收集纹理页失败: {str(e)}", error=True)
+            return
+        
+        if not self.start_batch_operation(pages):
+            return
+        
+        self.encode_results = []
+        self.run_batch_operation(
+            compare_encoders, (tuple(PRESETS.values()),),
+            self.on_page_measured,
+            lambda done, cancelled: self.finish_compare(),
+            stream=True
+        )
+    
+    def on_page_measured(self, result):
+        """单个纹理页的编码器比较完成"""
+        if result['ok']:
+            self.batch_success += 1
+            self.encode_results.append(result)
+        else:
+            self.log(f"编码 {Path(result['file']).name} 失败: {result['error']}", error=True)
+    
+    def finish_compare(self):
+        """输出各编码器的总大小, 压缩比例和耗时"""
+        for line in format_encoders(summarize_encoders(self.encode_results)):
+            self.log(line)
+        self.log(f"编码器比较完成! 纹理页: {self.batch_success}/{len(self.batch_items)}")
+
 if __name__ == "__main__":
+    freeze_support()
     app = QApplication(sys.argv)
     window = SpineAtlasGUI()
     window.show()
@@ -0,0 +1,368 @@
+import os
+import mmap
+import struct
+import bisect
+from fnmatch import fnmatchcase
+from pathlib import Path
+import numpy as np
+from AtlasEXCore import iter_batch
+from AtlasEXCache import load_atlas
+from AtlasEXZip import split_member, path_stamp
+from AtlasEXWriter import atomic_file
+
+# 索引文件 - 与 Atlas 一起保存在项目目录中
+INDEX_NAME = ".atlasex_index.bin"
+INDEX_MAGIC = b"AEXINDEX"
+INDEX_VERSION = 1
+
+# 文件头: 标识, 版本, 字符串/Atlas/纹理页/帧的数量, 各段的偏移
+_HEADER = struct.Struct('<8sI4I6Q')
+
+# 定长记录 - 名称和路径都是字符串表中的序号, 字符串表按字节序排序, 序号的大小即字典序
+FILE_DTYPE = np.dtype([('path', '<u4'), ('mtime', '<i8'), ('size', '<i8'), ('crc', '<u4'),
+                       ('page', '<u4'), ('pages', '<u4'), ('frame', '<u4'), ('frames', '<u4')])
+PAGE_DTYPE = np.dtype([('file', '<u4'), ('png', '<u4'), ('w', '<i4'), ('h', '<i4'), ('pma', 'u1'),
+                       ('scale', '<f4'), ('frame', '<u4'), ('frames', '<u4')])
+FRAME_DTYPE = np.dtype([('name', '<u4'), ('file', '<u4'), ('page', '<u4'), ('x', '<i4'), ('y', '<i4'),
+                        ('w', '<i4'), ('h', '<i4'), ('offx', '<i4'), ('offy', '<i4'),
+                        ('origw', '<i4'), ('origh', '<i4'), ('rotate', '<i2')])
+
+def index_path(files):
+    """索引文件的默认位置 - 输入文件的公共目录 (压缩包中的文件按压缩包所在目录)"""
+    if not files:
+        return None
+    real = [(split_member(f) or (f,))[0] for f in files]
+    root = os.path.commonpath([str(Path(f).resolve().parent) for f in real])
+    return str(Path(root).joinpath(INDEX_NAME))
+
+def _stamp(file_path):
+    """(mtime_ns, size, crc) - 压缩包成员为压缩包的 mtime 和成员的 CRC"""
+    stamp = path_stamp(file_path)
+    if len(stamp) == 3:
+        mtime, crc, size = stamp
+        return mtime, size, crc
+    return stamp[0], stamp[1], 0
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+class _Strings:
+    """字符串表的只读序列视图 - 可直接用于 bisect"""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[int(self.offsets[i]):int(self.offsets[i + 1])])
+
+    def texts(self):
+        """一次解码全部字符串"""
+        data = bytes(self.blob)
+        offsets = self.offsets.tolist()
+        return [data[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+
+class _Sorted:
+    """按名称排序的帧序号视图 - 返回帧的名称序号, 供 bisect 使用"""
+
+    def __init__(self, order, names):
+        self.order = order
+        self.names = names
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return int(self.names[self.order[i]])
+
+class AtlasIndex:
+    """以 mmap 打开的二进制索引 - 记录直接映射为 numpy 数组, 打开时不解析任何 Atlas
+
+    路径相对索引所在目录保存; 查询结果中的路径为绝对路径.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.root = os.path.dirname(os.path.abspath(self.path))
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, nstrings, nfiles, npages, nframes, *offsets = _HEADER.unpack_from(self._mm)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError(f"不是受支持的 Atlas 索引: {self.path}")
+            strings, blob, files, pages, frames, by_name = offsets
+            view = memoryview(self._mm)
+            self._view = view
+            self.strings = _Strings(np.frombuffer(view, '<u8', nstrings + 1, strings), view[blob:files])
+            self.files = np.frombuffer(view, FILE_DTYPE, nfiles, files)
+            self.pages = np.frombuffer(view, PAGE_DTYPE, npages, pages)
+            self.frames = np.frombuffer(view, FRAME_DTYPE, nframes, frames)
+            self.by_name = np.frombuffer(view, '<u4', nframes, by_name)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """释放映射 - 之后不能再访问数组"""
+        for name in ('strings', 'files', 'pages', 'frames', 'by_name'):
+            self.__dict__.pop(name, None)
+        view = self.__dict__.pop('_view', None)
+        if view is not None:
+            view.release()
+        mm = self.__dict__.pop('_mm', None)
+        if mm is not None:
+            mm.close()
+
+    def string(self, i):
+        return self.strings[i].decode('utf-8')
+
+    def lookup(self, text):
+        """字符串的序号, 不存在时返回 None"""
+        key = text.encode('utf-8')
+        i = bisect.bisect_left(self.strings, key)
+        return i if i < len(self.strings) and self.strings[i] == key else None
+
+    def file_path(self, i):
+        return os.path.normpath(os.path.join(self.root, self.string(int(self.files[i]['path']))))
+
+    def atlases(self):
+        """索引中的所有 Atlas"""
+        return [self.file_path(i) for i in range(len(self.files))]
+
+    def entries(self):
+        """{相对路径: (mtime_ns, size, crc, 序号)} - 用于增量更新"""
+        return {self.string(int(f['path'])): (int(f['mtime']), int(f['size']), int(f['crc']), i)
+                for i, f in enumerate(self.files)}
+
+    def record(self, i):
+        """帧记录 -> dict"""
+        frame = self.frames[i]
+        page = self.pages[frame['page']]
+        return {
+            'atlas': self.file_path(int(frame['file'])), 'page': self.string(int(page['png'])),
+            'frame': self.string(int(frame['name'])),
+            'xy': [int(frame['x']), int(frame['y'])], 'size': [int(frame['w']), int(frame['h'])],
+            'offset': [int(frame['offx']), int(frame['offy'])], 'orig': [int(frame['origw']), int(frame['origh'])],
+            'rotate': int(frame['rotate']),
+        }
+
+    def find(self, name):
+        """查找区域所在的 Atlas - 名称可以含通配符 (*, ?, [])
+
+        精确名称在字符串表和按名称排序的帧序号上二分查找, 不扫描记录.
+        """
+        if any(c in name for c in '*?['):
+            ids = [i for i in range(len(self.strings)) if fnmatchcase(self.string(i), name)]
+        else:
+            i = self.lookup(name)
+            ids = [] if i is None else [i]
+        names = _Sorted(self.by_name, self.frames['name'])
+        found = []
+        for i in ids:
+            lo = bisect.bisect_left(names, i)
+            hi = bisect.bisect_right(names, i, lo)
+            found.extend(int(j) for j in self.by_name[lo:hi])
+        return [self.record(i) for i in sorted(found)]
+
+    def frames_larger(self, size):
+        """宽或高超过 size 像素的帧 (按纹理中的区域尺寸)"""
+        frames = self.frames
+        return [self.record(int(i)) for i in np.flatnonzero((frames['w'] > size) | (frames['h'] > size))]
+
+    def stale(self):
+        """与磁盘不一致的 Atlas (mtime/size 变化或已删除)"""
+        changed = []
+        for i, f in enumerate(self.files):
+            path = self.file_path(i)
+            try:
+                if _stamp(path) != (int(f['mtime']), int(f['size']), int(f['crc'])):
+                    changed.append(path)
+            except OSError:
+                changed.append(path)
+        return changed
+
+def open_index(path):
+    """打开索引, 不存在或版本不符时返回 None"""
+    try:
+        return AtlasIndex(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+def index_file(file_path):
+    """解析单个 Atlas, 返回索引记录 (进程池任务)
+
+    先读取 mtime 再解析, 解析期间被修改的文件会在下次更新时重新解析.
+    """
+    result = {'file': file_path, 'ok': False, 'error': None, 'stamp': None, 'pages': []}
+    try:
+        result['stamp'] = _stamp(file_path)
+        atlas = load_atlas(file_path)
+        for tex in atlas.atlas:
+            frames = [(f.name, f.cutx, f.cuty, f.cutw, f.cuth, f.offx, f.offy, f.offw, f.offh, f.rota)
+                      for f in tex.frames]
+            result['pages'].append((tex.png, tex.w, tex.h, bool(tex.pma), tex.scale, frames))
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _relative(file_path, root):
+    try:
+        return Path(os.path.relpath(file_path, root)).as_posix()
+    except ValueError:
+        # Windows 下不同盘符的文件保存绝对路径
+        return Path(os.path.abspath(file_path)).as_posix()
+
+def write_index(path, strings, files, pages, frames):
+    """写入索引 - strings 为已排序的字符串, 记录中的序号已指向该表; 写入临时文件后原子替换"""
+    blobs = [s.encode('utf-8') for s in strings]
+    offsets = np.zeros(len(blobs) + 1, '<u8')
+    if blobs:
+        np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    by_name = np.argsort(frames['name'], kind='stable').astype('<u4')
+    sections = [offsets.tobytes(), b''.join(blobs), files.tobytes(), pages.tobytes(), frames.tobytes(),
+                by_name.tobytes()]
+    starts = []
+    position = _HEADER.size
+    for data in sections:
+        position = _align(position)
+        starts.append(position)
+        position += len(data)
+    header = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(strings), len(files), len(pages), len(frames), *starts)
+    with atomic_file(path) as f:
+        f.write(header)
+        for start, data in zip(starts, sections):
+            f.write(b'\0' * (start - f.tell()))
+            f.write(data)
+
+def update_index(files, path=None, max_workers=None, progress=None, cancelled=None):
+    """按 mtime 同步索引 - 未变化的 Atlas 直接复用旧记录, 只在进程池中解析新增或修改的文件
+
+    返回 {'index', 'atlases', 'parsed', 'reused', 'removed', 'frames', 'errors', 'cancelled'};
+    取消时不写入索引.
+    """
+    cancelled = cancelled or (lambda: False)
+    files = list(dict.fromkeys(files))
+    path = str(path or index_path(files))
+    root = os.path.dirname(os.path.abspath(path))
+    report = {'index': path, 'atlases': 0, 'parsed': 0, 'reused': 0, 'removed': 0, 'frames': 0,
+              'errors': [], 'cancelled': False}
+
+    # 相对路径 -> 旧记录; 旧索引的数组复制出来后立即关闭映射, 以便替换文件
+    old = open_index(path)
+    old_entries = {}
+    if old is not None:
+        with old:
+            old_entries = old.entries()
+            old_strings = old.strings.texts()
+            old_files = old.files.copy()
+            old_pages = old.pages.copy()
+            old_frames = old.frames.copy()
+
+    interned = {}
+    def intern(text):
+        i = interned.get(text)
+        if i is None:
+            i = interned[text] = len(interned)
+        return i
+
+    # 逐个 Atlas 的记录块: (相对路径, stamp, 纹理页, 帧), 序号暂时指向 interned
+    chunks = {}
+    todo = []
+    for file_path in files:
+        rel = _relative(file_path, root)
+        try:
+            stamp = _stamp(file_path)
+        except OSError as e:
+            report['errors'].append({'file': file_path, 'error': str(e)})
+            continue
+        entry = old_entries.get(rel)
+        if entry is not None and entry[:3] == stamp:
+            chunks[rel] = (stamp, entry[3])
+        else:
+            todo.append(file_path)
+        if cancelled():
+            report['cancelled'] = True
+            return report
+
+    if old_entries:
+        remap = np.array([intern(s) for s in old_strings], dtype='<u4')
+        for rel, value in list(chunks.items()):
+            stamp, i = value
+            f = old_files[i]
+            page_slice = old_pages[f['page']:f['page'] + f['pages']].copy()
+            frame_slice = old_frames[f['frame']:f['frame'] + f['frames']].copy()
+            page_slice['png'] = remap[page_slice['png']]
+            frame_slice['name'] = remap[frame_slice['name']]
+            frame_slice['page'] -= f['page']
+            page_slice['frame'] -= f['frame']
+            chunks[rel] = (stamp, page_slice, frame_slice)
+        report['reused'] = len(chunks)
+        report['removed'] = len(set(old_entries) - set(chunks) - {_relative(f, root) for f in todo})
+
+    # 未变化的文件计入进度
+    skipped = len(files) - len(todo)
+    for done, result in enumerate(iter_batch(index_file, todo, (), max_workers, cancelled), 1):
+        if progress is not None:
+            progress(skipped + done, len(files))
+        if not result['ok']:
+            report['errors'].append({'file': result['file'], 'error': result['error']})
+            continue
+        page_records = []
+        frame_records = []
+        for png, w, h, pma, scale, frames in result['pages']:
+            page_records.append((0, intern(png), w, h, pma, scale, len(frame_records), len(frames)))
+            frame_records.extend((intern(name), 0, len(page_records) - 1, *values)
+                                 for name, *values in frames)
+        chunks[_relative(result['file'], root)] = (result['stamp'], np.array(page_records, PAGE_DTYPE),
+                                                   np.array(frame_records, FRAME_DTYPE))
+        report['parsed'] += 1
+    if cancelled():
+        report['cancelled'] = True
+        return report
+
+    # 合并记录块, 把序号改为指向排序后的字符串表 (只保留仍被引用的字符串)
+    order = sorted(chunks)
+    for rel in order:
+        intern(rel)
+    file_records = np.zeros(len(order), FILE_DTYPE)
+    page_parts = []
+    frame_parts = []
+    page_base = 0
+    frame_base = 0
+    for i, rel in enumerate(order):
+        stamp, page_slice, frame_slice = chunks[rel]
+        page_slice['file'] = i
+        page_slice['frame'] += frame_base
+        frame_slice['file'] = i
+        frame_slice['page'] += page_base
+        file_records[i] = (interned[rel], *stamp, page_base, len(page_slice), frame_base, len(frame_slice))
+        page_parts.append(page_slice)
+        frame_parts.append(frame_slice)
+        page_base += len(page_slice)
+        frame_base += len(frame_slice)
+    page_records = np.concatenate(page_parts) if page_parts else np.zeros(0, PAGE_DTYPE)
+    frame_records = np.concatenate(frame_parts) if frame_parts else np.zeros(0, FRAME_DTYPE)
+
+    texts = list(interned)
+    used = np.unique(np.concatenate([file_records['path'], page_records['png'], frame_records['name']]))
+    strings = sorted((texts[i] for i in used), key=lambda s: s.encode('utf-8'))
+    rank = np.zeros(len(texts), dtype='<u4')
+    rank[[interned[s] for s in strings]] = np.arange(len(strings), dtype='<u4')
+    file_records['path'] = rank[file_records['path']]
+    page_records['png'] = rank[page_records['png']]
+    frame_records['name'] = rank[frame_records['name']]
+
+    write_index(path, strings, file_records, page_records, frame_records)
+    report['atlases'] = len(file_records)
+    report['frames'] = len(frame_records)
+    return report
@@ -0,0 +1,157 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from AtlasEXCore import default_workers, iter_batch, AffinityPool
+from AtlasEXProfile import profile_dir
+
+class JobSignals(QObject):
+    """任务信号 - 从后台线程发回主线程"""
+    progress = Signal(int, int)   # 已完成数, 总数
+    result = Signal(dict)         # 单个文件的处理结果
+    finished = Signal(int, bool)  # 已完成数, 是否被取消
+
+class Job(QRunnable):
+    """后台任务基类 - 子类在 work 中运行 func 并用 emit 发出结果
+
+    work 中的异常作为一个失败结果发出, 结束时总会发出 finished, 界面不会停在进度中.
+    """
+
+    total = 0
+
+    def __init__(self, func, args=()):
+        super().__init__()
+        self.func = func
+        self.args = tuple(args)
+        self.signals = JobSignals()
+        self.cancelled = False
+        self.done = 0
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        """请求取消 - 进行中的文件完成后停止"""
+        self.cancelled = True
+
+    def emit(self, result):
+        self.done += 1
+        self.signals.result.emit(result)
+        self.signals.progress.emit(self.done, self.total)
+
+    def work(self):
+        raise NotImplementedError
+
+    def run(self):
+        try:
+            self.work()
+        except Exception as e:
+            self.signals.result.emit({'file': '', 'ok': False, 'error': str(e)})
+        finally:
+            self.signals.finished.emit(self.done, self.cancelled)
+
+class PoolJob(Job):
+    """使用工作进程的任务 - 按文件列表统计进度"""
+
+    def __init__(self, func, items, args=(), max_workers=None, workers=None):
+        super().__init__(func, args)
+        self.items = list(items)
+        self.total = len(self.items)
+        self.max_workers = workers.max_workers if workers is not None else max_workers or default_workers()
+        self.workers = workers
+
+class BatchJob(PoolJob):
+    """批处理任务 - 在线程池中调度进程池执行 func(item, *args)"""
+
+    def work(self):
+        for result in iter_batch(self.func, self.items, self.args, self.max_workers,
+                                 lambda: self.cancelled, self.workers):
+            self.emit(result)
+
+class StreamJob(PoolJob):
+    """流式任务 - func(items, *args, max_workers=..., cancelled=..., pool=...) 自行调度进程池并逐个产出结果"""
+
+    def work(self):
+        for result in self.func(self.items, *self.args, max_workers=self.max_workers,
+                                cancelled=lambda: self.cancelled, pool=self.workers):
+            self.emit(result)
+
+class CallJob(Job):
+    """单次调用任务 - func(*args, progress=..., cancelled=...) 在线程中运行, 返回值作为唯一的结果发出"""
+
+    def __init__(self, func, args=(), total=0):
+        super().__init__(func, args)
+        self.total = total
+
+    def work(self):
+        result = self.func(*self.args, progress=self.signals.progress.emit, cancelled=lambda: self.cancelled)
+        # 进度由 func 报告, 结果不再计入进度
+        self.done = self.total
+        self.signals.result.emit(result)
+
+class IterJob(Job):
+    """生成器任务 - func(*args, cancelled=...) 产出的每个结果都立即发出"""
+
+    def work(self):
+        for result in self.func(*self.args, cancelled=lambda: self.cancelled):
+            self.emit(result)
+
+class JobEngine(QObject):
+    """任务引擎 - 同一时间只运行一个批处理任务, 工作进程在会话内常驻以复用缓存"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.workers = None
+        self.current = None
+
+    def is_running(self):
+        return self.current is not None
+
+    def submit(self, func, items, args=(), max_workers=None, stream=False):
+        """提交任务并返回 BatchJob/StreamJob, 由调用方连接信号"""
+        if self.workers is not None and self.workers.profile_dir != profile_dir():
+            # cProfile 设置改变 - 常驻进程在创建时接收设置, 需要重新创建
+            self.workers.shutdown()
+            self.workers = None
+        if self.workers is None:
+            self.workers = AffinityPool()
+        job = (StreamJob if stream else BatchJob)(func, items, args, max_workers, self.workers)
+        job.signals.finished.connect(self._on_finished)
+        self.current = job
+        return job
+
+    def submit_call(self, func, args=(), total=0):
+        """提交在线程中运行的单次调用任务 (I/O 密集, 不使用工作进程)"""
+        job = CallJob(func, args, total)
+        job.signals.finished.connect(self._on_finished)
+        self.current = job
+        return job
+
+    def submit_iter(self, func, args=()):
+        """提交生成器任务 (例如后台发现文件)"""
+        job = IterJob(func, args)
+        job.signals.finished.connect(self._on_finished)
+        self.current = job
+        return job
+
+    def start_background(self, job):
+        """在全局线程池中运行不占用任务引擎的轻量任务 (例如监视轮询)"""
+        QThreadPool.globalInstance().start(job)
+
+    def start(self, job):
+        self.pool.start(job)
+
+    def cancel(self):
+        if self.current is not None:
+            self.current.cancel()
+
+    def _on_finished(self, done, cancelled):
+        self.current = None
+
+    def wait(self):
+        self.pool.waitForDone()
+
+    def shutdown(self):
+        """取消任务并关闭常驻工作进程"""
+        self.cancel()
+        self.wait()
+        if self.workers is not None:
+            self.workers.shutdown(cancel_futures=True)
+            self.workers = None
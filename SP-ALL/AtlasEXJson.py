@@ -0,0 +1,175 @@
+import io
+import json
+from json.decoder import WHITESPACE
+from SpineAtlas import AtlasTex, AtlasFrame
+from AtlasEXZip import open_file
+
+# 每次读取的字符数
+_CHUNK = 1 << 20
+
+class JsonStream:
+    """增量 JSON 读取器 - 按块读取文件, 逐个解析数组元素, 不把整个文档载入内存"""
+
+    def __init__(self, f, chunk=_CHUNK):
+        self.f = f
+        self.chunk = chunk
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        """读取更多数据, 丢弃已消费的部分; 返回是否读到了新数据"""
+        if self.eof:
+            return False
+        data = self.f.read(size or self.chunk)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符, 文件结束时返回空字符串"""
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON 格式错误: 期望 '{char}', 实际为 '{found or 'EOF'}'")
+        self.pos += 1
+
+    def value(self):
+        """解析下一个完整的值"""
+        self.peek()
+        size = self.chunk
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # 值可能被块边界截断 - 每次加倍读取量, 避免大值的重复解析
+                if not self._fill(size):
+                    raise
+                size *= 2
+                continue
+            # 数字可能恰好在块边界被截断
+            if end == len(self.buf) and not self.eof and isinstance(value, (int, float)):
+                if self._fill(size):
+                    continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """逐个产出对象的键, 调用方必须消费对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            sep = self.peek()
+            self.pos += 1
+            if sep == '}':
+                return
+            if sep != ',':
+                raise ValueError(f"JSON 格式错误: 对象中出现 '{sep or 'EOF'}'")
+
+    def elements(self):
+        """逐个产出数组元素的位置, 调用方必须消费元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            sep = self.peek()
+            self.pos += 1
+            if sep == ']':
+                return
+            if sep != ',':
+                raise ValueError(f"JSON 格式错误: 数组中出现 '{sep or 'EOF'}'")
+
+def make_frame(info):
+    """JSON 帧 -> AtlasFrame"""
+    return AtlasFrame(
+        info['Frame_Name'],
+        info['Cut_X'],
+        info['Cut_Y'],
+        info['Cut_Width'],
+        info['Cut_Height'],
+        info['Original_X'],
+        info['Original_Y'],
+        info['Original_Width'],
+        info['Original_Height'],
+        info['Rotate']
+    )
+
+def make_texture(info, frames):
+    """JSON 纹理 -> AtlasTex"""
+    return AtlasTex(info['Texture_Name'], info['Texture_Width'], info['Texture_Height'], frames=frames)
+
+def _read_page(stream, keys=None):
+    """读取一个纹理页对象 {Texture, Frame}; keys 为已经打开的对象键迭代器"""
+    texture = None
+    frames = None
+    for key in keys if keys is not None else stream.items():
+        if key == 'Texture':
+            texture = stream.value()
+        elif key == 'Frame':
+            frames = [make_frame(stream.value()) for _ in stream.elements()]
+        else:
+            stream.value()
+    if texture is None or frames is None:
+        return None
+    return make_texture(texture, frames)
+
+def _read_pages(stream):
+    """读取纹理页数组"""
+    pages = []
+    for _ in stream.elements():
+        if stream.peek() == '{':
+            page = _read_page(stream)
+            if page is not None:
+                pages.append(page)
+        else:
+            stream.value()
+    return pages
+
+def read_texture_json(json_path):
+    """流式读取纹理 JSON, 返回 AtlasTex 列表; 不是纹理 JSON 时返回空列表
+
+    支持三种结构:
+      {"Texture": {...}, "Frame": [...]}               - 单纹理
+      {"Textures": [{"Texture": ..., "Frame": ...}]}   - 多纹理
+      [{"Texture": ..., "Frame": ...}, ...]            - 多纹理
+    """
+    with io.TextIOWrapper(open_file(json_path), encoding='utf-8-sig') as f:
+        stream = JsonStream(f)
+        start = stream.peek()
+        if start == '[':
+            return _read_pages(stream)
+        if start != '{':
+            raise ValueError("JSON 格式错误: 顶层不是对象或数组")
+
+        # 顶层对象既可能是单个纹理页, 也可能包含 Textures 数组
+        pages = []
+
+        def keys():
+            for key in stream.items():
+                if key == 'Textures':
+                    pages.extend(_read_pages(stream))
+                else:
+                    yield key
+
+        page = _read_page(stream, keys())
+        if page is not None:
+            pages.insert(0, page)
+        return pages
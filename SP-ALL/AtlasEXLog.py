@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import shutil
+import threading
+from pathlib import Path
+from AtlasEXZip import split_member
+
+# 日志级别
+INFO = "INFO"
+WARNING = "WARNING"
+ERROR = "ERROR"
+LEVELS = (INFO, WARNING, ERROR)
+
+# 运行报告保存在输入目录下, 每个目录只保留最近的若干份
+RUNS_DIR = ".atlasex_runs"
+RUN_HISTORY = 50
+
+class LogSink:
+    """线程安全的日志缓冲 - 任意线程写入, 界面定时批量取出, 避免逐条刷新控件"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = []
+
+    def write(self, level, message):
+        with self.lock:
+            self.pending.append((time.time(), level, message))
+
+    def drain(self):
+        """取出所有待显示的日志 [(时间, 级别, 消息)]"""
+        with self.lock:
+            items, self.pending = self.pending, []
+        return items
+
+def run_report_path(files, command, root=None):
+    """运行报告的位置 - <输入目录>/.atlasex_runs/<时间>-<进程>-<命令>.jsonl
+
+    未指定 root 时取输入文件的公共目录 (压缩包中的文件按压缩包所在目录).
+    """
+    if root is None:
+        real = [(split_member(f) or (f,))[0] for f in files if isinstance(f, str)]
+        if not real:
+            return None
+        root = os.path.commonpath([str(Path(f).resolve().parent) for f in real])
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{command}.jsonl"
+    return str(Path(root).joinpath(RUNS_DIR, name))
+
+def _prune(directory, keep=RUN_HISTORY):
+    """删除最旧的运行报告, 只保留 keep 份; 报告旁边的 Trace 和 cProfile 结果一起删除"""
+    try:
+        reports = sorted(e.path for e in os.scandir(directory) if e.name.endswith('.jsonl'))
+    except OSError:
+        return
+    for path in reports[:-keep]:
+        base = path[:-len('.jsonl')]
+        shutil.rmtree(base + ".profile", ignore_errors=True)
+        for target in (path, base + ".trace.json"):
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+def _phase_totals(phases):
+    """[(阶段, 开始, 耗时, 进程号)] -> {阶段: 总耗时}"""
+    if not phases:
+        return None
+    totals = {}
+    for name, _, duration, _ in phases:
+        totals[name] = round(totals.get(name, 0.0) + duration, 6)
+    return totals
+
+def _timestamp(seconds):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))
+
+class RunReport:
+    """结构化运行报告 (JSONL) - 第一行为运行信息, 每个文件一行, 最后一行为汇总
+
+    按行缓冲, 每条记录写入后立即交给操作系统, 运行中途崩溃时已完成文件的记录仍然保留.
+    """
+
+    def __init__(self, path, command, total=0, started=None):
+        self.path = str(path)
+        self.command = command
+        self.started = time.time() if started is None else started
+        self.counts = {'ok': 0, 'error': 0, 'skipped': 0}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'w', encoding='utf-8', buffering=1)
+        self._write({'type': 'run', 'command': command, 'started': _timestamp(self.started),
+                     'total': total, 'pid': os.getpid()})
+
+    def _write(self, entry):
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def record(self, result, operation=None):
+        """记录单个文件的结果; 没有 'file' 的汇总结果不记录"""
+        if 'file' not in result:
+            return
+        if result.get('skipped'):
+            status = 'skipped'
+        else:
+            status = 'ok' if result.get('ok') else 'error'
+        self.counts[status] += 1
+        file_path = result['file']
+        self._write({
+            'type': 'file',
+            'file': file_path if isinstance(file_path, str) else str(file_path),
+            'operation': result.get('operation') or operation or self.command,
+            'status': status,
+            'duration': result.get('duration'),
+            'phases': _phase_totals(result.get('phases')),
+            'error': result.get('error'),
+            'output': result.get('output'),
+        })
+
+    def close(self, summary=None, cancelled=False):
+        """写入汇总并关闭, 删除多余的旧报告"""
+        if self.file.closed:
+            return
+        finished = time.time()
+        self._write(dict(summary or {}, type='summary', finished=_timestamp(finished),
+                         elapsed=round(finished - self.started, 3), cancelled=cancelled, **self.counts))
+        self.file.close()
+        _prune(os.path.dirname(self.path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(cancelled=exc_type is not None)
+
+def write_run_report(path, command, results, summary=None, started=None):
+    """一次性写入整个运行的报告 (命令行使用)"""
+    with RunReport(path, command, len(results), started) as report:
+        for result in results:
+            report.record(result)
+        report.close(summary)
@@ -0,0 +1,153 @@
+import time
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QListView, QComboBox, QLineEdit, QPushButton, QLabel, QApplication,
+    QAbstractItemView
+)
+from PySide6.QtGui import QColor, QKeySequence, QShortcut
+from PySide6.QtCore import Qt, QTimer, QAbstractListModel, QModelIndex, QSortFilterProxyModel
+from AtlasEXLog import LogSink, INFO, WARNING, ERROR
+
+# 刷新间隔 (毫秒) 和保留的最大行数 - 超出时按批删除最旧的日志
+FLUSH_INTERVAL = 100
+MAX_ROWS = 200000
+
+_COLORS = {WARNING: QColor(180, 110, 0), ERROR: QColor(200, 0, 0)}
+
+class LogModel(QAbstractListModel):
+    """日志模型 - 只保存 (时间, 级别, 消息), 由 QListView 按需绘制可见行"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        stamp, level, message = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return f"[{level}] {message}"
+        if role == Qt.ForegroundRole:
+            return _COLORS.get(level)
+        if role == Qt.ToolTipRole:
+            return time.strftime('%H:%M:%S', time.localtime(stamp))
+        return None
+
+    def extend(self, items):
+        """批量追加, 每批只发出一次插入信号"""
+        if not items:
+            return
+        overflow = min(len(self.rows) + len(items) - MAX_ROWS, len(self.rows))
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            del self.rows[:overflow]
+            self.endRemoveRows()
+        items = items[-MAX_ROWS:]
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(items) - 1)
+        self.rows.extend(items)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.rows = []
+        self.endResetModel()
+
+class LogFilter(QSortFilterProxyModel):
+    """按级别和关键字过滤日志"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.levels = None
+        self.text = ""
+
+    def set_filter(self, levels, text):
+        self.levels = levels
+        self.text = text.lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        _, level, message = self.sourceModel().rows[row]
+        if self.levels is not None and level not in self.levels:
+            return False
+        return not self.text or self.text in message.lower()
+
+class LogView(QWidget):
+    """虚拟化日志视图 - 日志先写入线程安全的 LogSink, 定时批量刷新到模型"""
+
+    # 级别过滤选项 - 显示名称 -> 显示的级别 (None 为全部)
+    FILTERS = {"全部": None, "警告和错误": (WARNING, ERROR), "只看错误": (ERROR,), "只看信息": (INFO,)}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sink = LogSink()
+        self.model = LogModel(self)
+        self.proxy = LogFilter(self)
+        self.proxy.setSourceModel(self.model)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        QShortcut(QKeySequence.Copy, self.view, self.copy_selected)
+
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(list(self.FILTERS))
+        self.level_combo.currentIndexChanged.connect(self.apply_filter)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("搜索日志")
+        self.search_input.textChanged.connect(self.apply_filter)
+        clear_button = QPushButton("清空")
+        clear_button.clicked.connect(self.clear)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("级别:"))
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addWidget(self.search_input)
+        filter_layout.addWidget(clear_button)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.view)
+        self.setLayout(layout)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(FLUSH_INTERVAL)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def write(self, level, message):
+        """写入日志 - 可在任意线程调用"""
+        self.sink.write(level, message)
+
+    def flush(self):
+        """把缓冲的日志刷新到模型; 原本停在底部时保持滚动到底部"""
+        items = self.sink.drain()
+        if not items:
+            return
+        scrollbar = self.view.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        self.model.extend(items)
+        if at_bottom:
+            self.view.scrollToBottom()
+
+    def apply_filter(self):
+        self.proxy.set_filter(self.FILTERS[self.level_combo.currentText()], self.search_input.text())
+
+    def clear(self):
+        self.sink.drain()
+        self.model.clear()
+
+    def copy_selected(self):
+        """复制选中的日志行"""
+        rows = sorted(self.view.selectionModel().selectedRows(), key=lambda index: index.row())
+        QApplication.clipboard().setText("\n".join(index.data() for index in rows))
+
+    def text(self):
+        """全部日志文本 (包括尚未刷新的)"""
+        self.flush()
+        return "\n".join(f"[{level}] {message}" for _, level, message in self.model.rows)
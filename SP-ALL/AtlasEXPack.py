@@ -0,0 +1,353 @@
+import os
+from time import perf_counter
+import numpy as np
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from PIL.Image import new as imgnew
+from SpineAtlas import Atlas, AtlasTex, AtlasFrame
+from AtlasEXCache import load_atlas, invalidate
+from AtlasEXWriter import atlas_text, atomic_write, atomic_file
+from AtlasEXZip import open_image, source_dir
+
+HEURISTICS = ('maxrects', 'skyline')
+
+# 排序键的放大系数 - 把多级比较合成一个整数分数
+_SCORE = 1 << 32
+_SIDE = 1 << 16
+
+class MaxRectsBin:
+    """MaxRects 装箱 - 空闲矩形保存在 NumPy 数组中, 分割和剪枝都是向量运算
+
+    优先选择使已占用区域包围盒增长最少的位置, 其次按 Best Short Side Fit,
+    这样未装满的页也保持紧凑. limit 为空闲矩形的 (最大短边, 最大长边), 快满的页
+    只剩零碎的空闲矩形, 超出 limit 的矩形不用扫描就能跳过.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = np.array([[0, 0, width, height]], dtype=np.int64)
+        self.used = (0, 0)
+        self.limit = (min(width, height), max(width, height))
+
+    def find(self, w, h, rotate):
+        """返回 (分数, x, y, 是否旋转), 放不下时返回 None"""
+        if min(w, h) > self.limit[0] or max(w, h) > self.limit[1]:
+            return None
+        # 两个方向一起计算, 第 0 行不旋转; 分数相同时优先不旋转和靠前的空闲矩形
+        dims = np.array([[w, h], [h, w]] if rotate and w != h else [[w, h]])
+        lw = self.free[:, 2] - dims[:, 0:1]
+        lh = self.free[:, 3] - dims[:, 1:2]
+        rotated, fit = np.nonzero((lw >= 0) & (lh >= 0))
+        if not len(fit):
+            return None
+        lw, lh = lw[rotated, fit], lh[rotated, fit]
+        bw = np.maximum(self.free[fit, 0] + dims[rotated, 0], self.used[0])
+        bh = np.maximum(self.free[fit, 1] + dims[rotated, 1], self.used[1])
+        score = bw * bh * _SCORE + np.minimum(lw, lh) * _SIDE + np.maximum(lw, lh)
+        i = int(score.argmin())
+        j = fit[i]
+        return int(score[i]), int(self.free[j, 0]), int(self.free[j, 1]), bool(rotated[i])
+
+    def place(self, x, y, w, h):
+        """占用矩形, 分割与之相交的空闲矩形并去掉被包含的部分"""
+        f = self.free
+        fx, fy, fw, fh = f[:, 0], f[:, 1], f[:, 2], f[:, 3]
+        hit = (x < fx + fw) & (x + w > fx) & (y < fy + fh) & (y + h > fy)
+        keep = f[~hit]
+        g = f[hit]
+        gx, gy, gw, gh = g[:, 0], g[:, 1], g[:, 2], g[:, 3]
+        # 每个相交的矩形最多分出 左/右/上/下 四块, 宽或高不为正的丢弃
+        pieces = np.repeat(g[None], 4, axis=0)
+        pieces[0, :, 2] = x - gx
+        pieces[1, :, 0] = x + w
+        pieces[1, :, 2] = gx + gw - (x + w)
+        pieces[2, :, 3] = y - gy
+        pieces[3, :, 1] = y + h
+        pieces[3, :, 3] = gy + gh - (y + h)
+        pieces = pieces.reshape(-1, 4)
+        pieces = pieces[(pieces[:, 2] > 0) & (pieces[:, 3] > 0)]
+        self.free = np.concatenate([keep, pieces])
+        if len(pieces):
+            # 一次比较新矩形与所有空闲矩形 - 新矩形之间互相包含时, 相同的矩形只保留第一个
+            inside = _contained_matrix(pieces, self.free)
+            own = inside[:, len(keep):]
+            drop = inside[:, :len(keep)].any(axis=1) | (own & (~own.T | np.tri(len(pieces), k=-1, dtype=bool))).any(axis=1)
+            if drop.any():
+                self.free = np.concatenate([keep, pieces[~drop]])
+        self.used = (max(self.used[0], x + w), max(self.used[1], y + h))
+        if len(self.free):
+            fw, fh = self.free[:, 2], self.free[:, 3]
+            self.limit = (int(np.minimum(fw, fh).max()), int(np.maximum(fw, fh).max()))
+        else:
+            self.limit = (0, 0)
+
+def _contained_matrix(a, b):
+    """a[i] 是否被 b[j] 包含"""
+    ax, ay = a[:, 0:1], a[:, 1:2]
+    ar, ab = ax + a[:, 2:3], ay + a[:, 3:4]
+    bx, by = b[:, 0], b[:, 1]
+    br, bb = bx + b[:, 2], by + b[:, 3]
+    return (bx <= ax) & (by <= ay) & (br >= ar) & (bb >= ab)
+
+class SkylineBin:
+    """Skyline 装箱 (Bottom-Left) - 比 MaxRects 更快, 密度略低"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.line = [[0, 0, width]]  # [x, y, 宽度]
+
+    def _fit(self, index, w, h):
+        """矩形左边对齐第 index 段时的放置高度, 放不下时返回 None"""
+        x = self.line[index][0]
+        if x + w > self.width:
+            return None
+        y = 0
+        remaining = w
+        i = index
+        while remaining > 0:
+            if i >= len(self.line):
+                return None
+            y = max(y, self.line[i][1])
+            if y + h > self.height:
+                return None
+            remaining -= self.line[i][2]
+            i += 1
+        return y
+
+    def find(self, w, h, rotate):
+        best = None
+        for rotated, (rw, rh) in ((False, (w, h)), (True, (h, w))):
+            if rotated and (not rotate or w == h):
+                break
+            for i in range(len(self.line)):
+                y = self._fit(i, rw, rh)
+                if y is None:
+                    continue
+                score = (y + rh) * _SCORE + self.line[i][0]
+                if best is None or score < best[0]:
+                    best = (score, self.line[i][0], y, rotated)
+        return best
+
+    def place(self, x, y, w, h):
+        line = self.line
+        top = y + h
+        new = [x, top, w]
+        # 去掉被新段覆盖的部分
+        result = []
+        for sx, sy, sw in line:
+            end = sx + sw
+            if end <= x or sx >= x + w:
+                result.append([sx, sy, sw])
+                continue
+            if sx < x:
+                result.append([sx, sy, x - sx])
+            if end > x + w:
+                result.append([x + w, sy, end - (x + w)])
+        result.append(new)
+        result.sort()
+        # 合并相同高度的相邻段
+        merged = [result[0]]
+        for seg in result[1:]:
+            if seg[1] == merged[-1][1] and merged[-1][0] + merged[-1][2] == seg[0]:
+                merged[-1][2] += seg[2]
+            else:
+                merged.append(seg)
+        self.line = merged
+
+def pack_rects(sizes, max_size=2048, padding=2, rotate=True, heuristic='maxrects'):
+    """装箱 - sizes 为 [(宽, 高)], 返回 ([(页序号, x, y, 是否旋转)], [(页宽, 页高)])
+
+    按长边降序依次放入第一个放得下的页, 都放不下时开新页.
+    """
+    bin_type = MaxRectsBin if heuristic == 'maxrects' else SkylineBin
+    order = sorted(range(len(sizes)), key=lambda i: (max(sizes[i]), sizes[i][0] * sizes[i][1]), reverse=True)
+    bins = []
+    placements = [None] * len(sizes)
+    extents = []
+    for i in order:
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        for page, packer in enumerate(bins):
+            found = packer.find(w, h, rotate)
+            if found is not None:
+                break
+        else:
+            packer = bin_type(max_size + padding, max_size + padding)
+            found = packer.find(w, h, rotate)
+            if found is None:
+                raise ValueError(f"帧尺寸 {sizes[i][0]}x{sizes[i][1]} 超出最大页尺寸 {max_size}")
+            bins.append(packer)
+            extents.append([0, 0])
+            page = len(bins) - 1
+        _, x, y, rotated = found
+        pw, ph = (h, w) if rotated else (w, h)
+        packer.place(x, y, pw, ph)
+        placements[i] = (page, x, y, rotated)
+        extents[page][0] = max(extents[page][0], x + pw - padding)
+        extents[page][1] = max(extents[page][1], y + ph - padding)
+    return placements, [tuple(e) for e in extents]
+
+def _pot(value):
+    return 1 << max(0, (value - 1).bit_length())
+
+def frame_image(page, frame):
+    """从纹理页裁出帧内容 (未旋转方向, 尺寸为 cutw x cuth)"""
+    cx, cy, cw, ch = frame.cutx, frame.cuty, frame.cutw, frame.cuth
+    rotated = frame.rota not in (0, 180, -180)
+    box = (cx, cy, cx + ch, cy + cw) if rotated else (cx, cy, cx + cw, cy + ch)
+    cut = page.crop(box)
+    if frame.rota != 0:
+        cut = cut.rotate(frame.rota * -1, expand=True)
+    return cut
+
+def _trim(image, frame):
+    """去掉透明边框, 返回 (图像, offx, offy, 宽, 高); offy 从底部计算"""
+    bbox = image.getchannel('A').getbbox()
+    if bbox is None:
+        # 全透明的帧保留 1x1
+        return image.crop((0, 0, 1, 1)), 0, 0, 1, 1
+    left, top, right, bottom = bbox
+    offy = frame.offy + (frame.cuth - bottom)
+    return image.crop(bbox), frame.offx + left, offy, right - left, bottom - top
+
+def page_names(stem, count):
+    """新纹理页的文件名 - <名称>.png, <名称>_2.png ..."""
+    return [f"{stem}.png" if i == 0 else f"{stem}_{i + 1}.png" for i in range(count)]
+
+def compose_pages(images, placements, sizes):
+    """按装箱结果把帧图像 (未旋转方向) 合成到新纹理页, 旋转的帧逆时针转 90 度放入"""
+    canvases = [imgnew('RGBA', size, (0, 0, 0, 0)) for size in sizes]
+    for image, (page, x, y, rotated) in zip(images, placements):
+        canvases[page].paste(image.rotate(90, expand=True) if rotated else image, (x, y))
+    return canvases
+
+def save_pages(canvases, paths, threads=None):
+    """并行保存纹理页 - 先写入临时文件再替换"""
+    def save(args):
+        canvas, target = args
+        with atomic_file(target) as f:
+            canvas.save(f, format='PNG')
+
+    with ThreadPoolExecutor(max_workers=threads or min(32, (os.cpu_count() or 1) * 2)) as executor:
+        list(executor.map(save, zip(canvases, paths)))
+
+def load_page(path):
+    with open_image(path) as img:
+        return img.convert('RGBA') if img.mode != 'RGBA' else img.copy()
+
+def occupancy(pages):
+    """占用率 - pages 为 [(页宽, 页高, [帧占用面积])]"""
+    total = sum(w * h for w, h, _ in pages)
+    used = sum(sum(areas) for _, _, areas in pages)
+    return used / total if total else 0.0
+
+def repack(files, output_file, max_size=2048, padding=2, trim=True, rotate=True, heuristic='maxrects',
+           pot=False, threads=None, progress=None, cancelled=None):
+    """合并一个或多个 Atlas 的帧, 重新装箱并写入新的纹理页和 Atlas, 返回报告
+
+    纹理页保存在输出 Atlas 旁边, 命名为 <名称>.png, <名称>_2.png ...
+    同名帧只保留第一个, pma/scale 不同的帧装入各自的纹理页.
+    取消时在写入任何文件之前返回, 报告中 cancelled 为 True.
+    """
+    threads = threads or min(32, (os.cpu_count() or 1) * 2)
+    report = {'files': [str(f) for f in files], 'output': str(output_file), 'frames': 0, 'duplicates': [],
+              'before': {'pages': 0, 'occupancy': 0.0}, 'after': {'pages': 0, 'occupancy': 0.0},
+              'pack_seconds': 0.0, 'pages': [], 'cancelled': False}
+    cancelled = cancelled or (lambda: False)
+
+    # 读取 Atlas 和纹理页 (解码在线程中并行)
+    atlases = []
+    for file_path in files:
+        if cancelled():
+            report['cancelled'] = True
+            return report
+        atlases.append(load_atlas(file_path))
+        if progress is not None:
+            progress(len(atlases), len(files))
+    page_paths = list(dict.fromkeys(str(a.path.joinpath(t.png).resolve()) for a in atlases for t in a.atlas))
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        images = dict(zip(page_paths, executor.map(load_page, page_paths)))
+
+    # 裁出帧内容
+    entries = []
+    names = set()
+    before = []
+    for atlas in atlases:
+        for tex in atlas.atlas:
+            page = images[str(atlas.path.joinpath(tex.png).resolve())]
+            areas = []
+            for frame in tex.frames:
+                areas.append(frame.cutw * frame.cuth)
+                if frame.name in names:
+                    report['duplicates'].append(frame.name)
+                    continue
+                names.add(frame.name)
+                image = frame_image(page, frame)
+                if trim:
+                    image, offx, offy, w, h = _trim(image, frame)
+                else:
+                    offx, offy, w, h = frame.offx, frame.offy, frame.cutw, frame.cuth
+                entries.append((frame.name, image, offx, offy, w, h, frame.offw, frame.offh, (tex.pma, tex.scale)))
+            before.append((tex.w, tex.h, areas))
+    report['frames'] = len(entries)
+    report['before'] = {'pages': len(before), 'occupancy': occupancy(before)}
+
+    # pma/scale 是纹理页的属性, 不同的帧分组装入各自的页
+    start = perf_counter()
+    groups = {}
+    for i, entry in enumerate(entries):
+        groups.setdefault(entry[8], []).append(i)
+    placements = [None] * len(entries)
+    extents = []
+    kinds = []
+    for kind, members in groups.items():
+        group_placements, group_extents = pack_rects([(entries[i][4], entries[i][5]) for i in members],
+                                                     max_size, padding, rotate, heuristic)
+        for i, (page, x, y, rotated) in zip(members, group_placements):
+            placements[i] = (len(extents) + page, x, y, rotated)
+        extents += group_extents
+        kinds += [kind] * len(group_extents)
+    report['pack_seconds'] = perf_counter() - start
+    if cancelled():
+        report['cancelled'] = True
+        return report
+
+    # 合成新纹理页
+    output = Path(output_file)
+    stem = output.stem
+    sizes = [(_pot(w), _pot(h)) if pot else (w, h) for w, h in extents]
+    frames = [[] for _ in sizes]
+    after = [(w, h, []) for w, h in sizes]
+    for (name, image, offx, offy, w, h, offw, offh, _), (page, x, y, rotated) in zip(entries, placements):
+        frames[page].append(AtlasFrame(name, x, y, w, h, offx, offy, offw, offh, 90 if rotated else 0))
+        after[page][2].append(w * h)
+    report['after'] = {'pages': len(sizes), 'occupancy': occupancy(after)}
+
+    pngs = page_names(stem, len(sizes))
+    if any(str(output.parent.joinpath(png).resolve()) in images for png in pngs):
+        raise ValueError("输出纹理页会覆盖源纹理页, 请选择其他输出位置")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    canvases = compose_pages([e[1] for e in entries], placements, sizes)
+    save_pages(canvases, [output.parent.joinpath(png) for png in pngs], threads)
+
+    pages = [AtlasTex(png, w, h, pma, scale, page_frames)
+             for png, (w, h), (pma, scale), page_frames in zip(pngs, sizes, kinds, frames)]
+    atlas = Atlas(pages, version=atlases[0].version)
+    atomic_write(str(output), atlas_text(atlas))
+    invalidate(str(output))
+    report['pages'] = pngs
+    return report
+
+def repack_file(file_path, output_dir, root=None, max_size=2048, padding=2, trim=True, rotate=True,
+                heuristic='maxrects', pot=False):
+    """单独重新打包一个 Atlas (进程池任务), 按相对 root 的目录结构输出到 output_dir"""
+    rel = source_dir(file_path).relative_to(root) if root else Path()
+    output = str(Path(output_dir).joinpath(rel, Path(file_path).name))
+    result = {'file': file_path, 'ok': False, 'output': output, 'error': None, 'report': None}
+    try:
+        result['report'] = repack([file_path], output, max_size, padding, trim, rotate, heuristic, pot, threads=1)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
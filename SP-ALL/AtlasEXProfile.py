@@ -0,0 +1,133 @@
+import os
+import json
+import glob
+import pstats
+import cProfile
+from time import perf_counter
+from contextlib import contextmanager
+import numpy as np
+
+# 当前进程的 cProfile 输出目录 (None 为关闭) - 进程池通过 initializer 传给工作进程
+_profile_dir = None
+_profiler = None
+
+# 合并后的 cProfile 结果
+PROFILE_NAME = "profile.prof"
+PROFILE_TEXT = "profile.txt"
+
+class PhaseTimer:
+    """记录单个文件各阶段的耗时, 写入结果的 'phases': [(阶段, 开始, 耗时, 进程号)]
+
+    开始时间取自 perf_counter (系统范围的单调时钟), 不同工作进程的记录可以放在同一条时间线上.
+    """
+
+    def __init__(self, result):
+        self.phases = result.setdefault('phases', [])
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start, perf_counter() - start, os.getpid()))
+
+def set_profile_dir(path):
+    """开启 (目录) 或关闭 (None) 当前进程的 cProfile 采集"""
+    global _profile_dir, _profiler
+    if path != _profile_dir:
+        _profile_dir = path
+        _profiler = None
+
+def profile_dir():
+    return _profile_dir
+
+def profiled(func, *args, **kwargs):
+    """调用 func; 开启采集时在 cProfile 下运行, 并把本进程累计的结果写入 <目录>/<进程号>.prof"""
+    global _profiler
+    if _profile_dir is None:
+        return func(*args, **kwargs)
+    if _profiler is None:
+        os.makedirs(_profile_dir, exist_ok=True)
+        _profiler = cProfile.Profile()
+    _profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _profiler.disable()
+        # 工作进程退出时不会执行 atexit, 每次调用后都写出
+        _profiler.dump_stats(os.path.join(_profile_dir, f"{os.getpid()}.prof"))
+
+def merge_profiles(directory, limit=40):
+    """合并各进程的 .prof, 写出 profile.prof 和按累计耗时排序的 profile.txt; 没有数据时返回 None"""
+    files = [f for f in glob.glob(os.path.join(directory, "*.prof")) if os.path.basename(f) != PROFILE_NAME]
+    if not files:
+        return None
+    stats = pstats.Stats(*files)
+    merged = os.path.join(directory, PROFILE_NAME)
+    stats.dump_stats(merged)
+    with open(os.path.join(directory, PROFILE_TEXT), 'w', encoding='utf-8') as f:
+        pstats.Stats(merged, stream=f).sort_stats('cumulative').print_stats(limit)
+    return merged
+
+class Profiler:
+    """汇总一次运行的阶段耗时 - 百分位数, 吞吐量和 Chrome Trace"""
+
+    def __init__(self, started=None):
+        self.started = perf_counter() if started is None else started
+        self.files = 0
+        self.bytes = 0
+        self.durations = []
+        self.phases = {}
+        self.events = []
+
+    def add(self, result):
+        self.files += 1
+        self.bytes += result.get('bytes') or 0
+        if result.get('duration') is not None:
+            self.durations.append(result['duration'])
+        file_path = result.get('file')
+        for name, start, duration, pid in result.get('phases') or ():
+            self.phases.setdefault(name, []).append(duration)
+            self.events.append((name, start, duration, pid, file_path))
+
+    def throughput(self):
+        """(文件/秒, MB/秒)"""
+        elapsed = max(perf_counter() - self.started, 1e-9)
+        return self.files / elapsed, self.bytes / elapsed / (1024 * 1024)
+
+    def percentiles(self):
+        """{阶段: {count, total, p50, p90, p99, max}} (秒), 'file' 为整个文件的耗时"""
+        groups = dict(self.phases)
+        if self.durations:
+            groups['file'] = self.durations
+        stats = {}
+        for name, values in groups.items():
+            values = np.asarray(values, dtype=np.float64)
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            stats[name] = {'count': len(values), 'total': round(float(values.sum()), 6),
+                           'p50': round(float(p50), 6), 'p90': round(float(p90), 6),
+                           'p99': round(float(p99), 6), 'max': round(float(values.max()), 6)}
+        return stats
+
+    def write_trace(self, path):
+        """写出 Chrome Trace / Perfetto 可以打开的 JSON, 每个工作进程一条轨道"""
+        base = min([self.started] + [e[1] for e in self.events])
+        events = []
+        for pid in sorted({e[3] for e in self.events}):
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': pid,
+                           'args': {'name': f"worker {pid}"}})
+        for name, start, duration, pid, file_path in self.events:
+            events.append({'name': name, 'cat': 'atlas', 'ph': 'X', 'pid': pid, 'tid': pid,
+                           'ts': round((start - base) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+                           'args': {'file': file_path if isinstance(file_path, str) else str(file_path)}})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+def format_percentiles(stats):
+    """百分位数表格 (毫秒), 按总耗时降序"""
+    lines = [f"{'阶段':<12}{'次数':>8}{'总计(s)':>10}{'p50':>9}{'p90':>9}{'p99':>9}{'最大':>9}"]
+    for name, s in sorted(stats.items(), key=lambda item: item[1]['total'], reverse=True):
+        lines.append(f"{name:<12}{s['count']:>8}{s['total']:>10.2f}{s['p50'] * 1000:>9.2f}"
+                     f"{s['p90'] * 1000:>9.2f}{s['p99'] * 1000:>9.2f}{s['max'] * 1000:>9.2f}")
+    return lines
@@ -0,0 +1,302 @@
+import os
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from AtlasEXCore import iter_batch
+from AtlasEXCache import load_atlas, invalidate
+from AtlasEXWriter import atlas_text, atomic_write, output_path, source_root
+from AtlasEXZip import read_bytes, exists, is_member, split_member
+from AtlasEXSkel import SKEL_SUFFIXES, read_skel
+from AtlasEXPack import repack
+
+# 不使用纹理区域的附件类型
+UNTEXTURED = frozenset(('boundingbox', 'path', 'point', 'clipping'))
+
+# 骨骼文件的扩展名 - 按查找顺序
+SKELETON_SUFFIXES = ('.json',) + SKEL_SUFFIXES
+
+def _skins(data):
+    """遍历所有皮肤的 (插槽附件映射) - 3.8 起 skins 为数组, 之前为 {皮肤名: {...}}"""
+    skins = data.get('skins') or ()
+    if isinstance(skins, dict):
+        yield from skins.values()
+        return
+    for skin in skins:
+        if isinstance(skin, dict):
+            yield skin.get('attachments') or {}
+
+def region_names(data):
+    """骨骼 JSON 结构中附件引用的所有区域名, 不是骨骼数据时返回 None
+
+    区域名为附件的 path, 没有时为 name 或附件键名; 带 sequence 的附件 (4.1+)
+    引用 path + 序号 (start 起, 按 digits 补零) 的每一帧.
+    """
+    if not isinstance(data, dict) or 'bones' not in data:
+        return None
+    names = set()
+    for skin in _skins(data):
+        for slot in skin.values():
+            for key, attachment in slot.items():
+                if not isinstance(attachment, dict):
+                    continue
+                if attachment.get('type', 'region') in UNTEXTURED:
+                    continue
+                path = attachment.get('path') or attachment.get('name') or key
+                sequence = attachment.get('sequence')
+                if isinstance(sequence, dict):
+                    start, digits = sequence.get('start', 1), sequence.get('digits', 0)
+                    names.update(f"{path}{str(start + i).zfill(digits)}" for i in range(sequence.get('count', 0)))
+                else:
+                    names.add(path)
+    return names
+
+def is_skel(path):
+    lower = str(path).lower()
+    return any(lower.endswith(suffix) for suffix in SKEL_SUFFIXES)
+
+def skeleton_names_file(skel_path):
+    """读取一个骨骼文件 (进程池任务), 返回其引用的区域名; 不是骨骼 JSON 时 names 为 None"""
+    result = {'file': skel_path, 'ok': False, 'error': None, 'names': None}
+    try:
+        data = read_bytes(skel_path)
+        if is_skel(skel_path):
+            names = region_names(read_skel(data))
+        else:
+            names = region_names(json.loads(data.decode('utf-8-sig')))
+        result['names'] = sorted(names) if names is not None else None
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _atlas_stem(file_path):
+    name = Path(split_member(file_path)[1] if is_member(file_path) else file_path).name
+    return name[:-len('.atlas')] if name.lower().endswith('.atlas') else name.split('.')[0]
+
+def find_skeletons(file_path):
+    """查找 Atlas 对应的骨骼文件, 返回 [(路径, 是否必需)]
+
+    优先使用同名的 .json / .skel / .skel.bytes; 没有时使用同一目录中所有可能是骨骼的
+    .json 和 .skel (如转换器生成的 action1.json) - 不是骨骼数据或无法解析的文件忽略.
+    """
+    stem = _atlas_stem(file_path)
+    path = Path(file_path)
+    named = [str(path.with_name(stem + suffix)) for suffix in SKELETON_SUFFIXES]
+    named = [p for p in named if exists(p)]
+    if named or is_member(file_path):
+        return [(p, True) for p in named]
+    return [(str(p), False) for p in sorted(path.parent.iterdir())
+            if p.is_file() and (p.suffix.lower() == '.json' or is_skel(p))]
+
+def prune_atlas(atlas, names):
+    """删除 names 中没有的帧 (原地修改), 所有帧都被删除的纹理页一并删除
+
+    返回 (删除的帧名, 删除的帧面积, 删除的纹理页数); names 应为集合, 每帧只查找一次.
+    """
+    unused = []
+    area = 0
+    pages = []
+    for tex in atlas.atlas:
+        keep = []
+        for frame in tex.frames:
+            if frame.name in names:
+                keep.append(frame)
+            else:
+                unused.append(frame.name)
+                area += int(frame.cutw) * int(frame.cuth)
+        if keep:
+            tex.frames = keep
+            pages.append(tex)
+    removed = len(atlas.atlas) - len(pages)
+    atlas.atlas = pages
+    return unused, area, removed
+
+def compact_file(target, max_size=2048, padding=2, references=None):
+    """重新打包清理后的 Atlas (进程池任务) - 只移动帧, 不裁剪透明边框
+
+    覆盖原文件时新纹理页与源纹理页同名, 所以先打包到 Atlas 旁边的临时目录,
+    成功后再移入: 纹理页在前, Atlas 在后. 打包失败时清理后的 Atlas 仍引用原纹理页.
+    references 为 {纹理页: 引用它的 Atlas}, 新纹理页会覆盖其他 Atlas 引用的纹理页时不移入.
+    """
+    result = {'file': target, 'ok': False, 'error': None, 'report': None}
+    staging = None
+    try:
+        path = Path(target)
+        staging = Path(tempfile.mkdtemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent))
+        report = repack([target], staging / path.name, max_size, padding, trim=False, threads=1)
+        owner = str(path.resolve())
+        for name in report['pages']:
+            if set((references or {}).get(str(path.resolve().parent.joinpath(name)), ())) - {owner}:
+                raise ValueError(f"新纹理页 {name} 会覆盖其他 Atlas 引用的纹理页")
+        for name in report['pages'] + [path.name]:
+            os.replace(staging / name, path.with_name(name))
+        invalidate(target)
+        report['output'] = target
+        result['report'] = report
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+    return result
+
+def _page_paths(atlas_path):
+    atlas = load_atlas(atlas_path)
+    return {str(atlas.path.joinpath(tex.png).resolve()) for tex in atlas.atlas}
+
+def _page_references(targets, pages=()):
+    """纹理页 -> 引用它的 Atlas 集合, 以及无法确定引用的目录
+
+    扫描所有目标, 以及目标的纹理页和 pages 所在目录中的其他 Atlas (不递归). 目录中有
+    无法读取的 Atlas 时记入返回的目录集合, 其中的纹理页不会被删除.
+    """
+    references = {}
+    unsafe = set()
+
+    def scan(atlas_path):
+        try:
+            pages = _page_paths(atlas_path)
+        except Exception:
+            unsafe.add(str(Path(atlas_path).parent))
+            return
+        for page in pages:
+            references.setdefault(page, set()).add(atlas_path)
+
+    atlases = [str(Path(t).resolve()) for t in targets]
+    for atlas_path in atlases:
+        scan(atlas_path)
+    dirs = {str(Path(page).parent) for page in list(references) + list(pages)}
+    for atlas_path in (str(p) for d in sorted(dirs) for p in sorted(Path(d).glob('*.atlas'))):
+        if atlas_path not in atlases:
+            scan(atlas_path)
+    return references, unsafe
+
+def _release_pages(references, unsafe, target, pngs, sources):
+    """Atlas 重新打包为新纹理页 pngs 后, 删除不再被任何 Atlas 引用的旧纹理页, 返回删除的路径
+
+    旧纹理页为目标打包前引用的纹理页和清理前源 Atlas 的纹理页 sources.
+    """
+    target = Path(target).resolve()
+    key = str(target)
+    old = [page for page, owners in references.items() if key in owners]
+    for page in old:
+        references[page].discard(key)
+    for png in pngs:
+        references.setdefault(str(target.parent.joinpath(png)), set()).add(key)
+    deleted = []
+    for page in dict.fromkeys(old + sorted(sources)):
+        if references.get(page) or str(Path(page).parent) in unsafe:
+            continue
+        try:
+            os.remove(page)
+        except OSError:
+            continue
+        deleted.append(page)
+    return deleted
+
+def _write_pruned(atlas, target):
+    """写入清理后的 Atlas; 输出位置改变时, 纹理页按新位置重新计算相对路径"""
+    out_dir = Path(target).resolve().parent
+    for tex in atlas.atlas:
+        tex.png = Path(os.path.relpath(atlas.path.joinpath(tex.png).resolve(), out_dir)).as_posix()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write(target, atlas_text(atlas))
+    invalidate(target)
+
+def prune_atlases(files, skeletons=None, apply=False, compact=False, overwrite=False, suffix="_modified",
+                  output_root=None, max_size=2048, padding=2, max_workers=None, cancelled=None, pool=None):
+    """按骨骼引用的区域名清理 Atlas 中未使用的帧, 按 Atlas 产出结果
+
+    skeletons 为所有 Atlas 共用的骨骼文件, 默认按 find_skeletons 查找每个 Atlas 旁边的骨骼.
+    骨骼文件去重后在进程池中并行解析; 每个 Atlas 的区域名合并为一个集合, 匹配与帧数成线性.
+    apply 为 False 时只报告; 否则写入清理后的 Atlas, compact 时再重新打包纹理页, 并删除
+    不再被任何 Atlas 引用的旧纹理页 (只检查目标和纹理页所在目录中的 Atlas).
+    """
+    files = list(files)
+    cancelled = cancelled or (lambda: False)
+    if not files:
+        return
+    root = source_root(files)
+    compact = compact and apply
+    shared = [(str(p), True) for p in skeletons] if skeletons else None
+    candidates = {file_path: shared or find_skeletons(file_path) for file_path in files}
+    parsed = {}
+    unique = list(dict.fromkeys(p for found in candidates.values() for p, _ in found))
+    for result in iter_batch(skeleton_names_file, unique, (), max_workers, cancelled, pool):
+        result = dict(result, file=result['file'] if isinstance(result['file'], str) else result['file'][0])
+        # 每个骨骼的区域名只建一次集合
+        if result['ok'] and result['names'] is not None:
+            result['names'] = frozenset(result['names'])
+        parsed[result['file']] = result
+    if cancelled():
+        return
+
+    unions = {}
+    pending = []
+    for file_path in files:
+        result = {'file': file_path, 'ok': False, 'error': None, 'output': None, 'skeletons': [], 'frames': 0,
+                  'unused': [], 'unused_area': 0, 'pages': 0, 'pages_removed': 0, 'compacted': None,
+                  'pages_deleted': []}
+        try:
+            for skel_path, required in candidates[file_path]:
+                parse = parsed.get(skel_path)
+                if parse is None or not parse['ok']:
+                    if required:
+                        raise ValueError(f"读取骨骼 {Path(skel_path).name} 失败: "
+                                         f"{parse['error'] if parse else '已取消'}")
+                    continue
+                if parse['names'] is None:
+                    if required:
+                        raise ValueError(f"{Path(skel_path).name} 不是骨骼数据")
+                    continue
+                result['skeletons'].append(skel_path)
+            if not result['skeletons']:
+                # 找不到骨骼时不能判断哪些帧未使用
+                raise FileNotFoundError("未找到对应的骨骼文件 (.json / .skel)")
+            # 共用同一组骨骼的 Atlas 共用合并后的集合
+            key = tuple(result['skeletons'])
+            if key not in unions:
+                unions[key] = frozenset().union(*(parsed[p]['names'] for p in key))
+            names = unions[key]
+            atlas = load_atlas(file_path)
+            sources = {str(atlas.path.joinpath(tex.png).resolve()) for tex in atlas.atlas}
+            result['frames'] = sum(len(tex.frames) for tex in atlas.atlas)
+            result['pages'] = len(atlas.atlas)
+            result['unused'], result['unused_area'], result['pages_removed'] = prune_atlas(atlas, names)
+            if apply and result['unused']:
+                if is_member(file_path):
+                    raise ValueError("压缩包中的 Atlas 只能生成报告, 清理前请先解压")
+                target = output_path(file_path, overwrite, suffix, output_root, root)
+                _write_pruned(atlas, target)
+                result['output'] = target
+                if compact and atlas.atlas:
+                    pending.append((result, target, sources))
+                    continue
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+        yield result
+
+    if not pending:
+        return
+    waiting = {target: result for result, target, _ in pending}
+    old_pages = {target: pages for _, target, pages in pending}
+    # 所有清理结果都已写入, 之后只有重新打包会改变纹理页的引用
+    references, unsafe = _page_references(list(waiting), set().union(*old_pages.values()))
+    for compacted in iter_batch(compact_file, list(waiting), (max_size, padding, references), max_workers,
+                                cancelled, pool):
+        target = compacted['file'] if isinstance(compacted['file'], str) else compacted['file'][0]
+        result = waiting.pop(target)
+        result['compacted'] = compacted['report']
+        result['ok'] = compacted['ok']
+        result['error'] = compacted['error']
+        if compacted['ok']:
+            result['pages_deleted'] = _release_pages(references, unsafe, target, compacted['report']['pages'],
+                                                     old_pages[target])
+        yield result
+    # 取消时未重新打包的 Atlas 已写入清理结果, 仍引用原纹理页
+    for result in waiting.values():
+        result['ok'] = True
+        yield result
@@ -0,0 +1,451 @@
+"""共享目录中的分片任务队列 - 多个进程或多台机器共同处理同一批文件, 崩溃后可以继续
+
+目录结构 (<根目录>/<运行 ID>/):
+    queue.json          任务, 参数, 分片数和租约时长; 最后写入, 存在即表示队列已创建完成
+    shards/00000.json   分片中的文件列表
+    claims/00000.lock   领取锁 - O_EXCL 创建, 内容为领取者; 文件的 mtime 即租约续期时间
+    results/00000.json  分片中每个文件的结果 (原子替换)
+    done/00000.json     完成标记 (原子替换), 写入结果之后才写入
+    workers/<worker>    工作者的心跳文件, 其 mtime 用作共享文件系统的当前时间
+
+租约以文件系统的时间判断 (锁文件的 mtime 与心跳文件的 mtime 比较), 不依赖各机器的时钟同步.
+工作者崩溃后租约过期, 其他工作者接管分片重新处理; 租约被接管的工作者停止处理该分片, 不发布结果.
+结果按分片整体写入, 同一分片可能被处理多次, 因此只用于可以重复执行的操作 (输出都是原子替换).
+文件路径在所有机器上必须相同 (共享文件系统挂载在同一位置).
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+from AtlasEXCore import iter_batch, process_batch_file, check_file, export_file, AffinityPool
+from AtlasEXWriter import atomic_write
+
+QUEUE_VERSION = 1
+QUEUE_NAME = "queue.json"
+
+# 每个分片的文件数, 租约时长 (秒), 同一分片的最大领取次数
+DEFAULT_SHARD_SIZE = 32
+DEFAULT_LEASE = 60.0
+MAX_ATTEMPTS = 3
+
+# 可以放入队列的任务 - 参数必须能用 JSON 表示
+TASKS = {
+    'modify': process_batch_file,
+    'check': check_file,
+    'export': export_file,
+}
+
+def task_name(func):
+    """任务函数对应的队列任务名, 不支持时返回 None"""
+    for name, task in TASKS.items():
+        if task is func:
+            return name
+    return None
+
+def worker_id():
+    """工作者 ID - 主机名, 进程号和随机后缀"""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def _shard_name(index):
+    return f"{index:05d}"
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_json(path, data):
+    atomic_write(path, json.dumps(data, ensure_ascii=False, default=str))
+
+def _signature(task, args, files):
+    text = json.dumps([task, list(args), list(files)], ensure_ascii=False, default=str, sort_keys=True)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def create_queue(root, task, files, args=(), shard_size=DEFAULT_SHARD_SIZE, lease=DEFAULT_LEASE):
+    """在 root 下创建任务队列并返回其目录; 同样的任务, 参数和文件已有队列时直接返回 (继续上次的运行)
+
+    文件分为每 shard_size 个一片; 多个进程同时创建同一队列时写入的内容相同, 互不影响.
+    """
+    if task not in TASKS:
+        raise ValueError(f"不支持放入队列的任务: {task}")
+    files = [str(f) for f in files]
+    args = json.loads(json.dumps(list(args), default=str))
+    signature = _signature(task, args, files)
+    run_dir = Path(root).joinpath(signature)
+    if _read_json(run_dir.joinpath(QUEUE_NAME)) is not None:
+        return str(run_dir)
+    for name in ("shards", "claims", "results", "done", "workers"):
+        run_dir.joinpath(name).mkdir(parents=True, exist_ok=True)
+    shards = [files[i:i + shard_size] for i in range(0, len(files), shard_size)]
+    for index, shard in enumerate(shards):
+        _write_json(run_dir.joinpath("shards", _shard_name(index) + ".json"), shard)
+    _write_json(run_dir.joinpath(QUEUE_NAME), {
+        'version': QUEUE_VERSION, 'task': task, 'args': args, 'files': len(files), 'shards': len(shards),
+        'shard_size': shard_size, 'lease': lease, 'created': time.time(), 'signature': signature,
+    })
+    return str(run_dir)
+
+def list_queues(root):
+    """root 下所有已创建完成的队列目录, 按创建时间排序"""
+    queues = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return []
+    for entry in entries:
+        spec = _read_json(os.path.join(entry.path, QUEUE_NAME)) if entry.is_dir() else None
+        if spec is not None and spec.get('version') == QUEUE_VERSION:
+            queues.append((spec['created'], entry.path))
+    return [path for _, path in sorted(queues)]
+
+class _Queue:
+    """单个队列目录的读写 - 领取, 续期, 释放和发布结果"""
+
+    def __init__(self, run_dir, worker):
+        self.dir = Path(run_dir)
+        self.spec = _read_json(self.dir.joinpath(QUEUE_NAME))
+        if self.spec is None:
+            raise FileNotFoundError(f"不是任务队列: {run_dir}")
+        self.worker = worker
+        self.lease = float(self.spec['lease'])
+        self.heartbeat = self.dir.joinpath("workers", worker)
+
+    def path(self, kind, index):
+        suffix = ".lock" if kind == "claims" else ".json"
+        return self.dir.joinpath(kind, _shard_name(index) + suffix)
+
+    def now(self):
+        """共享文件系统的当前时间 - 更新心跳文件并读取其 mtime"""
+        with open(self.heartbeat, 'a'):
+            pass
+        os.utime(self.heartbeat)
+        return os.stat(self.heartbeat).st_mtime
+
+    def is_done(self, index):
+        return self.path("done", index).exists()
+
+    def pending(self):
+        return [i for i in range(self.spec['shards']) if not self.is_done(i)]
+
+    def files(self, index):
+        return _read_json(self.path("shards", index)) or []
+
+    def _expired(self, lock, now):
+        try:
+            return os.stat(lock).st_mtime + self.lease < now
+        except FileNotFoundError:
+            return True
+
+    def claim(self, index):
+        """尝试领取分片, 返回领取信息; 分片已被有效租约占用时返回 None
+
+        租约过期的锁先重命名为本工作者独有的名称再重新创建, 同一时刻只有一个工作者能接管.
+        """
+        lock = self.path("claims", index)
+        previous = None
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if not self._expired(lock, self.now()):
+                return None
+            stale = lock.with_name(f"{lock.name}.{self.worker}.stale")
+            try:
+                os.rename(lock, stale)
+            except FileNotFoundError:
+                return None
+            previous = _read_json(stale) or {}
+            if not self._expired(stale, self.now()):
+                # 重命名前锁已被他人接管并续期 - 放回原处
+                try:
+                    os.link(stale, lock)
+                except OSError:
+                    pass
+                os.remove(stale)
+                return None
+            os.remove(stale)
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                return None
+        info = {'worker': self.worker, 'host': socket.gethostname(), 'pid': os.getpid(),
+                'attempt': (previous or {}).get('attempt', 0) + 1, 'previous': (previous or {}).get('worker')}
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(info, f)
+        return info
+
+    def owns(self, index):
+        info = _read_json(self.path("claims", index))
+        return info is not None and info.get('worker') == self.worker
+
+    def renew(self, index):
+        """续期租约 - 锁已被他人接管时返回 False"""
+        if not self.owns(index):
+            return False
+        try:
+            os.utime(self.path("claims", index))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, index):
+        """释放自己持有的锁"""
+        if self.owns(index):
+            try:
+                os.remove(self.path("claims", index))
+            except FileNotFoundError:
+                pass
+
+    def publish(self, index, results, info):
+        """写入分片结果和完成标记, 然后释放锁"""
+        _write_json(self.path("results", index), results)
+        failed = sum(1 for r in results if not r.get('ok'))
+        _write_json(self.path("done", index), {'worker': self.worker, 'attempt': info['attempt'],
+                                               'finished': time.time(), 'files': len(results), 'failed': failed})
+        self.release(index)
+
+    def results(self, index):
+        return _read_json(self.path("results", index)) or []
+
+    def leave(self):
+        try:
+            os.remove(self.heartbeat)
+        except OSError:
+            pass
+
+class _Heartbeat(threading.Thread):
+    """后台续期当前分片的租约, 间隔为租约的四分之一; 锁被他人接管时设置 lost 并停止"""
+
+    def __init__(self, queue, index):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.index = index
+        self.stop = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.stop.wait(self.queue.lease / 4):
+            try:
+                if not self.queue.renew(self.index):
+                    self.lost = True
+                    return
+                self.queue.now()
+            except OSError:
+                pass
+
+def _clean(result):
+    """结果转换为 JSON 可以表示的值"""
+    return json.loads(json.dumps(result, ensure_ascii=False, default=str))
+
+def _process_shard(queue, index, info, max_workers, cancelled, pool):
+    """处理领取的分片, 逐个产出文件结果, 返回 (是否已发布, 已产出的文件)
+
+    全部完成后发布; 中途取消时释放锁而不发布; 租约被其他工作者接管时停止提交剩余文件, 不发布,
+    由接管者的结果为准.
+    """
+    files = queue.files(index)
+    if info['attempt'] > MAX_ATTEMPTS:
+        # 反复领取仍未完成 (工作者在处理时崩溃), 标记为失败, 不再重试
+        results = [{'file': f, 'ok': False, 'error': f"分片 {_shard_name(index)} 已领取 {MAX_ATTEMPTS} 次仍未完成"}
+                   for f in files]
+        queue.publish(index, results, info)
+        yield from results
+        return True, files
+    heartbeat = _Heartbeat(queue, index)
+    heartbeat.start()
+    results = []
+    try:
+        task = TASKS[queue.spec['task']]
+        stopped = lambda: cancelled() or heartbeat.lost
+        for result in iter_batch(task, files, tuple(queue.spec['args']), max_workers, stopped, pool):
+            result = _clean(result)
+            results.append(result)
+            yield result
+    finally:
+        heartbeat.stop.set()
+        heartbeat.join()
+        published = (len(results) == len(files) and not cancelled() and not heartbeat.lost
+                     and queue.owns(index))
+        if published:
+            queue.publish(index, results, info)
+        elif not heartbeat.lost:
+            queue.release(index)
+    return published, [r['file'] for r in results]
+
+def work_queue(run_dir, max_workers=None, cancelled=None, pool=None, worker=None, wait=True, collect=False,
+               poll=1.0):
+    """作为工作者处理队列, 直到所有分片完成 (wait 为 False 时没有可领取的分片即返回)
+
+    产出本工作者处理的每个文件的结果; collect 为 True 时也产出其他工作者完成的分片,
+    每个文件只产出一次, 用于发起运行的一方汇总整个运行的结果.
+    """
+    cancelled = cancelled or (lambda: False)
+    queue = _Queue(run_dir, worker or worker_id())
+    reported = set()
+    # 未发布的分片中本工作者已产出的文件 - 汇总时不再重复产出
+    partial = {}
+    try:
+        while not cancelled():
+            pending = queue.pending()
+            claimed = False
+            for index in pending:
+                if cancelled():
+                    break
+                info = queue.claim(index)
+                if info is None:
+                    continue
+                if queue.is_done(index):
+                    # 领取前其他工作者刚好完成
+                    queue.release(index)
+                    continue
+                claimed = True
+                published, produced = yield from _process_shard(queue, index, info, max_workers, cancelled, pool)
+                if published:
+                    reported.add(index)
+                    partial.pop(index, None)
+                else:
+                    partial.setdefault(index, set()).update(produced)
+                break
+            if collect:
+                for index in range(queue.spec['shards']):
+                    if index not in reported and queue.is_done(index):
+                        reported.add(index)
+                        seen = partial.pop(index, ())
+                        yield from (r for r in queue.results(index) if r['file'] not in seen)
+            if claimed:
+                continue
+            if not queue.pending() or not wait:
+                break
+            # 其余分片都被其他工作者占用 - 等待完成或租约过期
+            queue.now()
+            deadline = time.monotonic() + poll
+            while time.monotonic() < deadline and not cancelled():
+                time.sleep(min(0.1, poll))
+    finally:
+        queue.leave()
+
+def queue_batch(files, root, task, args=(), shard_size=DEFAULT_SHARD_SIZE, lease=DEFAULT_LEASE, max_workers=None,
+                cancelled=None, pool=None):
+    """通过共享目录中的队列运行批处理 - 创建 (或继续) 队列, 本进程同时作为工作者, 产出所有文件的结果
+
+    其他机器用 `AtlasEXCLI.py worker <root>` 加入即可分担分片; 中断后用同样的参数重新运行会继续未完成的分片.
+    """
+    run_dir = create_queue(root, task, files, args, shard_size, lease)
+    own_pool = None
+    if pool is None and (max_workers or 0) != 1:
+        # 各分片共用一个常驻进程池, 避免每个分片重新启动进程
+        pool = own_pool = AffinityPool(max_workers)
+    try:
+        yield from work_queue(run_dir, max_workers, cancelled, pool, collect=True)
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown()
+
+def serve(root, max_workers=None, cancelled=None, wait=True, poll=1.0):
+    """处理 root 下所有未完成的队列 (按创建时间), 产出本工作者处理的文件结果"""
+    cancelled = cancelled or (lambda: False)
+    worker = worker_id()
+    pool = AffinityPool(max_workers) if (max_workers or 0) != 1 else None
+    try:
+        for run_dir in list_queues(root):
+            if cancelled():
+                break
+            yield from work_queue(run_dir, max_workers, cancelled, pool, worker, wait, poll=poll)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def queue_status(run_dir):
+    """队列状态 - {task, files, shards, done, running, expired, pending, failed, retried, workers}
+
+    retried 为接管过的分片数 (领取次数大于 1), workers 为心跳仍在租约内的其他工作者数.
+    """
+    queue = _Queue(run_dir, worker_id())
+    try:
+        now = queue.now()
+        status = {'dir': str(run_dir), 'task': queue.spec['task'], 'files': queue.spec['files'],
+                  'shards': queue.spec['shards'], 'done': 0, 'running': 0, 'expired': 0, 'pending': 0, 'failed': 0,
+                  'retried': 0}
+        for index in range(queue.spec['shards']):
+            marker = _read_json(queue.path("done", index))
+            if marker is not None:
+                status['done'] += 1
+                status['failed'] += marker.get('failed', 0)
+                status['retried'] += marker.get('attempt', 1) > 1
+            elif queue.path("claims", index).exists():
+                status['expired' if queue._expired(queue.path("claims", index), now) else 'running'] += 1
+            else:
+                status['pending'] += 1
+        workers = [e for e in os.scandir(queue.dir.joinpath("workers")) if e.name != queue.worker]
+        status['workers'] = sum(1 for e in workers if e.stat().st_mtime + queue.lease >= now)
+        return status
+    finally:
+        queue.leave()
+
+def queue_results(run_dir):
+    """已完成分片的所有文件结果"""
+    queue = _Queue(run_dir, worker_id())
+    for index in range(queue.spec['shards']):
+        if queue.is_done(index):
+            yield from queue.results(index)
+
+def _test_worker(root, crash):
+    """自测中的工作者进程 - crash 时领取一个分片后不释放并立即退出, 模拟崩溃"""
+    if crash:
+        for run_dir in list_queues(root):
+            queue = _Queue(run_dir, worker_id())
+            for index in queue.pending():
+                if queue.claim(index) is not None:
+                    os._exit(1)
+        os._exit(0)
+    for _ in serve(root, max_workers=1, poll=0.2):
+        pass
+
+def self_test(workers=3, atlases=40, shard_size=4, lease=2.0):
+    """在临时目录中用多个进程完整运行队列协议: 创建, 领取, 崩溃后租约过期接管, 发布结果和汇总
+
+    每个文件恰好有一个结果, 所有输出都已写入时返回 True.
+    """
+    import tempfile
+    import multiprocessing
+    from AtlasEXBench import generate_tree
+    with tempfile.TemporaryDirectory(prefix="atlasex_queue_") as temp:
+        tree = generate_tree(os.path.join(temp, "tree"), {'atlases': atlases, 'pages': 1, 'page_size': 128,
+                                                           'frames': 8})
+        files = [str(Path(tree['root']).joinpath(a)) for a in tree['atlases']]
+        root = os.path.join(temp, "queue")
+        output_root = os.path.join(temp, "out")
+        args = ('convert', {'version': False}, False, "_modified", None, output_root, str(Path(tree['root'])), False)
+        run_dir = create_queue(root, 'modify', files, args, shard_size, lease)
+        context = multiprocessing.get_context('spawn')
+        # 先让一个工作者领取分片后崩溃, 其余工作者需要等租约过期后接管
+        crashed = context.Process(target=_test_worker, args=(root, True))
+        crashed.start()
+        crashed.join()
+        processes = [context.Process(target=_test_worker, args=(root, False)) for _ in range(workers - 1)]
+        for process in processes:
+            process.start()
+        # 本进程作为最后一个工作者并汇总结果
+        start = time.monotonic()
+        results = list(queue_batch(files, root, 'modify', args, shard_size, lease, max_workers=1))
+        for process in processes:
+            process.join()
+        status = queue_status(run_dir)
+        seen = [r['file'] for r in results]
+        outputs = [r['output'] for r in results if r.get('ok')]
+        ok = (sorted(seen) == sorted(files) and len(outputs) == len(files)
+              and all(os.path.isfile(p) for p in outputs) and status['done'] == status['shards']
+              and status['retried'] >= 1)
+        print(f"{len(files)} 个文件, {status['shards']} 个分片, {workers} 个工作者 (1 个崩溃), "
+              f"耗时 {time.monotonic() - start:.1f}s: {'通过' if ok else '失败'}")
+        print(json.dumps(status, ensure_ascii=False))
+        return ok
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(0 if self_test() else 1)
@@ -0,0 +1,147 @@
+import shutil
+from pathlib import Path
+from PIL import Image
+from AtlasEXCore import iter_batch
+from AtlasEXCache import load_atlas, invalidate
+from AtlasEXWriter import atlas_text, atomic_write, atomic_file, source_root
+from AtlasEXZip import open_image, source_dir, exists
+
+# 可选的重采样滤镜
+FILTERS = {
+    'Lanczos': Image.Resampling.LANCZOS,
+    'Bicubic': Image.Resampling.BICUBIC,
+    'Hamming': Image.Resampling.HAMMING,
+    'Bilinear': Image.Resampling.BILINEAR,
+    'Box': Image.Resampling.BOX,
+    'Nearest': Image.Resampling.NEAREST,
+}
+
+def target_size(size, scale):
+    """缩放后的纹理页尺寸, 至少 1 像素"""
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
+def resample_image(image, scale, filter_name='Lanczos', premultiplied=False):
+    """重采样纹理页 - 在预乘空间中插值, 避免透明边缘出现暗边
+
+    premultiplied 为 True 时图像已经是预乘数据 (Atlas 的 pma: true), 直接按通道插值.
+    """
+    resample = FILTERS[filter_name]
+    size = target_size(image.size, scale)
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    if premultiplied:
+        # 按 RGBa 解释原始数据, 不做预乘转换
+        data = Image.frombytes('RGBa', image.size, image.tobytes())
+        resized = data.resize(size, resample)
+        return Image.frombytes('RGBA', size, resized.tobytes())
+    return image.convert('RGBa').resize(size, resample).convert('RGBA')
+
+def resample_page(job, scale, filter_name='Lanczos'):
+    """重采样单个纹理页 - job 为 (源文件, 目标文件, 是否预乘)"""
+    src, dst, premultiplied = job
+    result = {'file': src, 'ok': False, 'output': dst, 'error': None}
+    try:
+        with open_image(src) as img:
+            img.load()
+            resized = resample_image(img, scale, filter_name, premultiplied)
+        # 先写入临时文件, 中断时不会留下不完整的纹理
+        with atomic_file(dst) as f:
+            resized.save(f, format='PNG')
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _plan(files, output_root, root):
+    """解析 Atlas, 确定每个纹理页的输出位置; 共享的纹理页只重采样一次"""
+    atlases = []
+    pages = {}
+    for file_path in files:
+        entry = {'file': file_path, 'atlas': None, 'output': None, 'pages': [], 'error': None}
+        atlases.append(entry)
+        try:
+            atlas = load_atlas(file_path)
+            rel = source_dir(file_path).relative_to(root)
+            out_dir = Path(output_root).joinpath(rel)
+            entry['atlas'] = atlas
+            entry['output'] = str(out_dir.joinpath(Path(file_path).name))
+            for tex in atlas.atlas:
+                src = atlas.path.joinpath(tex.png).resolve()
+                dst = out_dir.joinpath(tex.png).resolve()
+                if not exists(src):
+                    raise FileNotFoundError(f"缺失纹理: {src.as_posix()}")
+                if src == dst:
+                    raise ValueError("输出目录不能与源目录相同")
+                page = pages.setdefault(str(src), {'premultiplied': tex.pma, 'outputs': [], 'atlases': {}})
+                if str(dst) not in page['outputs']:
+                    page['outputs'].append(str(dst))
+                page['atlases'][id(entry)] = entry
+                entry['pages'].append(str(src))
+        except Exception as e:
+            entry['error'] = str(e)
+    return atlases, pages
+
+def _finish_atlas(entry, failed):
+    """所有纹理页完成后, 按新纹理的实际尺寸更新并写入 Atlas"""
+    result = {'file': entry['file'], 'ok': False, 'output': entry['output'], 'error': entry['error'],
+              'pages': len(entry['pages'])}
+    if result['error'] is None:
+        errors = [failed[p] for p in dict.fromkeys(entry['pages']) if p in failed]
+        if errors:
+            result['error'] = "; ".join(errors)
+    if result['error'] is None:
+        try:
+            atlas = entry['atlas']
+            out_dir = Path(entry['output']).parent
+            out_dir.mkdir(parents=True, exist_ok=True)
+            # ReScale 读取输出纹理页的实际尺寸, 同步帧坐标和 scale
+            atlas.ReScale(path=out_dir)
+            atomic_write(entry['output'], atlas_text(atlas))
+            invalidate(entry['output'])
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+    return result
+
+def resample_atlases(files, output_root, scale=0.5, filter_name='Lanczos', max_workers=None, cancelled=None,
+                     pool=None):
+    """重采样 Atlas 引用的所有纹理页并写入对应的 Atlas, 按 Atlas 产出结果
+
+    纹理页在进程池中并行处理; 输出按源目录结构镜像到 output_root.
+    """
+    files = list(files)
+    cancelled = cancelled or (lambda: False)
+    if not files:
+        return
+    root = source_root(files)
+    atlases, pages = _plan(files, output_root, root)
+
+    # 解析失败的 Atlas 立即产出, 其余的等待各自的纹理页
+    remaining = {}
+    for entry in atlases:
+        if entry['error'] is not None:
+            yield _finish_atlas(entry, {})
+        else:
+            remaining[id(entry)] = len(set(entry['pages']))
+            if not entry['pages']:
+                yield _finish_atlas(entry, {})
+
+    jobs = [(src, page['outputs'][0], page['premultiplied']) for src, page in pages.items()]
+    failed = {}
+    for result in iter_batch(resample_page, jobs, (scale, filter_name), max_workers, cancelled, pool):
+        src = result['file'] if isinstance(result['file'], str) else result['file'][0]
+        page = pages[src]
+        if result['ok']:
+            # 同一纹理页在多个输出位置被引用时直接复制
+            for extra in page['outputs'][1:]:
+                try:
+                    Path(extra).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(page['outputs'][0], extra)
+                except OSError as e:
+                    failed[src] = f"{Path(src).name}: {e}"
+        else:
+            failed[src] = f"{Path(src).name}: {result['error']}"
+        for entry in page['atlases'].values():
+            remaining[id(entry)] -= 1
+            if remaining[id(entry)] == 0:
+                yield _finish_atlas(entry, failed)
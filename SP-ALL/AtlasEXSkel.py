@@ -0,0 +1,1130 @@
+import re
+import json
+import base64
+import struct
+import numpy as np
+from pathlib import Path
+from AtlasEXWriter import atomic_write, sibling_output
+from AtlasEXZip import is_member, read_bytes, source_dir
+
+# 支持的 Spine 版本 (主版本, 次版本); 4.1 的二进制布局没有参考实现, 不支持
+SUPPORTED = ((3, 4), (3, 5), (3, 6), (3, 7), (3, 8), (4, 0), (4, 2))
+
+# 枚举值 -> JSON 名称
+BLEND_MODES = ('normal', 'additive', 'multiply', 'screen')
+TRANSFORM_MODES = ('normal', 'onlyTranslation', 'noRotationOrReflection', 'noScale', 'noScaleOrReflection')
+POSITION_MODES = ('fixed', 'percent')
+SPACING_MODES = ('length', 'fixed', 'percent', 'proportional')
+ROTATE_MODES = ('tangent', 'chain', 'chainScale')
+ATTACHMENT_TYPES = ('region', 'boundingbox', 'mesh', 'linkedmesh', 'path', 'point', 'clipping')
+SEQUENCE_MODES = ('hold', 'once', 'loop', 'pingpong', 'onceReverse', 'loopReverse', 'pingpongReverse')
+
+# 动画时间轴类型
+BONE_TIMELINES_3 = ('rotate', 'translate', 'scale', 'shear')
+BONE_TIMELINES_4 = ('rotate', 'translate', 'translatex', 'translatey', 'scale', 'scalex', 'scaley',
+                    'shear', 'shearx', 'sheary', 'inherit')
+PHYSICS_TIMELINES = ('inertia', 'strength', 'damping', None, 'mass', 'wind', 'gravity', 'mix', 'reset')
+
+# 文件扩展名 (按优先顺序去掉) 和批量转换时收集的文件
+SKEL_SUFFIXES = ('.skel.bytes', '.skel', '.bytes')
+SKEL_PATTERNS = ('*.skel', '*.skel.bytes')
+
+_VERSION = re.compile(r'^(\d+)\.(\d+)')
+_F32 = struct.Struct('>f')
+_I32 = struct.Struct('>i')
+_I16 = struct.Struct('>h')
+
+# float32 -> 最短十进制表示的缓存, 动画数据中大量重复的数值只格式化一次
+_FLOATS = {}
+_FLOATS_MAX = 1 << 16
+
+def _shortest(raw):
+    value = _FLOATS.get(raw)
+    if value is None:
+        if len(_FLOATS) >= _FLOATS_MAX:
+            _FLOATS.clear()
+        value = _FLOATS[raw] = float(str(np.float32(_F32.unpack(raw)[0])))
+    return value
+
+def _color(value):
+    """RGBA8888 整数 -> rrggbbaa"""
+    return f"{value & 0xffffffff:08x}"
+
+class _Input:
+    """大端二进制读取器 - 与 Spine 运行时的 SkeletonInput 对应"""
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+        self.strings = []
+
+    def byte(self):
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def sbyte(self):
+        value = self.byte()
+        return value - 256 if value > 127 else value
+
+    def bool(self):
+        return self.byte() != 0
+
+    def short(self):
+        value = _I16.unpack_from(self.data, self.pos)[0]
+        self.pos += 2
+        return value
+
+    def int(self):
+        value = _I32.unpack_from(self.data, self.pos)[0]
+        self.pos += 4
+        return value
+
+    def varint(self, positive=True):
+        result = 0
+        shift = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80 or shift >= 35:
+                break
+        result &= 0xffffffff
+        if not positive:
+            return (result >> 1) ^ -(result & 1)
+        return result - (1 << 32) if result >= 1 << 31 else result
+
+    def float(self):
+        raw = self.data[self.pos:self.pos + 4]
+        if len(raw) < 4:
+            raise ValueError("文件意外结束")
+        self.pos += 4
+        return _shortest(bytes(raw))
+
+    def floats(self, count):
+        """连续读取 count 个 float32, 按最短表示转换"""
+        if count <= 0:
+            return []
+        if self.pos + count * 4 > len(self.data):
+            raise ValueError("文件意外结束")
+        values = np.frombuffer(self.data, '>f4', count, self.pos)
+        self.pos += count * 4
+        return values.astype(str).astype(float).tolist()
+
+    def string(self):
+        count = self.varint()
+        if count == 0:
+            return None
+        end = self.pos + count - 1
+        if end > len(self.data):
+            raise ValueError("文件意外结束")
+        value = bytes(self.data[self.pos:end]).decode('utf-8')
+        self.pos = end
+        return value
+
+    def ref(self):
+        """字符串表引用 (3.8+) - 0 为 null"""
+        index = self.varint()
+        return None if index == 0 else self.strings[index - 1]
+
+def _version_at(data, pos):
+    """读取 pos 处的版本字符串, 不是版本号时返回 None"""
+    try:
+        text = _Input(data, pos).string()
+    except (IndexError, ValueError, UnicodeDecodeError):
+        return None
+    if text and _VERSION.match(text):
+        return text
+    return None
+
+def detect_version(data):
+    """从文件头识别 Spine 版本, 返回 (版本字符串, (主版本, 次版本))
+
+    4.x 以 8 字节哈希开头, 版本字符串在偏移 8; 3.x 以哈希字符串开头.
+    """
+    text = _version_at(data, 8)
+    if text is None or int(_VERSION.match(text).group(1)) < 4:
+        try:
+            inp = _Input(data)
+            inp.string()
+            text = _version_at(data, inp.pos)
+        except (IndexError, ValueError, UnicodeDecodeError):
+            text = None
+        if text is not None and int(_VERSION.match(text).group(1)) >= 4:
+            text = None
+    if text is None:
+        raise ValueError("无法识别的 .skel 文件: 文件头中没有版本号")
+    match = _VERSION.match(text)
+    version = int(match.group(1)), int(match.group(2))
+    if version not in SUPPORTED:
+        raise ValueError(f"不支持的 Spine 版本: {text}")
+    return text, version
+
+class SkelReader:
+    """二进制骨骼数据 -> JSON 结构 (dict)
+
+    按版本区分读取布局; 输出遵循对应版本编辑器导出 JSON 的键名,
+    默认值按 SkeletonJson 的规则省略.
+    """
+
+    def __init__(self, data):
+        self.text, self.v = detect_version(data)
+        self.inp = _Input(data)
+        self.nonessential = False
+        self.bones = []
+        self.slots = []
+        self.ik = []
+        self.transform = []
+        self.path = []
+        self.physics = []
+        self.skins = []
+        self.events = []
+        self.linked = []
+
+    # ---------- 头部与骨架 ----------
+
+    def read(self):
+        inp = self.inp
+        v = self.v
+        skeleton = {}
+        if v >= (4, 0):
+            raw = bytes(inp.data[:8])
+            inp.pos = 8
+            if any(raw):
+                skeleton['hash'] = base64.b64encode(raw).decode('ascii').rstrip('=')
+        else:
+            skeleton['hash'] = inp.string()
+        skeleton['spine'] = inp.string()
+        if v >= (3, 8):
+            skeleton['x'] = inp.float()
+            skeleton['y'] = inp.float()
+        skeleton['width'] = inp.float()
+        skeleton['height'] = inp.float()
+        if v >= (4, 2):
+            skeleton['referenceScale'] = inp.float()
+        self.nonessential = inp.bool()
+        if self.nonessential:
+            if v >= (3, 5):
+                skeleton['fps'] = inp.float()
+            images = inp.string()
+            if images is not None:
+                skeleton['images'] = images
+            if v >= (3, 7):
+                audio = inp.string()
+                if audio is not None:
+                    skeleton['audio'] = audio
+        if skeleton.get('hash') is None:
+            skeleton.pop('hash', None)
+        if v >= (3, 8):
+            inp.strings = [inp.string() for _ in range(inp.varint())]
+
+        result = {'skeleton': skeleton}
+        result['bones'] = [self._bone(i) for i in range(inp.varint())]
+        result['slots'] = [self._slot() for _ in range(inp.varint())]
+        result['ik'] = [self._ik() for _ in range(inp.varint())]
+        result['transform'] = [self._transform() for _ in range(inp.varint())]
+        result['path'] = [self._path() for _ in range(inp.varint())]
+        if v >= (4, 2):
+            result['physics'] = [self._physics() for _ in range(inp.varint())]
+        result['skins'] = self._skins()
+        events = {}
+        for _ in range(inp.varint()):
+            name, event = self._event_data()
+            events[name] = event
+        if events:
+            result['events'] = events
+        animations = {}
+        for _ in range(inp.varint()):
+            name = inp.string()
+            animations[name] = self._animation()
+        if animations:
+            result['animations'] = animations
+        for key in ('ik', 'transform', 'path', 'physics'):
+            if not result.get(key, True):
+                del result[key]
+        return result
+
+    def _bone(self, index):
+        inp = self.inp
+        v = self.v
+        bone = {'name': inp.string()}
+        self.bones.append(bone['name'])
+        if index > 0:
+            bone['parent'] = self.bones[inp.varint()]
+        keys = ('rotation', 'x', 'y', 'scaleX', 'scaleY', 'shearX', 'shearY', 'length')
+        for key, value in zip(keys, inp.floats(8)):
+            if value != (1 if key.startswith('scale') else 0):
+                bone[key] = value
+        if v < (3, 5):
+            if not inp.bool():
+                bone['inheritRotation'] = False
+            if not inp.bool():
+                bone['inheritScale'] = False
+        else:
+            mode = TRANSFORM_MODES[inp.varint()]
+            if mode != 'normal':
+                bone['inherit' if v >= (4, 2) else 'transform'] = mode
+        if v >= (3, 8) and inp.bool():
+            bone['skin'] = True
+        if self.nonessential:
+            bone['color'] = _color(inp.int())
+            if v >= (4, 2):
+                icon = inp.string()
+                if icon is not None:
+                    bone['icon'] = icon
+                if not inp.bool():
+                    bone['visible'] = False
+        return bone
+
+    def _slot(self):
+        inp = self.inp
+        v = self.v
+        slot = {'name': inp.string()}
+        self.slots.append(slot['name'])
+        slot['bone'] = self.bones[inp.varint()]
+        color = _color(inp.int())
+        if color != 'ffffffff':
+            slot['color'] = color
+        if v >= (3, 6):
+            dark = inp.int()
+            if dark != -1:
+                slot['dark'] = f"{dark & 0xffffff:06x}"
+        attachment = inp.ref() if v >= (3, 8) else inp.string()
+        if attachment is not None:
+            slot['attachment'] = attachment
+        blend = BLEND_MODES[inp.varint()]
+        if blend != 'normal':
+            slot['blend'] = blend
+        if v >= (4, 2) and self.nonessential and not inp.bool():
+            slot['visible'] = False
+        return slot
+
+    def _names(self, names):
+        """索引列表 -> 名称列表"""
+        inp = self.inp
+        return [names[inp.varint()] for _ in range(inp.varint())]
+
+    def _head(self, names, skin=True):
+        """约束的公共头部: 名称, 顺序, 是否属于皮肤"""
+        inp = self.inp
+        data = {'name': inp.string()}
+        names.append(data['name'])
+        if self.v >= (3, 5):
+            data['order'] = inp.varint()
+        if skin and self.v >= (3, 8) and inp.bool():
+            data['skin'] = True
+        return data
+
+    def _ik(self):
+        inp = self.inp
+        v = self.v
+        ik = self._head(self.ik, v < (4, 2))
+        ik['bones'] = self._names(self.bones)
+        ik['target'] = self.bones[inp.varint()]
+        if v >= (4, 2):
+            flags = inp.byte()
+            if flags & 1:
+                ik['skin'] = True
+            ik['mix'] = (inp.float() if flags & 64 else 1) if flags & 32 else 0
+            ik['softness'] = inp.float() if flags & 128 else 0
+            ik['bendPositive'] = bool(flags & 2)
+            ik['compress'] = bool(flags & 4)
+            ik['stretch'] = bool(flags & 8)
+            ik['uniform'] = bool(flags & 16)
+            return ik
+        ik['mix'] = inp.float()
+        if v >= (3, 8):
+            ik['softness'] = inp.float()
+        ik['bendPositive'] = inp.sbyte() > 0
+        if v >= (3, 7):
+            ik['compress'] = inp.bool()
+            ik['stretch'] = inp.bool()
+            ik['uniform'] = inp.bool()
+        return ik
+
+    def _transform(self):
+        inp = self.inp
+        v = self.v
+        data = self._head(self.transform, v < (4, 2))
+        data['bones'] = self._names(self.bones)
+        data['target'] = self.bones[inp.varint()]
+        offsets = ('rotation', 'x', 'y', 'scaleX', 'scaleY', 'shearY')
+        if v >= (4, 2):
+            flags = inp.byte()
+            if flags & 1:
+                data['skin'] = True
+            data['local'] = bool(flags & 2)
+            data['relative'] = bool(flags & 4)
+            # 低 5 位之后依次是偏移量, 接着第二个标志字节中的剪切偏移和混合值
+            for key, bit in zip(offsets[:5], (8, 16, 32, 64, 128)):
+                data[key] = inp.float() if flags & bit else 0
+            flags = inp.byte()
+            data['shearY'] = inp.float() if flags & 1 else 0
+            for key, bit in zip(('mixRotate', 'mixX', 'mixY', 'mixScaleX', 'mixScaleY', 'mixShearY'),
+                                (2, 4, 8, 16, 32, 64)):
+                data[key] = inp.float() if flags & bit else 0
+            return data
+        if v >= (3, 6):
+            data['local'] = inp.bool()
+            data['relative'] = inp.bool()
+        data.update(zip(offsets, inp.floats(6)))
+        if v >= (4, 0):
+            mixes = ('mixRotate', 'mixX', 'mixY', 'mixScaleX', 'mixScaleY', 'mixShearY')
+        else:
+            mixes = ('rotateMix', 'translateMix', 'scaleMix', 'shearMix')
+        data.update(zip(mixes, inp.floats(len(mixes))))
+        return data
+
+    def _path(self):
+        inp = self.inp
+        v = self.v
+        data = self._head(self.path)
+        data['bones'] = self._names(self.bones)
+        data['target'] = self.slots[inp.varint()]
+        if v >= (4, 2):
+            flags = inp.byte()
+            data['positionMode'] = POSITION_MODES[flags & 1]
+            data['spacingMode'] = SPACING_MODES[(flags >> 1) & 3]
+            data['rotateMode'] = ROTATE_MODES[(flags >> 3) & 3]
+            data['rotation'] = inp.float() if flags & 128 else 0
+        else:
+            data['positionMode'] = POSITION_MODES[inp.varint()]
+            data['spacingMode'] = SPACING_MODES[inp.varint()]
+            data['rotateMode'] = ROTATE_MODES[inp.varint()]
+            data['rotation'] = inp.float()
+        data['position'] = inp.float()
+        data['spacing'] = inp.float()
+        if v >= (4, 0):
+            data.update(zip(('mixRotate', 'mixX', 'mixY'), inp.floats(3)))
+        else:
+            data.update(zip(('rotateMix', 'translateMix'), inp.floats(2)))
+        return data
+
+    def _physics(self):
+        inp = self.inp
+        data = self._head(self.physics, False)
+        data['bone'] = self.bones[inp.varint()]
+        flags = inp.byte()
+        if flags & 1:
+            data['skin'] = True
+        for key, bit in (('x', 2), ('y', 4), ('rotate', 8), ('scaleX', 16), ('shearX', 32)):
+            if flags & bit:
+                data[key] = inp.float()
+        data['limit'] = inp.float() if flags & 64 else 5000
+        data['fps'] = inp.byte()
+        data['inertia'] = inp.float()
+        data['strength'] = inp.float()
+        data['damping'] = inp.float()
+        mass = inp.float() if flags & 128 else 1
+        data['mass'] = float(str(np.float32(1 / mass))) if mass else 0
+        data['wind'] = inp.float()
+        data['gravity'] = inp.float()
+        flags = inp.byte()
+        for key, bit in (('inertiaGlobal', 1), ('strengthGlobal', 2), ('dampingGlobal', 4), ('massGlobal', 8),
+                         ('windGlobal', 16), ('gravityGlobal', 32), ('mixGlobal', 64)):
+            if flags & bit:
+                data[key] = True
+        data['mix'] = inp.float() if flags & 128 else 1
+        return data
+
+    # ---------- 皮肤与附件 ----------
+
+    def _skins(self):
+        inp = self.inp
+        v = self.v
+        skins = []
+        default = self._skin_attachments()
+        if default is not None:
+            skins.append({'name': 'default', 'attachments': default})
+        for _ in range(inp.varint()):
+            if v < (3, 8):
+                name = inp.string()
+                skins.append({'name': name, 'attachments': self._skin_attachments() or {}})
+                continue
+            skin = {'name': inp.string() if v >= (4, 2) else inp.ref()}
+            if v >= (4, 2) and self.nonessential:
+                skin['color'] = _color(inp.int())
+            lists = [('bones', self.bones), ('ik', self.ik), ('transform', self.transform), ('path', self.path)]
+            if v >= (4, 2):
+                lists.append(('physics', self.physics))
+            for key, names in lists:
+                values = self._names(names)
+                if values:
+                    skin[key] = values
+            skin['attachments'] = self._skin_attachments(True) or {}
+            skins.append(skin)
+        self.skins = [skin['name'] for skin in skins]
+        # 4.2 的链接网格按索引引用皮肤, 所有皮肤读完后再换成名称
+        for attachment, index in self.linked:
+            attachment['skin'] = self.skins[index]
+        if v >= (3, 8):
+            return skins
+        return {skin['name']: skin['attachments'] for skin in skins}
+
+    def _skin_attachments(self, named=False):
+        """皮肤中的附件 {槽位: {附件名: 附件}}; 默认皮肤没有槽位时返回 None"""
+        inp = self.inp
+        count = inp.varint()
+        if count == 0 and not named:
+            return None
+        slots = {}
+        for _ in range(count):
+            slot = slots.setdefault(self.slots[inp.varint()], {})
+            for _ in range(inp.varint()):
+                key = inp.ref() if self.v >= (3, 8) else inp.string()
+                slot[key] = self._attachment(key)
+        return slots
+
+    def _vertices(self, count, weighted):
+        """顶点数据 - 加权顶点按 JSON 格式展开为 [骨骼数, 骨骼, x, y, 权重, ...]"""
+        inp = self.inp
+        if not weighted:
+            return inp.floats(count * 2)
+        values = []
+        for _ in range(count):
+            bones = inp.varint()
+            values.append(bones)
+            for _ in range(bones):
+                values.append(inp.varint())
+                values.extend(inp.floats(3))
+        return values
+
+    def _shorts(self, count):
+        inp = self.inp
+        if self.v >= (4, 2):
+            return [inp.varint() for _ in range(count)]
+        return [inp.short() for _ in range(count)]
+
+    def _attachment(self, key):
+        if self.v >= (4, 2):
+            return self._attachment_42(key)
+        inp = self.inp
+        v = self.v
+        ref = inp.ref if v >= (3, 8) else inp.string
+        name = ref() or key
+        kind = ATTACHMENT_TYPES[inp.byte()]
+        attachment = {} if kind == 'region' else {'type': kind}
+        if name != key:
+            attachment['name'] = name
+        if kind == 'region':
+            self._path_name(attachment, ref(), name)
+            rotation, x, y, sx, sy, w, h = inp.floats(7)
+            self._transform_values(attachment, x, y, sx, sy, rotation)
+            attachment['width'] = w
+            attachment['height'] = h
+            self._color(attachment, inp.int())
+        elif kind == 'boundingbox':
+            count = inp.varint()
+            attachment['vertexCount'] = count
+            attachment['vertices'] = self._vertices(count, inp.bool())
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        elif kind == 'mesh':
+            self._path_name(attachment, ref(), name)
+            self._color(attachment, inp.int())
+            count = inp.varint()
+            attachment['uvs'] = inp.floats(count * 2)
+            attachment['triangles'] = self._shorts(inp.varint())
+            attachment['vertices'] = self._vertices(count, inp.bool())
+            attachment['hull'] = inp.varint()
+            if self.nonessential:
+                attachment['edges'] = self._shorts(inp.varint())
+                attachment['width'] = inp.float()
+                attachment['height'] = inp.float()
+        elif kind == 'linkedmesh':
+            self._path_name(attachment, ref(), name)
+            self._color(attachment, inp.int())
+            skin = ref()
+            if skin is not None:
+                attachment['skin'] = skin
+            attachment['parent'] = ref()
+            if not inp.bool():
+                attachment['deform'] = False
+            if self.nonessential:
+                attachment['width'] = inp.float()
+                attachment['height'] = inp.float()
+        elif kind == 'path':
+            attachment['closed'] = inp.bool()
+            attachment['constantSpeed'] = inp.bool()
+            count = inp.varint()
+            attachment['vertexCount'] = count
+            attachment['vertices'] = self._vertices(count, inp.bool())
+            attachment['lengths'] = inp.floats(count // 3)
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        elif kind == 'point':
+            rotation, x, y = inp.floats(3)
+            self._transform_values(attachment, x, y, 1, 1, rotation)
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        else:
+            attachment['end'] = self.slots[inp.varint()]
+            count = inp.varint()
+            attachment['vertexCount'] = count
+            attachment['vertices'] = self._vertices(count, inp.bool())
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        return attachment
+
+    def _attachment_42(self, key):
+        """4.2 附件 - 标志字节决定哪些字段存在"""
+        inp = self.inp
+        flags = inp.byte()
+        name = inp.ref() if flags & 8 else key
+        kind = ATTACHMENT_TYPES[flags & 7]
+        attachment = {} if kind == 'region' else {'type': kind}
+        if name != key:
+            attachment['name'] = name
+        if kind in ('region', 'mesh', 'linkedmesh'):
+            self._path_name(attachment, inp.ref() if flags & 16 else None, name)
+            if flags & 32:
+                self._color(attachment, inp.int())
+            if flags & 64:
+                count, start, digits, setup = (inp.varint() for _ in range(4))
+                attachment['sequence'] = {'count': count, 'start': start, 'digits': digits, 'setup': setup}
+        if kind == 'region':
+            rotation = inp.float() if flags & 128 else 0
+            x, y, sx, sy, w, h = inp.floats(6)
+            self._transform_values(attachment, x, y, sx, sy, rotation)
+            attachment['width'] = w
+            attachment['height'] = h
+        elif kind == 'boundingbox':
+            self._vertices_42(attachment, flags & 16)
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        elif kind == 'mesh':
+            hull = inp.varint()
+            count = self._vertices_42(attachment, flags & 128)
+            vertices = attachment.pop('vertices')
+            del attachment['vertexCount']
+            attachment['uvs'] = inp.floats(count * 2)
+            attachment['triangles'] = self._shorts((count * 2 - hull - 2) * 3)
+            attachment['vertices'] = vertices
+            attachment['hull'] = hull
+            if self.nonessential:
+                attachment['edges'] = self._shorts(inp.varint())
+                attachment['width'] = inp.float()
+                attachment['height'] = inp.float()
+        elif kind == 'linkedmesh':
+            if not flags & 128:
+                attachment['timelines'] = False
+            self.linked.append((attachment, inp.varint()))
+            attachment['parent'] = inp.ref()
+            if self.nonessential:
+                attachment['width'] = inp.float()
+                attachment['height'] = inp.float()
+        elif kind == 'path':
+            attachment['closed'] = bool(flags & 16)
+            attachment['constantSpeed'] = bool(flags & 32)
+            count = self._vertices_42(attachment, flags & 64)
+            attachment['lengths'] = inp.floats(count // 3)
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        elif kind == 'point':
+            rotation, x, y = inp.floats(3)
+            self._transform_values(attachment, x, y, 1, 1, rotation)
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        else:
+            attachment['end'] = self.slots[inp.varint()]
+            self._vertices_42(attachment, flags & 16)
+            if self.nonessential:
+                attachment['color'] = _color(inp.int())
+        return attachment
+
+    def _vertices_42(self, attachment, weighted):
+        count = self.inp.varint()
+        attachment['vertexCount'] = count
+        attachment['vertices'] = self._vertices(count, weighted)
+        return count
+
+    @staticmethod
+    def _path_name(attachment, path, name):
+        if path is not None and path != name:
+            attachment['path'] = path
+
+    @staticmethod
+    def _color(attachment, value):
+        color = _color(value)
+        if color != 'ffffffff':
+            attachment['color'] = color
+
+    @staticmethod
+    def _transform_values(attachment, x, y, sx, sy, rotation):
+        for key, value, default in (('x', x, 0), ('y', y, 0), ('scaleX', sx, 1), ('scaleY', sy, 1),
+                                    ('rotation', rotation, 0)):
+            if value != default:
+                attachment[key] = value
+
+    # ---------- 事件 ----------
+
+    def _event_data(self):
+        inp = self.inp
+        v = self.v
+        name = inp.ref() if (3, 8) <= v < (4, 2) else inp.string()
+        self.events.append([name, None])
+        event = {'int': inp.varint(False), 'float': inp.float()}
+        string = inp.string()
+        if string is not None:
+            event['string'] = string
+        if v >= (3, 7):
+            audio = inp.string()
+            if audio is not None:
+                self.events[-1][1] = audio
+                event['audio'] = audio
+                event['volume'] = inp.float()
+                event['balance'] = inp.float()
+        return name, event
+
+    def _events_timeline(self):
+        inp = self.inp
+        v = self.v
+        frames = []
+        for _ in range(inp.varint()):
+            time = inp.float()
+            name, audio = self.events[inp.varint()]
+            frame = {'time': time, 'name': name, 'int': inp.varint(False), 'float': inp.float()}
+            if v >= (4, 2):
+                string = inp.string()
+            else:
+                string = inp.string() if inp.bool() else None
+            if string is not None:
+                frame['string'] = string
+            if v >= (3, 7) and audio is not None:
+                frame['volume'] = inp.float()
+                frame['balance'] = inp.float()
+            frames.append(frame)
+        return frames
+
+    def _draw_order(self):
+        inp = self.inp
+        frames = []
+        for _ in range(inp.varint()):
+            frame = {'time': inp.float()}
+            offsets = []
+            for _ in range(inp.varint()):
+                offsets.append({'slot': self.slots[inp.varint()], 'offset': inp.varint()})
+            if offsets:
+                frame['offsets'] = offsets
+            frames.append(frame)
+        return frames
+
+    # ---------- 动画 ----------
+
+    def _animation(self):
+        if self.v >= (4, 0):
+            return self._animation_4()
+        return self._animation_3()
+
+    def _curve_3(self, frame):
+        kind = self.inp.byte()
+        if kind == 1:
+            frame['curve'] = 'stepped'
+        elif kind == 2:
+            curve = self.inp.floats(4)
+            if self.v >= (3, 8):
+                frame['curve'], frame['c2'], frame['c3'], frame['c4'] = curve
+            else:
+                frame['curve'] = curve
+
+    def _frames_3(self, count, values):
+        """3.x 关键帧 - 每帧 [时间, 值], 除最后一帧外跟随曲线"""
+        frames = []
+        for index in range(count):
+            frame = {'time': self.inp.float()}
+            frame.update(values())
+            if index < count - 1:
+                self._curve_3(frame)
+            frames.append(frame)
+        return frames
+
+    def _animation_3(self):
+        inp = self.inp
+        v = self.v
+        ref = inp.ref if v >= (3, 8) else inp.string
+        animation = {}
+
+        slots = {}
+        for _ in range(inp.varint()):
+            timelines = slots.setdefault(self.slots[inp.varint()], {})
+            for _ in range(inp.varint()):
+                kind = inp.byte()
+                count = inp.varint()
+                if kind == 0:
+                    timelines['attachment'] = [{'time': inp.float(), 'name': ref()} for _ in range(count)]
+                elif kind == 1:
+                    timelines['color'] = self._frames_3(count, lambda: {'color': _color(inp.int())})
+                else:
+                    timelines['twoColor'] = self._frames_3(count, lambda: {
+                        'light': _color(inp.int()), 'dark': f"{inp.int() & 0xffffff:06x}"})
+        if slots:
+            animation['slots'] = slots
+
+        bones = {}
+        for _ in range(inp.varint()):
+            timelines = bones.setdefault(self.bones[inp.varint()], {})
+            for _ in range(inp.varint()):
+                kind = BONE_TIMELINES_3[inp.byte()]
+                count = inp.varint()
+                if kind == 'rotate':
+                    timelines[kind] = self._frames_3(count, lambda: {'angle': inp.float()})
+                else:
+                    timelines[kind] = self._frames_3(count, lambda: dict(zip(('x', 'y'), inp.floats(2))))
+        if bones:
+            animation['bones'] = bones
+
+        def ik_values():
+            frame = {'mix': inp.float()}
+            if v >= (3, 8):
+                frame['softness'] = inp.float()
+            frame['bendPositive'] = inp.sbyte() > 0
+            if v >= (3, 7):
+                frame['compress'] = inp.bool()
+                frame['stretch'] = inp.bool()
+            return frame
+
+        ik = {}
+        for _ in range(inp.varint()):
+            name = self.ik[inp.varint()]
+            ik[name] = self._frames_3(inp.varint(), ik_values)
+        if ik:
+            animation['ik'] = ik
+
+        transform = {}
+        mixes = ('rotateMix', 'translateMix', 'scaleMix', 'shearMix')
+        for _ in range(inp.varint()):
+            name = self.transform[inp.varint()]
+            transform[name] = self._frames_3(inp.varint(), lambda: dict(zip(mixes, inp.floats(4))))
+        if transform:
+            animation['transform'] = transform
+
+        paths = {}
+        for _ in range(inp.varint()):
+            timelines = paths.setdefault(self.path[inp.varint()], {})
+            for _ in range(inp.varint()):
+                kind = inp.sbyte()
+                count = inp.varint()
+                if kind == 0:
+                    timelines['position'] = self._frames_3(count, lambda: {'position': inp.float()})
+                elif kind == 1:
+                    timelines['spacing'] = self._frames_3(count, lambda: {'spacing': inp.float()})
+                else:
+                    timelines['mix'] = self._frames_3(count, lambda: dict(zip(('rotateMix', 'translateMix'),
+                                                                              inp.floats(2))))
+        if paths:
+            animation['paths'] = paths
+
+        def deform_values():
+            frame = {}
+            end = inp.varint()
+            if end:
+                start = inp.varint()
+                if start:
+                    frame['offset'] = start
+                frame['vertices'] = inp.floats(end)
+            return frame
+
+        deform = {}
+        for _ in range(inp.varint()):
+            skin = deform.setdefault(self.skins[inp.varint()], {})
+            for _ in range(inp.varint()):
+                slot = skin.setdefault(self.slots[inp.varint()], {})
+                for _ in range(inp.varint()):
+                    name = ref()
+                    slot[name] = self._frames_3(inp.varint(), deform_values)
+        if deform:
+            animation['deform'] = deform
+
+        draw_order = self._draw_order()
+        if draw_order:
+            animation['drawOrder'] = draw_order
+        events = self._events_timeline()
+        if events:
+            animation['events'] = events
+        return animation
+
+    def _curve_4(self, frame, kind, channels):
+        if kind == 1:
+            frame['curve'] = 'stepped'
+        elif kind == 2:
+            frame['curve'] = self.inp.floats(channels * 4)
+
+    def _frames_4(self, count, values, channels):
+        """4.x 关键帧 - 曲线在下一帧的值之后读取, 属于前一帧"""
+        inp = self.inp
+        frames = []
+        frame = {'time': inp.float()}
+        frame.update(values())
+        while True:
+            frames.append(frame)
+            if len(frames) >= count:
+                break
+            following = {'time': inp.float()}
+            following.update(values())
+            self._curve_4(frame, inp.byte(), channels)
+            frame = following
+        return frames
+
+    def _timeline_1(self, count, key='value'):
+        self.inp.varint()
+        return self._frames_4(count, lambda: {key: self.inp.float()}, 1)
+
+    def _timeline_n(self, count, keys):
+        self.inp.varint()
+        return self._frames_4(count, lambda: dict(zip(keys, self.inp.floats(len(keys)))), len(keys))
+
+    def _rgb(self, alpha=True):
+        data = self.inp.data
+        pos = self.inp.pos
+        size = 4 if alpha else 3
+        self.inp.pos += size
+        return bytes(data[pos:pos + size]).hex()
+
+    def _animation_4(self):
+        inp = self.inp
+        v = self.v
+        animation = {}
+        inp.varint()  # 时间轴总数, JSON 中不需要
+
+        slots = {}
+        for _ in range(inp.varint()):
+            timelines = slots.setdefault(self.slots[inp.varint()], {})
+            for _ in range(inp.varint()):
+                kind = inp.byte()
+                count = inp.varint()
+                if kind == 0:
+                    timelines['attachment'] = [{'time': inp.float(), 'name': inp.ref()} for _ in range(count)]
+                    continue
+                inp.varint()
+                if kind == 1:
+                    timelines['rgba'] = self._frames_4(count, lambda: {'color': self._rgb()}, 4)
+                elif kind == 2:
+                    timelines['rgb'] = self._frames_4(count, lambda: {'color': self._rgb(False)}, 3)
+                elif kind == 3:
+                    timelines['rgba2'] = self._frames_4(
+                        count, lambda: {'light': self._rgb(), 'dark': self._rgb(False)}, 7)
+                elif kind == 4:
+                    timelines['rgb2'] = self._frames_4(
+                        count, lambda: {'light': self._rgb(False), 'dark': self._rgb(False)}, 6)
+                else:
+                    timelines['alpha'] = self._frames_4(
+                        count, lambda: {'value': float(str(np.float32(inp.byte() / 255)))}, 1)
+        if slots:
+            animation['slots'] = slots
+
+        bones = {}
+        for _ in range(inp.varint()):
+            timelines = bones.setdefault(self.bones[inp.varint()], {})
+            for _ in range(inp.varint()):
+                kind = BONE_TIMELINES_4[inp.byte()]
+                count = inp.varint()
+                if kind == 'inherit':
+                    timelines[kind] = [{'time': inp.float(), 'inherit': TRANSFORM_MODES[inp.byte()]}
+                                       for _ in range(count)]
+                elif kind in ('translate', 'scale', 'shear'):
+                    timelines[kind] = self._timeline_n(count, ('x', 'y'))
+                else:
+                    timelines[kind] = self._timeline_1(count)
+        if bones:
+            animation['bones'] = bones
+
+        ik = {}
+        for _ in range(inp.varint()):
+            name = self.ik[inp.varint()]
+            ik[name] = self._ik_timeline_42() if v >= (4, 2) else self._ik_timeline_40()
+        if ik:
+            animation['ik'] = ik
+
+        transform = {}
+        mixes = ('mixRotate', 'mixX', 'mixY', 'mixScaleX', 'mixScaleY', 'mixShearY')
+        for _ in range(inp.varint()):
+            name = self.transform[inp.varint()]
+            transform[name] = self._timeline_n(inp.varint(), mixes)
+        if transform:
+            animation['transform'] = transform
+
+        paths = {}
+        for _ in range(inp.varint()):
+            timelines = paths.setdefault(self.path[inp.varint()], {})
+            for _ in range(inp.varint()):
+                kind = inp.byte()
+                count = inp.varint()
+                if kind == 0:
+                    timelines['position'] = self._timeline_1(count)
+                elif kind == 1:
+                    timelines['spacing'] = self._timeline_1(count)
+                else:
+                    timelines['mix'] = self._timeline_n(count, ('mixRotate', 'mixX', 'mixY'))
+        if paths:
+            animation['paths'] = paths
+
+        if v >= (4, 2):
+            physics = {}
+            for _ in range(inp.varint()):
+                index = inp.varint() - 1
+                timelines = physics.setdefault(self.physics[index] if index >= 0 else '', {})
+                for _ in range(inp.varint()):
+                    kind = PHYSICS_TIMELINES[inp.byte()]
+                    count = inp.varint()
+                    if kind == 'reset':
+                        timelines[kind] = [{'time': inp.float()} for _ in range(count)]
+                    else:
+                        timelines[kind] = self._timeline_1(count)
+            if physics:
+                animation['physics'] = physics
+
+        attachments = {}
+        for _ in range(inp.varint()):
+            skin = attachments.setdefault(self.skins[inp.varint()], {})
+            for _ in range(inp.varint()):
+                slot = skin.setdefault(self.slots[inp.varint()], {})
+                for _ in range(inp.varint()):
+                    name = inp.ref()
+                    if v < (4, 2):
+                        slot[name] = self._deform_4(inp.varint())
+                        continue
+                    timelines = slot.setdefault(name, {})
+                    kind = inp.byte()
+                    count = inp.varint()
+                    if kind == 0:
+                        timelines['deform'] = self._deform_4(count)
+                    else:
+                        timelines['sequence'] = self._sequence_timeline(count)
+        if attachments:
+            animation['attachments' if v >= (4, 2) else 'deform'] = attachments
+
+        draw_order = self._draw_order()
+        if draw_order:
+            animation['drawOrder'] = draw_order
+        events = self._events_timeline()
+        if events:
+            animation['events'] = events
+        return animation
+
+    def _ik_timeline_40(self):
+        inp = self.inp
+        count = inp.varint()
+        inp.varint()
+        frames = []
+        frame = {'time': inp.float(), 'mix': inp.float(), 'softness': inp.float()}
+        while True:
+            frame['bendPositive'] = inp.sbyte() > 0
+            frame['compress'] = inp.bool()
+            frame['stretch'] = inp.bool()
+            frames.append(frame)
+            if len(frames) >= count:
+                break
+            following = {'time': inp.float(), 'mix': inp.float(), 'softness': inp.float()}
+            self._curve_4(frame, inp.byte(), 2)
+            frame = following
+        return frames
+
+    def _ik_timeline_42(self):
+        inp = self.inp
+        count = inp.varint()
+        inp.varint()
+
+        def values(flags):
+            return {'mix': (inp.float() if flags & 2 else 1) if flags & 1 else 0,
+                    'softness': inp.float() if flags & 4 else 0}
+
+        def switches(frame, flags):
+            frame['bendPositive'] = bool(flags & 8)
+            frame['compress'] = bool(flags & 16)
+            frame['stretch'] = bool(flags & 32)
+
+        frames = []
+        flags = inp.byte()
+        frame = {'time': inp.float()}
+        frame.update(values(flags))
+        while True:
+            switches(frame, flags)
+            frames.append(frame)
+            if len(frames) >= count:
+                break
+            flags = inp.byte()
+            following = {'time': inp.float()}
+            following.update(values(flags))
+            if flags & 64:
+                frame['curve'] = 'stepped'
+            elif flags & 128:
+                frame['curve'] = inp.floats(8)
+            frame = following
+        return frames
+
+    def _deform_4(self, count):
+        """4.x 变形时间轴 - 帧值在时间之后, 下一帧时间和曲线之前"""
+        inp = self.inp
+        inp.varint()
+        frames = []
+        frame = {'time': inp.float()}
+        while True:
+            end = inp.varint()
+            if end:
+                start = inp.varint()
+                if start:
+                    frame['offset'] = start
+                frame['vertices'] = inp.floats(end)
+            frames.append(frame)
+            if len(frames) >= count:
+                break
+            following = {'time': inp.float()}
+            self._curve_4(frame, inp.byte(), 1)
+            frame = following
+        return frames
+
+    def _sequence_timeline(self, count):
+        inp = self.inp
+        frames = []
+        for _ in range(count):
+            time = inp.float()
+            mode = inp.int()
+            frame = {'time': time, 'mode': SEQUENCE_MODES[mode & 15], 'index': mode >> 4, 'delay': inp.float()}
+            frames.append(frame)
+        return frames
+
+def read_skel(data):
+    """解析 .skel 数据 (bytes 或文件路径), 返回 JSON 结构"""
+    if isinstance(data, (str, Path)):
+        data = Path(data).read_bytes()
+    return SkelReader(memoryview(data)).read()
+
+def skel_text(data, indent=None):
+    """解析 .skel 数据并生成 JSON 文本"""
+    separators = None if indent else (',', ':')
+    return json.dumps(read_skel(data), ensure_ascii=False, indent=indent, separators=separators)
+
+def json_name(skel_path):
+    """输出文件名 - 去掉 .skel / .skel.bytes 扩展名后加 .json"""
+    name = Path(skel_path).name
+    lower = name.lower()
+    for suffix in SKEL_SUFFIXES:
+        if lower.endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)] + '.json'
+    return Path(name).stem + '.json'
+
+def skel_to_json_file(skel_path, output_dir=None, root=None, indent=None):
+    """转换单个 .skel 文件 (进程池任务)
+
+    默认保存在源文件旁边; 指定 output_dir 时按相对 root 的目录结构镜像.
+    压缩包中的文件默认输出到新压缩包, 内容在结果的 'data' 中返回.
+    """
+    result = {'file': skel_path, 'ok': False, 'output': None, 'error': None, 'version': None}
+    try:
+        data = read_bytes(skel_path)
+        result['version'] = detect_version(data)[0]
+        text = skel_text(data, indent)
+        if output_dir:
+            rel = source_dir(skel_path).relative_to(root) if root else Path()
+            target = str(Path(output_dir).joinpath(rel, json_name(skel_path)))
+        else:
+            target = sibling_output(skel_path, json_name(skel_path))
+        if is_member(target):
+            result['data'] = text
+        else:
+            atomic_write(target, text)
+        result['output'] = target
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
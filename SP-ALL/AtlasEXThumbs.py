@@ -0,0 +1,276 @@
+import os
+import io
+import json
+import mmap
+import struct
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from SpineAtlas import AtlasFrame
+from AtlasEXCache import load_atlas
+from AtlasEXZip import split_member, open_file, open_image, path_stamp
+from AtlasEXPack import frame_image
+from AtlasEXWriter import atomic_write
+
+# 瓦片和缩略图缓存 - 保存在输入目录下, 按纹理页内容哈希分目录, 同样的纹理页只生成一次
+THUMBS_DIR = ".atlasex_thumbs"
+
+# 瓦片边长, 缩略图边长
+TILE_SIZE = 512
+THUMB_SIZE = 96
+
+# 打包文件: 魔数, 版本, 条目数, 偏移表位置; 偏移表为 (偏移, 长度) 的 uint64 数组
+PACK_MAGIC = b"AEXPACK1"
+_PACK_HEADER = struct.Struct('<8sIIQ')
+
+# 纹理页内容哈希的记录 {路径: [mtime_ns, size, 哈希]}, 避免每次打开都重新哈希大文件
+_STAMPS_NAME = "hashes.json"
+_stamps_lock = threading.Lock()
+
+# 帧矩形数组 - 纹理页上的位置和尺寸 (旋转的帧为旋转后的尺寸), 旋转角度
+RECT_DTYPE = np.dtype([('x', '<i4'), ('y', '<i4'), ('w', '<i4'), ('h', '<i4'), ('rota', '<i4')])
+
+def thumbs_root(files):
+    """缓存目录的默认位置 - 输入文件的公共目录 (压缩包中的文件按压缩包所在目录)"""
+    if not files:
+        return None
+    real = [(split_member(f) or (f,))[0] for f in files]
+    root = os.path.commonpath([str(Path(f).resolve().parent) for f in real])
+    return str(Path(root).joinpath(THUMBS_DIR))
+
+def _load_stamps(root):
+    try:
+        with open(os.path.join(root, _STAMPS_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def page_hash(page_path, root):
+    """纹理页内容哈希 - 按 mtime/size 复用上次的结果"""
+    key = str(page_path)
+    stamp = list(path_stamp(page_path))
+    with _stamps_lock:
+        known = _load_stamps(root).get(key)
+    if known and known[:-1] == stamp:
+        return known[-1]
+    digest = hashlib.blake2b(digest_size=16)
+    with open_file(page_path) as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+    with _stamps_lock:
+        # 多个进程同时写入时以最后一次为准, 丢失的记录只会导致重新哈希
+        stamps = _load_stamps(root)
+        stamps[key] = stamp + [value]
+        atomic_write(os.path.join(root, _STAMPS_NAME), json.dumps(stamps, ensure_ascii=False))
+    return value
+
+class PackWriter:
+    """顺序写入打包文件 - 条目逐个追加, 关闭时写入偏移表; 先写入临时文件再替换"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.temp_file = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.file = open(self.temp_file, 'wb')
+        self.file.write(_PACK_HEADER.pack(PACK_MAGIC, 1, 0, 0))
+        self.entries = []
+
+    def add(self, data):
+        self.entries.append((self.file.tell(), len(data)))
+        self.file.write(data)
+
+    def close(self):
+        table = self.file.tell()
+        self.file.write(np.asarray(self.entries, dtype='<u8').reshape(-1, 2).tobytes())
+        self.file.seek(0)
+        self.file.write(_PACK_HEADER.pack(PACK_MAGIC, 1, len(self.entries), table))
+        self.file.close()
+        os.replace(self.temp_file, self.path)
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.temp_file)
+        except OSError:
+            pass
+
+class PackReader:
+    """按序号随机读取打包文件中的条目 (mmap, 不把整个文件读入内存); 可在多个线程中同时读取"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, count, table = _PACK_HEADER.unpack_from(self.map, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"不是打包文件: {self.path}")
+        self.table = np.frombuffer(self.map, dtype='<u8', count=count * 2, offset=table).reshape(-1, 2)
+
+    def __len__(self):
+        return len(self.table)
+
+    def get(self, index):
+        offset, size = self.table[index]
+        return self.map[int(offset):int(offset + size)]
+
+    def close(self):
+        self.table = None
+        self.map.close()
+
+def page_rects(frames):
+    """帧在纹理页上占据的矩形 -> RECT_DTYPE 数组 (与 frame_image 的裁剪方式一致)"""
+    rects = np.zeros(len(frames), dtype=RECT_DTYPE)
+    for i, frame in enumerate(frames):
+        rotated = frame.rota not in (0, 180, -180)
+        w, h = (frame.cuth, frame.cutw) if rotated else (frame.cutw, frame.cuth)
+        rects[i] = (int(frame.cutx), int(frame.cuty), int(w), int(h), int(frame.rota))
+    return rects
+
+def describe_atlas(file_path):
+    """读取 Atlas 的纹理页和帧 (进程池任务) - 帧以名称列表和矩形数组返回, 便于界面按需显示"""
+    result = {'file': file_path, 'ok': False, 'error': None, 'pages': []}
+    try:
+        atlas = load_atlas(file_path)
+        for tex in atlas.atlas:
+            result['pages'].append({
+                'png': tex.png,
+                'path': atlas.path.joinpath(tex.png).as_posix(),
+                'size': (tex.w, tex.h),
+                'pma': bool(tex.pma),
+                'names': [frame.name for frame in tex.frames],
+                'rects': page_rects(tex.frames),
+            })
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def pyramid_levels(width, height, tile=TILE_SIZE):
+    """金字塔层数 - 每层边长减半, 直到整页放进一个瓦片"""
+    levels = 1
+    while max(width, height) > tile:
+        width, height = (width + 1) // 2, (height + 1) // 2
+        levels += 1
+    return levels
+
+def tile_grid(width, height, level, tile=TILE_SIZE):
+    """某一层的 (列数, 行数, 该层宽, 该层高)"""
+    w, h = width, height
+    for _ in range(level):
+        w, h = (w + 1) // 2, (h + 1) // 2
+    return -(-w // tile), -(-h // tile), w, h
+
+def tile_index(width, height, level, column, row, tile=TILE_SIZE):
+    """瓦片在打包文件中的序号 - 按层 (从细到粗), 行, 列排列"""
+    index = 0
+    for lower in range(level):
+        columns, rows, _, _ = tile_grid(width, height, lower, tile)
+        index += columns * rows
+    columns, _, _, _ = tile_grid(width, height, level, tile)
+    return index + row * columns + column
+
+def _encode_png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+def _decode_page(page_path):
+    """完整解码纹理页 - 超大纹理页 (16k x 16k) 超出 Pillow 的默认像素上限, 此处放开"""
+    limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        img = open_image(page_path)
+    finally:
+        Image.MAX_IMAGE_PIXELS = limit
+    # 不复制像素 - 整页解码后只保留一份
+    try:
+        img.load()
+    finally:
+        if getattr(img, 'fp', None) is not None:
+            img.fp.close()
+    return img.convert('RGBA') if img.mode != 'RGBA' else img
+
+def _write_tiles(page, path, tile, threads):
+    """按层切分并编码瓦片, 每层由上一层缩小一半得到"""
+    writer = PackWriter(path)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            level = page
+            while True:
+                columns, rows = -(-level.width // tile), -(-level.height // tile)
+                boxes = [(c * tile, r * tile, min(level.width, (c + 1) * tile), min(level.height, (r + 1) * tile))
+                         for r in range(rows) for c in range(columns)]
+                for data in executor.map(lambda box, image=level: _encode_png(image.crop(box)), boxes):
+                    writer.add(data)
+                if max(level.width, level.height) <= tile:
+                    break
+                # reduce 按 2x2 取平均, 奇数边长向上取整, 与 tile_grid 一致
+                level = level.reduce(2)
+        writer.close()
+    except BaseException:
+        writer.discard()
+        raise
+
+def _thumbnail(page, rect, size):
+    x, y, w, h, rota = (int(v) for v in rect)
+    if w <= 0 or h <= 0:
+        return _encode_png(Image.new('RGBA', (1, 1)))
+    rotated = rota not in (0, 180, -180)
+    frame = AtlasFrame('', x, y, h if rotated else w, w if rotated else h, rota=rota)
+    image = frame_image(page, frame)
+    image.thumbnail((size, size))
+    return _encode_png(image)
+
+def _write_thumbs(page, rects, path, size, threads):
+    writer = PackWriter(path)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for data in executor.map(lambda rect: _thumbnail(page, rect, size), rects, chunksize=64):
+                writer.add(data)
+        writer.close()
+    except BaseException:
+        writer.discard()
+        raise
+
+def thumbs_name(rects, size=THUMB_SIZE):
+    """帧缩略图文件名 - 按帧矩形和尺寸区分, 不同 Atlas 引用同一纹理页时各自生成"""
+    signature = hashlib.blake2b(np.ascontiguousarray(rects, dtype=RECT_DTYPE).tobytes(), digest_size=8)
+    return f"thumbs_{size}_{signature.hexdigest()}.pack"
+
+def build_page_cache(page_path, root, rects, tile=TILE_SIZE, thumb=THUMB_SIZE, threads=None):
+    """生成纹理页的瓦片金字塔和帧缩略图 (进程池任务), 已缓存的部分直接复用
+
+    纹理页只在缺少缓存时解码一次, 瓦片和缩略图在线程中并行编码;
+    返回 {page, ok, error, dir, size, levels, tiles, thumbs, built}.
+    """
+    result = {'page': page_path, 'ok': False, 'error': None, 'built': False}
+    try:
+        directory = os.path.join(root, page_hash(page_path, root))
+        os.makedirs(directory, exist_ok=True)
+        tiles = os.path.join(directory, f"tiles_{tile}.pack")
+        thumbs = os.path.join(directory, thumbs_name(rects, thumb))
+        info_path = os.path.join(directory, "info.json")
+        info = None
+        if os.path.isfile(info_path):
+            with open(info_path, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        threads = threads or min(8, os.cpu_count() or 1)
+        if info is None or not os.path.isfile(tiles) or not os.path.isfile(thumbs):
+            page = _decode_page(page_path)
+            info = {'size': list(page.size), 'tile': tile, 'levels': pyramid_levels(*page.size, tile)}
+            if not os.path.isfile(tiles):
+                _write_tiles(page, tiles, tile, threads)
+            if not os.path.isfile(thumbs):
+                _write_thumbs(page, rects, thumbs, thumb, threads)
+            with open(info_path, 'w', encoding='utf-8') as f:
+                json.dump(info, f)
+            result['built'] = True
+            del page
+        result.update(dir=directory, size=tuple(info['size']), levels=info['levels'], tiles=tiles, thumbs=thumbs,
+                      ok=True)
+    except Exception as e:
+        result['error'] = str(e)
+    return result
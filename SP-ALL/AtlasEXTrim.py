@@ -0,0 +1,275 @@
+import shutil
+from pathlib import Path
+import numpy as np
+from PIL.Image import fromarray
+from SpineAtlas import Anchor
+from AtlasEXCore import iter_batch
+from AtlasEXCache import load_atlas, invalidate
+from AtlasEXWriter import atlas_text, atomic_write, atomic_file, source_root
+from AtlasEXZip import open_image, open_file, source_dir, exists, file_size
+from AtlasEXProfile import PhaseTimer
+
+# 默认的边缘扩展像素数 - 双线性过滤只需要 1 像素, 生成 mipmap 时需要更多
+DEFAULT_BLEED = 8
+
+# 8 邻域
+_NEIGHBOURS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+def alpha_bbox(alpha, threshold=0):
+    """alpha 大于 threshold 的最小包围框 (左, 上, 右, 下), 全透明时返回 None"""
+    mask = alpha > threshold
+    columns = np.flatnonzero(mask.any(axis=0))
+    if not len(columns):
+        return None
+    rows = np.flatnonzero(mask.any(axis=1))
+    return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+
+def page_bboxes(pixels, rects, threshold=0):
+    """每个帧区域在纹理页上的内容包围框 (相对区域左上角), 全透明或超出纹理页时为 -1
+
+    rects 为 [(x, y, 页上的宽, 页上的高)]; 超出纹理页的部分按透明处理.
+    """
+    height, width = pixels.shape[:2]
+    alpha = pixels[..., 3]
+    boxes = np.full((len(rects), 4), -1, dtype=np.int64)
+    for i, (x, y, w, h) in enumerate(rects):
+        x0, y0, x1, y1 = max(0, x), max(0, y), min(width, x + w), min(height, y + h)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        box = alpha_bbox(alpha[y0:y1, x0:x1], threshold)
+        if box is not None:
+            boxes[i] = (box[0] + x0 - x, box[1] + y0 - y, box[2] + x0 - x, box[3] + y0 - y)
+    return boxes
+
+def bleed_edges(pixels, passes=DEFAULT_BLEED):
+    """把不透明像素的颜色逐圈扩展到相邻的全透明像素 (alpha 保持为 0), 原地修改, 返回填充的像素数
+
+    每圈只处理与已知像素相邻的一圈 (取 8 邻域已知颜色的平均值), 计算量与轮廓长度成正比.
+    """
+    known = pixels[..., 3] > 0
+    if known.all() or not known.any():
+        return 0
+    height, width = known.shape
+    rgb = pixels[..., :3]
+    filled = 0
+    for _ in range(passes):
+        # 8 邻域膨胀 - 先纵向再横向
+        grown = known.copy()
+        grown[1:] |= known[:-1]
+        grown[:-1] |= known[1:]
+        wide = grown.copy()
+        wide[:, 1:] |= grown[:, :-1]
+        wide[:, :-1] |= grown[:, 1:]
+        ys, xs = np.nonzero(wide & ~known)
+        if not len(ys):
+            break
+        total = np.zeros((len(ys), 3), dtype=np.uint32)
+        count = np.zeros(len(ys), dtype=np.uint32)
+        for dy, dx in _NEIGHBOURS:
+            ny, nx = ys + dy, xs + dx
+            valid = (ny >= 0) & (ny < height) & (nx >= 0) & (nx < width)
+            ny, nx = np.where(valid, ny, 0), np.where(valid, nx, 0)
+            hit = valid & known[ny, nx]
+            total += rgb[ny, nx] * hit[:, None]
+            count += hit
+        rgb[ys, xs] = (total // count[:, None]).astype(np.uint8)
+        known[ys, xs] = True
+        filled += len(ys)
+    return filled
+
+def trim_page(job, bleed=DEFAULT_BLEED, threshold=0):
+    """处理单个纹理页 (进程池任务) - job 为 (源文件, 目标文件, 是否预乘, 帧区域数组)
+
+    计算每个帧区域的内容包围框, 对直通 alpha 的纹理页做边缘扩展后写入目标文件;
+    预乘纹理页的透明像素必须为 0, 不做扩展, 原样复制.
+    """
+    src, dst, premultiplied, rects = job
+    result = {'file': src, 'ok': False, 'output': dst, 'error': None, 'boxes': None, 'bled': 0,
+              'bleed_skipped': bool(premultiplied and bleed)}
+    timer = PhaseTimer(result)
+    try:
+        with timer.phase('decode'):
+            with open_image(src) as img:
+                img.load()
+                pixels = np.array(img.convert('RGBA') if img.mode != 'RGBA' else img)
+        result['bytes'] = file_size(src)
+        with timer.phase('bbox'):
+            result['boxes'] = page_bboxes(pixels, rects, threshold)
+        if bleed and not premultiplied:
+            with timer.phase('bleed'):
+                result['bled'] = bleed_edges(pixels, bleed)
+            with timer.phase('encode'):
+                with atomic_file(dst) as target:
+                    fromarray(pixels, 'RGBA').save(target, format='PNG')
+        else:
+            with timer.phase('copy'):
+                with open_file(src) as source, atomic_file(dst) as target:
+                    shutil.copyfileobj(source, target)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+def _rotated(rota):
+    return rota not in (0, 180, -180)
+
+def _page_rect(frame):
+    """帧在纹理页上占据的矩形 (x, y, 宽, 高)"""
+    if _rotated(frame.rota):
+        return int(frame.cutx), int(frame.cuty), int(frame.cuth), int(frame.cutw)
+    return int(frame.cutx), int(frame.cuty), int(frame.cutw), int(frame.cuth)
+
+def upright_box(box, frame):
+    """纹理页上的包围框 -> 帧图像 (未旋转方向, 与 frame_image 一致) 中的包围框"""
+    left, top, right, bottom = box
+    cw, ch = int(frame.cutw), int(frame.cuth)
+    rota = frame.rota % 360
+    if rota == 0:
+        return left, top, right, bottom
+    if rota == 90:
+        # 页上区域顺时针转 90 度得到帧图像
+        return cw - bottom, left, cw - top, right
+    if rota == 180:
+        return cw - right, ch - bottom, cw - left, ch - top
+    if rota == 270:
+        return top, ch - right, bottom, ch - left
+    return None
+
+def trim_frame(frame, box):
+    """按内容包围框收紧帧 - 裁剪区域移到内容所在位置, 偏移增加裁掉的边, 原始尺寸不变
+
+    坐标为默认锚点 (裁剪左上, 偏移左下); 返回节省的像素面积, 无法处理的旋转角度返回 0.
+    """
+    upright = upright_box(box, frame)
+    if upright is None:
+        return 0
+    left, top, right, bottom = upright
+    old_area = int(frame.cutw) * int(frame.cuth)
+    frame.cutx += box[0]
+    frame.cuty += box[1]
+    frame.offx += left
+    frame.offy += int(frame.cuth) - bottom
+    frame.cutw, frame.cuth = right - left, bottom - top
+    return old_area - frame.cutw * frame.cuth
+
+def _plan(files, output_root, root, trim):
+    """解析 Atlas, 确定每个纹理页的输出位置, 汇总引用该纹理页的所有帧区域; 共享的纹理页只处理一次"""
+    atlases = []
+    pages = {}
+    for file_path in files:
+        entry = {'file': file_path, 'atlas': None, 'output': None, 'pages': [], 'error': None}
+        atlases.append(entry)
+        try:
+            atlas = load_atlas(file_path)
+            # 帧坐标按当前的 cutp/offp 解释, 先换算到默认锚点再收紧
+            if atlas.cutp != Anchor.TOP_LEFT or atlas.offp != Anchor.BOTTOM_LEFT:
+                atlas.ReOffset()
+            rel = source_dir(file_path).relative_to(root)
+            out_dir = Path(output_root).joinpath(rel)
+            entry['atlas'] = atlas
+            entry['output'] = str(out_dir.joinpath(Path(file_path).name))
+            for tex in atlas.atlas:
+                src = atlas.path.joinpath(tex.png).resolve()
+                dst = out_dir.joinpath(tex.png).resolve()
+                if not exists(src):
+                    raise FileNotFoundError(f"缺失纹理: {src.as_posix()}")
+                if src == dst:
+                    raise ValueError("输出目录不能与源目录相同")
+                page = pages.setdefault(str(src), {'premultiplied': tex.pma, 'outputs': [], 'atlases': {},
+                                                   'rects': {}})
+                if str(dst) not in page['outputs']:
+                    page['outputs'].append(str(dst))
+                if trim:
+                    for frame in tex.frames:
+                        page['rects'].setdefault(_page_rect(frame), len(page['rects']))
+                page['atlases'][id(entry)] = entry
+                entry['pages'].append(str(src))
+        except Exception as e:
+            entry['error'] = str(e)
+    return atlases, pages
+
+def _finish_atlas(entry, pages, failed):
+    """所有纹理页完成后, 按内容包围框收紧帧并写入 Atlas"""
+    result = {'file': entry['file'], 'ok': False, 'output': entry['output'], 'error': entry['error'],
+              'pages': len(entry['pages']), 'frames': 0, 'trimmed': 0, 'empty': 0, 'area_before': 0,
+              'area_saved': 0, 'bled': 0, 'bleed_skipped': 0}
+    if result['error'] is None:
+        errors = [failed[p] for p in dict.fromkeys(entry['pages']) if p in failed]
+        if errors:
+            result['error'] = "; ".join(errors)
+    if result['error'] is None:
+        try:
+            atlas = entry['atlas']
+            for src in dict.fromkeys(entry['pages']):
+                result['bled'] += pages[src].get('bled', 0)
+                result['bleed_skipped'] += bool(pages[src].get('bleed_skipped'))
+            for tex, src in zip(atlas.atlas, entry['pages']):
+                page = pages[src]
+                for frame in tex.frames:
+                    result['frames'] += 1
+                    result['area_before'] += int(frame.cutw) * int(frame.cuth)
+                    if page.get('boxes') is None or not page['rects']:
+                        continue
+                    box = page['boxes'][page['rects'][_page_rect(frame)]]
+                    if box[0] < 0:
+                        # 全透明的帧保持不变
+                        result['empty'] += 1
+                        continue
+                    saved = trim_frame(frame, [int(v) for v in box])
+                    if saved:
+                        result['trimmed'] += 1
+                        result['area_saved'] += saved
+            Path(entry['output']).parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(entry['output'], atlas_text(atlas))
+            invalidate(entry['output'])
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+    return result
+
+def trim_atlases(files, output_root, trim=True, bleed=DEFAULT_BLEED, threshold=0, max_workers=None, cancelled=None,
+                 pool=None):
+    """收紧所选 Atlas 的帧并扩展纹理页的边缘颜色, 按 Atlas 产出结果 (含节省的像素面积)
+
+    纹理页在进程池中并行处理, 每个纹理页只解码一次; 输出按源目录结构镜像到 output_root.
+    只收紧帧区域, 纹理页上的像素位置不变 - 需要更小的纹理页时再重新打包.
+    """
+    files = list(files)
+    cancelled = cancelled or (lambda: False)
+    if not files:
+        return
+    root = source_root(files)
+    atlases, pages = _plan(files, output_root, root, trim)
+
+    # 解析失败的 Atlas 立即产出, 其余的等待各自的纹理页
+    remaining = {}
+    for entry in atlases:
+        if entry['error'] is not None:
+            yield _finish_atlas(entry, pages, {})
+        else:
+            remaining[id(entry)] = len(set(entry['pages']))
+            if not entry['pages']:
+                yield _finish_atlas(entry, pages, {})
+
+    jobs = [(src, page['outputs'][0], page['premultiplied'], tuple(page['rects'])) for src, page in pages.items()]
+    failed = {}
+    for result in iter_batch(trim_page, jobs, (bleed, threshold), max_workers, cancelled, pool):
+        src = result['file'] if isinstance(result['file'], str) else result['file'][0]
+        page = pages[src]
+        page['boxes'] = result.get('boxes')
+        page['bled'] = result.get('bled', 0)
+        page['bleed_skipped'] = result.get('bleed_skipped', False)
+        if result['ok']:
+            # 同一纹理页在多个输出位置被引用时直接复制
+            for extra in page['outputs'][1:]:
+                try:
+                    Path(extra).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(page['outputs'][0], extra)
+                except OSError as e:
+                    failed[src] = f"{Path(src).name}: {e}"
+        else:
+            failed[src] = f"{Path(src).name}: {result['error']}"
+        for entry in page['atlases'].values():
+            remaining[id(entry)] -= 1
+            if remaining[id(entry)] == 0:
+                yield _finish_atlas(entry, pages, failed)
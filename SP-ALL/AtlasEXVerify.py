@@ -0,0 +1,150 @@
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from AtlasEXZip import split_member, list_members, open_file, open_image
+
+# 默认 I/O 线程数 - 网络盘上 stat/读取延迟较高, 线程数可以远大于核心数
+DEFAULT_THREADS = 32
+
+# GUI 保存校验报告的文件名
+REPORT_NAME = "texture_report.json"
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def scan_atlas_pages(data):
+    """只扫描纹理页头 (名称, 声明尺寸), 不解析帧
+
+    与 SpineAtlas 的判断一致: 下一行以 size: 开头的行是纹理页名称.
+    """
+    text = data.decode('utf-8-sig', errors='replace').replace('\t', '')
+    lines = [line for line in text.splitlines() if line]
+    pages = []
+    for i in range(len(lines) - 1):
+        line = lines[i]
+        if ':' in line:
+            continue
+        head = lines[i + 1].replace(' ', '')
+        if head.startswith('size:'):
+            w, h = head[5:].split(',')[:2]
+            pages.append((line.strip(), int(float(w)), int(float(h))))
+    return pages
+
+def read_image_size(path):
+    """读取图像尺寸 - PNG 只读取 IHDR, 返回 None 表示文件不存在"""
+    try:
+        with open_file(path) as f:
+            head = f.read(24)
+    except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+        return None
+    if head[:8] == _PNG_SIGNATURE and head[12:16] == b'IHDR':
+        return int.from_bytes(head[16:20], 'big'), int.from_bytes(head[20:24], 'big')
+    # 其他格式由 PIL 解析文件头
+    with open_image(path) as img:
+        return img.size
+
+def _norm(path):
+    """规范化路径, 用于比较 (Windows 下不区分大小写)"""
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+def _scan_file(file_path):
+    """读取并扫描单个 Atlas, 返回 (文件, [(纹理路径, 宽, 高)], 错误)"""
+    try:
+        with open_file(file_path) as f:
+            data = f.read()
+        base = os.path.dirname(os.path.abspath(file_path))
+        pages = [(_norm(os.path.join(base, name)), w, h) for name, w, h in scan_atlas_pages(data)]
+        return file_path, pages, None
+    except Exception as e:
+        return file_path, [], str(e)
+
+def _list_pngs(directory, recursive):
+    """用 os.scandir 列出目录中的 PNG; 压缩包中的目录从中央目录列出"""
+    member = split_member(directory)
+    if member is not None:
+        archive, prefix = member
+        prefix = '' if prefix == '.' else prefix
+        found = []
+        for path in list_members(archive, ('*.png',)):
+            parent = posixpath.dirname(split_member(path)[1])
+            if parent == prefix or (recursive and parent.startswith(prefix + '/' if prefix else '')):
+                found.append(_norm(path))
+        return found
+    found = []
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif entry.name.lower().endswith('.png'):
+                        found.append(_norm(entry.path))
+        except OSError:
+            continue
+    return found
+
+def verify_textures(files, roots=None, threads=DEFAULT_THREADS, progress=None, cancelled=None):
+    """校验纹理: 缺失的纹理页, 与 Atlas 声明不一致的尺寸, 未被任何 Atlas 引用的 PNG
+
+    roots 为查找孤立 PNG 的根目录 (递归); 未指定时只检查 Atlas 所在目录.
+    progress(done, total) 按 Atlas 汇报进度.
+    """
+    cancelled = cancelled or (lambda: False)
+    files = list(files)
+    total = len(files)
+    report = {
+        'atlases': total, 'textures': 0,
+        'missing': [], 'mismatched': [], 'orphans': [], 'errors': [],
+        'cancelled': False,
+    }
+    # 纹理路径 -> [(atlas, 声明宽, 声明高)]
+    references = {}
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        done = 0
+        for file_path, pages, error in executor.map(_scan_file, files):
+            done += 1
+            if error is not None:
+                report['errors'].append({'file': file_path, 'error': error})
+            for texture, w, h in pages:
+                references.setdefault(texture, []).append((file_path, w, h))
+            if progress is not None:
+                progress(done, total)
+            if cancelled():
+                report['cancelled'] = True
+                return report
+
+        # 共享的纹理只读取一次
+        textures = list(references)
+        report['textures'] = len(textures)
+        sizes = executor.map(_safe_size, textures)
+        for texture, size in zip(textures, sizes):
+            users = references[texture]
+            if isinstance(size, str):
+                report['errors'].append({'file': texture, 'error': size})
+            elif size is None:
+                report['missing'].append({'texture': texture, 'atlases': [u[0] for u in users]})
+            else:
+                for atlas, w, h in users:
+                    if (w, h) != tuple(size):
+                        report['mismatched'].append({'texture': texture, 'atlas': atlas,
+                                                     'declared': [w, h], 'actual': list(size)})
+
+        # 孤立 PNG
+        if roots:
+            scan = [(os.path.abspath(r), True) for r in roots]
+        else:
+            scan = [(d, False) for d in dict.fromkeys(os.path.dirname(os.path.abspath(f)) for f in files)]
+        referenced = set(references)
+        for found in executor.map(lambda args: _list_pngs(*args), scan):
+            report['orphans'].extend(p for p in found if p not in referenced)
+        report['orphans'] = sorted(set(report['orphans']))
+    return report
+
+def _safe_size(texture):
+    """读取尺寸, 出错时返回错误信息"""
+    try:
+        return read_image_size(texture)
+    except Exception as e:
+        return str(e)
@@ -0,0 +1,177 @@
+import os
+import difflib
+import secrets
+import posixpath
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from AtlasEXZip import split_member, member_path, source_dir, archive_output, open_file
+
+# 临时文件的打开方式 - 以 0666 创建, 由内核按 umask 得到普通文件权限
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+def atlas_text(atlas):
+    """生成 Atlas 文本 - 与 SaveAtlas 写入的内容一致"""
+    old = atlas.covt
+    atlas.covt = int
+    try:
+        return '\n'.join(atlas.ConvertText)
+    finally:
+        atlas.covt = old
+
+def source_root(files):
+    """输入文件所在目录的公共根目录, 用于镜像输出 (压缩包视为同名目录)"""
+    if not files:
+        return None
+    return os.path.commonpath([str(source_dir(f)) for f in files])
+
+def output_path(file_path, overwrite=False, suffix="_modified", output_root=None, root=None):
+    """确定输出路径
+
+    覆盖模式写回原文件; 否则保存在源文件旁边 (添加后缀),
+    指定 output_root 时按相对 root 的目录结构镜像到输出目录.
+    压缩包中的文件不能原地修改, 未指定 output_root 时写入新压缩包 (见 archive_output).
+    """
+    path = Path(file_path)
+    member = split_member(file_path)
+    if overwrite and member is None:
+        return str(path)
+    name = path.name if overwrite else f"{path.stem}{suffix.strip()}.atlas"
+    if output_root:
+        rel = source_dir(file_path).relative_to(root) if root else Path()
+        return str(Path(output_root).joinpath(rel, name))
+    if member is not None:
+        return member_path(archive_output(file_path, suffix), posixpath.join(posixpath.dirname(member[1]), name))
+    return str(path.with_name(name))
+
+def sibling_output(file_path, name):
+    """源文件旁边的输出 - name 为新扩展名 (.atlas) 或文件名; 压缩包中的文件输出到新压缩包的相同目录"""
+    path = Path(file_path)
+    name = path.stem + name if name.startswith('.') else name
+    member = split_member(file_path)
+    if member is not None:
+        return member_path(archive_output(file_path), posixpath.join(posixpath.dirname(member[1]), name))
+    return str(path.with_name(name))
+
+def _key(path):
+    return os.path.normcase(str(Path(path).resolve()))
+
+def exclude_outputs(files, overwrite=False, suffix="_modified", output_root=None, root=None):
+    """去掉本身是其他输入的输出的文件 (上次运行生成的 *_modified.atlas 等)
+
+    返回 (输入文件, 被排除的文件)
+    """
+    if overwrite:
+        return list(files), []
+    targets = {}
+    for f in files:
+        targets[_key(output_path(f, overwrite, suffix, output_root, root))] = f
+    inputs, excluded = [], []
+    for f in files:
+        source = targets.get(_key(f))
+        if source is not None and source != f:
+            excluded.append(f)
+        else:
+            inputs.append(f)
+    return inputs, excluded
+
+def find_conflicts(files, overwrite=False, suffix="_modified", output_root=None, root=None):
+    """检查输出冲突 - 多个输入写到同一输出, 或输出会覆盖另一个输入
+
+    返回 {输出路径: [输入文件]}
+    """
+    if overwrite:
+        return {}
+    inputs = {_key(f): f for f in files}
+    targets = {}
+    for f in files:
+        target = _key(output_path(f, overwrite, suffix, output_root, root))
+        targets.setdefault(target, []).append(f)
+    conflicts = {}
+    for target, sources in targets.items():
+        if len(sources) > 1 or (target in inputs and inputs[target] not in sources):
+            conflicts[target] = sources
+    return conflicts
+
+def _temp_file(path):
+    """在目标目录中创建唯一的临时文件, 返回 (文件描述符, 路径)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    while True:
+        temp_file = os.path.join(directory, f".{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(temp_file, _TEMP_FLAGS, 0o666), temp_file
+        except FileExistsError:
+            continue
+
+@contextmanager
+def atomic_file(path, mode='wb', encoding=None):
+    """原子写入的文件对象 - 写入目标目录中唯一的临时文件, 正常退出时替换目标, 出错时删除临时文件
+
+    图像可直接保存到其中 (需指定 format). 不单独 fsync, 由调用方在批处理结束时调用 sync_files 统一刷盘.
+    """
+    path = str(path)
+    fd, temp_file = _temp_file(path)
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        try:
+            # 覆盖已有文件时保留其权限
+            os.chmod(temp_file, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_file, path)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+
+def atomic_write(path, text, encoding='utf-8'):
+    """原子写入文本 - 并行写入同一目录互不干扰"""
+    with atomic_file(path, 'w', encoding) as f:
+        f.write(text)
+
+def diff_text(target, text, fromfile=None, tofile=None):
+    """预演模式 - 返回目标文件与新内容的 unified diff, 内容相同时返回空字符串"""
+    try:
+        with open_file(target) as f:
+            old = f.read().decode('utf-8-sig').splitlines()
+    except OSError:
+        old = []
+    return '\n'.join(difflib.unified_diff(old, text.splitlines(), fromfile or target,
+                                          tofile or target, lineterm=''))
+
+def _fsync(path, directory=False):
+    """刷新单个文件或目录"""
+    if directory:
+        flags = os.O_RDONLY
+    else:
+        # Windows 下 fsync 需要写权限
+        flags = os.O_RDWR if os.name == 'nt' else os.O_RDONLY
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def sync_files(paths, threads=8):
+    """批量刷盘 - 先刷新文件, 再刷新所在目录 (每个目录一次); 返回失败的 [(路径, 错误)]"""
+    # 压缩包成员由 write_archives 整体替换, 不单独刷盘
+    paths = list(dict.fromkeys(os.path.abspath(p) for p in paths if split_member(p) is None))
+    errors = []
+
+    def sync(args):
+        try:
+            _fsync(*args)
+        except OSError as e:
+            errors.append((args[0], str(e)))
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(sync, [(p, False) for p in paths]))
+        if os.name != 'nt':
+            # 目录项 (重命名) 的持久化
+            directories = dict.fromkeys(os.path.dirname(p) for p in paths)
+            list(executor.map(sync, [(d, True) for d in directories]))
+    return errors
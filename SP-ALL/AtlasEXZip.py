@@ -0,0 +1,180 @@
+import os
+import re
+import zipfile
+import tempfile
+import posixpath
+from pathlib import Path
+from AtlasEXDiscover import match_patterns
+
+# 压缩包成员的虚拟路径: <压缩包>!/<成员名>, 纹理按成员目录解析 (a.zip!/ui/x.atlas -> a.zip!/ui/x.png)
+SEPARATOR = "!/"
+ARCHIVE_SUFFIX = ".zip"
+
+_MEMBER = re.compile(r'^(.*?\.zip)!(?:/(.*))?$', re.IGNORECASE | re.DOTALL)
+
+# 工作进程内打开的压缩包 {绝对路径: (mtime_ns, size, ZipFile)} - 每个进程只读取一次中央目录
+_archives = {}
+
+# fork 出的子进程与父进程共享文件偏移, 子进程清空缓存后自己重新打开 (不关闭继承的句柄)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_archives.clear)
+
+def is_archive(path):
+    return str(path).lower().endswith(ARCHIVE_SUFFIX) and os.path.isfile(path)
+
+def split_member(path):
+    """虚拟路径 -> (压缩包, 成员名); 不是压缩包成员时返回 None"""
+    text = str(path)
+    if '!' not in text:
+        return None
+    # Windows 下 Path 会把 / 转为 \
+    match = _MEMBER.match(text.replace('\\', '/'))
+    if match is None:
+        return None
+    # 压缩包根目录 (<压缩包>!) 的成员名为 '.'
+    return match.group(1), posixpath.normpath(match.group(2) or '.').lstrip('/')
+
+def is_member(path):
+    return split_member(path) is not None
+
+def member_path(archive, name):
+    return f"{archive}{SEPARATOR}{name}"
+
+def open_archive(archive):
+    """打开压缩包 (按 mtime/size 复用已打开的句柄)"""
+    key = os.path.abspath(archive)
+    st = os.stat(key)
+    cached = _archives.get(key)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    if cached is not None:
+        cached[2].close()
+    handle = zipfile.ZipFile(key)
+    _archives[key] = (st.st_mtime_ns, st.st_size, handle)
+    return handle
+
+def member_info(path):
+    """成员的 ZipInfo, 不存在时返回 None"""
+    archive, name = split_member(path)
+    try:
+        return open_archive(archive).getinfo(name)
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+def list_members(archive, include=("*.atlas",), exclude=()):
+    """从中央目录列出匹配的成员, 返回虚拟路径; 不解压任何数据
+
+    exclude 同时作用于成员所在的目录名.
+    """
+    members = []
+    for info in open_archive(archive).infolist():
+        if info.is_dir():
+            continue
+        parts = info.filename.split('/')
+        if any(match_patterns(part, '/'.join(parts[:i + 1]), exclude) for i, part in enumerate(parts[:-1])):
+            continue
+        if match_patterns(parts[-1], info.filename, include) and not match_patterns(parts[-1], info.filename, exclude):
+            members.append(member_path(archive, info.filename))
+    return members
+
+def exists(path):
+    """文件或成员是否存在"""
+    if is_member(path):
+        return member_info(path) is not None
+    return os.path.isfile(path)
+
+def path_stamp(path):
+    """缓存版本 - 普通文件为 (mtime_ns, size), 成员为 (压缩包 mtime_ns, CRC, size)"""
+    if is_member(path):
+        info = member_info(path)
+        if info is None:
+            raise FileNotFoundError(path)
+        archive = split_member(path)[0]
+        return os.stat(archive).st_mtime_ns, info.CRC, info.file_size
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def file_size(path):
+    """文件或成员的 (解压后) 字节数"""
+    if is_member(path):
+        info = member_info(path)
+        if info is None:
+            raise FileNotFoundError(path)
+        return info.file_size
+    return os.path.getsize(path)
+
+def open_file(path):
+    """以二进制方式打开文件或成员 (成员按需解压, 支持 seek)"""
+    parts = split_member(path)
+    if parts is None:
+        return open(path, 'rb')
+    archive, name = parts
+    try:
+        return open_archive(archive).open(name)
+    except KeyError:
+        raise FileNotFoundError(f"压缩包中没有成员: {path}") from None
+
+def read_bytes(path):
+    with open_file(path) as f:
+        return f.read()
+
+def open_image(path):
+    """打开图像 - 成员以流的方式读取, 只读取尺寸时不会解压整个成员"""
+    from PIL.Image import open as imgop
+    if is_member(path):
+        return imgop(open_file(path))
+    return imgop(path)
+
+def source_dir(path):
+    """用于镜像输出的源目录 - 成员所在目录视为压缩包旁边以压缩包命名的目录"""
+    parts = split_member(path)
+    if parts is None:
+        return Path(path).resolve().parent
+    archive, name = parts
+    archive = Path(archive).resolve()
+    return archive.parent.joinpath(archive.stem, *name.split('/')[:-1])
+
+def archive_output(path, suffix="_modified"):
+    """成员结果写入的新压缩包 - 源压缩包旁边的 <名称><后缀>.zip"""
+    archive = Path(split_member(path)[0])
+    return str(archive.with_name(f"{archive.stem}{suffix.strip() or '_modified'}{ARCHIVE_SUFFIX}"))
+
+def write_archives(entries):
+    """把成员结果写入新压缩包 - entries 为 {虚拟路径: 文本或字节}, 返回写入的压缩包
+
+    每个压缩包写入同目录中的临时文件后原子替换; 已存在的压缩包中未被替换的成员会保留.
+    """
+    grouped = {}
+    for path, data in entries.items():
+        archive, name = split_member(path)
+        grouped.setdefault(archive, {})[name] = data.encode('utf-8') if isinstance(data, str) else data
+    written = []
+    for archive, members in grouped.items():
+        directory = os.path.dirname(os.path.abspath(archive))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(prefix=f".{os.path.basename(archive)}.", suffix=".tmp", dir=directory)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as out:
+                if os.path.isfile(archive):
+                    # 保留上次写入的其他成员, 逐块复制
+                    with zipfile.ZipFile(archive) as old:
+                        for info in old.infolist():
+                            if info.filename not in members:
+                                with old.open(info) as src, out.open(info, 'w') as dst:
+                                    while chunk := src.read(1 << 20):
+                                        dst.write(chunk)
+                for name, data in members.items():
+                    out.writestr(name, data)
+            os.replace(temp_file, archive)
+        except BaseException:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+        cached = _archives.pop(os.path.abspath(archive), None)
+        if cached is not None:
+            cached[2].close()
+        written.append(archive)
+    return written